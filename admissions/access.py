@@ -0,0 +1,166 @@
+"""Per-request role resolution and the access checks views share.
+
+`AccessMiddleware` attaches `request.access`, which knows whether the user is
+staff and which faculty (if any) they are. The faculty lookup runs once per
+login and is then cached in the session, so views and templates can check
+roles and lecture ownership by id without loading `user.faculty_profile`.
+A faculty's branch is cached alongside it, for `branches.choose()`.
+"""
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
+from django.utils.functional import SimpleLazyObject
+
+SESSION_KEY = '_access'
+
+
+class Access:
+    __slots__ = ('user_id', 'is_staff', 'faculty_id', 'faculty_name', 'faculty_branch')
+
+    def __init__(self, user_id=None, is_staff=False, faculty_id=None, faculty_name='', faculty_branch=None):
+        self.user_id = user_id
+        self.is_staff = is_staff
+        self.faculty_id = faculty_id
+        self.faculty_name = faculty_name
+        self.faculty_branch = faculty_branch
+
+    @property
+    def is_faculty(self):
+        return self.faculty_id is not None
+
+    def owns(self, lecture):
+        return self.faculty_id is not None and lecture.faculty_id == self.faculty_id
+
+    def can_view(self, lecture):
+        return self.is_staff or self.owns(lecture)
+
+
+def _faculty_for(user_id):
+    from .models import Faculty
+
+    # Looked up before the request's branch is known, so across all of them
+    return Faculty.all_branches.filter(user_id=user_id).values('id', 'full_name', 'branch').first()
+
+
+def _cached(user_id, faculty):
+    return {
+        'user_id': user_id,
+        'faculty_id': faculty['id'] if faculty else None,
+        'faculty_name': faculty['full_name'] if faculty else '',
+        'branch': faculty['branch'] if faculty else None,
+    }
+
+
+def remember(request, faculty=None):
+    """Store the role of the user who just logged in (pass their Faculty if known)."""
+    user = request.user
+    if faculty is None:
+        faculty = _faculty_for(user.pk)
+    elif not isinstance(faculty, dict):
+        faculty = {'id': faculty.id, 'full_name': faculty.full_name, 'branch': faculty.branch}
+    request.session[SESSION_KEY] = _cached(user.pk, faculty)
+    request.access = resolve(request)
+
+
+def forget(request):
+    request.session.pop(SESSION_KEY, None)
+
+
+def resolve(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Access()
+    cached = request.session.get(SESSION_KEY)
+    # Caches from before branches existed lack 'branch'; look the faculty up again once
+    if not cached or cached.get('user_id') != user.pk or 'branch' not in cached:
+        cached = _cached(user.pk, _faculty_for(user.pk))
+        request.session[SESSION_KEY] = cached
+    # is_staff comes from the user row, so revoking staff takes effect immediately
+    return Access(user.pk, user.is_staff, cached['faculty_id'], cached['faculty_name'], cached['branch'])
+
+
+def _resolved(request):
+    request.access.is_staff  # evaluate the lazy object so sync code reuses it
+    return request.access
+
+
+class AccessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.access = SimpleLazyObject(lambda: resolve(request))
+        # Async views must use `await request.aaccess()`; resolving touches the session and DB
+        request.aaccess = partial(sync_to_async(_resolved), request)
+        return self.get_response(request)
+
+
+def staff_required(view=None, redirect_to='home'):
+    """login_required plus a staff check; non-staff users are sent to `redirect_to`. Works on async views too."""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @login_required
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not (await request.aaccess()).is_staff:
+                    return redirect(redirect_to)
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @login_required
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not request.access.is_staff:
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator(view) if view is not None else decorator
+
+
+def faculty_required(view_func):
+    """login_required plus a faculty check; other users are sent home."""
+    @login_required
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.access.is_faculty:
+            return redirect('home')
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def lecture_access(view_func):
+    """Load the lecture named by `lecture_id` and allow staff or its own faculty.
+
+    The view receives the Lecture instead of the id. Ownership is decided from
+    `lecture.faculty_id`, so the faculty row is never fetched for the check.
+    Works on both sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @login_required
+        @wraps(view_func)
+        async def async_wrapper(request, lecture_id, *args, **kwargs):
+            from .models import Lecture
+
+            lecture = await aget_object_or_404(Lecture, id=lecture_id)
+            if not (await request.aaccess()).can_view(lecture):
+                return redirect('faculty_dashboard')
+            return await view_func(request, lecture, *args, **kwargs)
+        return async_wrapper
+
+    @login_required
+    @wraps(view_func)
+    def wrapper(request, lecture_id, *args, **kwargs):
+        from .models import Lecture
+
+        lecture = get_object_or_404(Lecture, id=lecture_id)
+        if not request.access.can_view(lecture):
+            return redirect('faculty_dashboard')
+        return view_func(request, lecture, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,148 @@
+"""Staff activity feed: one append-only `ActivityEvent` per thing worth showing on the dashboard.
+
+Events are written once the change's transaction commits, from the same
+model signals that feed the audit trail (see signals.py), plus the
+attendance view's bulk save and the payment ledger. Every panel reads the
+feed with one indexed query: newest first, optionally filtered by kind,
+paged with a (created_at, id) cursor so a page costs O(limit) however old
+it is.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import router, transaction
+from django.urls import reverse
+
+from . import audit
+from .models import ActivityEvent, Admission, Enquiry, Faculty, Lecture, Payment, PaymentTransaction
+
+KINDS = dict(ActivityEvent.KIND_CHOICES)
+# kind -> URL name taking target_id
+LINKS = {
+    'enquiry': 'edit_enquiry',
+    'admission': 'admission_detail',
+    'lecture': 'lecture_detail',
+    'attendance': 'lecture_detail',
+    'payment': 'faculty_profile',
+    'faculty': 'faculty_profile',
+}
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def record(kind, verb, target_id, title, detail=''):
+    """Queue an event, to be written if and when the current transaction commits."""
+    if audit.is_suppressed():
+        return
+    event = ActivityEvent(kind=kind, verb=verb, target_id=target_id, title=title[:200], detail=detail[:200],
+                          username=audit.actor()[1])
+    alias = router.db_for_write(ActivityEvent)
+    transaction.on_commit(lambda: event.save(using=alias), using=alias)
+
+
+def model_changed(instance, action, changes):
+    """Record an event for a model save or delete, if it is one the feed shows."""
+    event = describe(instance, action, changes)
+    if event is not None:
+        record(*event)
+
+
+def describe(instance, action='create', changes=None):
+    """(kind, verb, target_id, title, detail) for a change the feed shows, else None."""
+    describer = _DESCRIBERS.get(type(instance))
+    return describer(instance, action, changes or {}) if describer else None
+
+
+def _enquiry(enquiry, action, changes):
+    course = dict(Enquiry.COURSE_CHOICES).get(enquiry.preferred_course, enquiry.preferred_course)
+    if action == 'create':
+        return ('enquiry', 'created', enquiry.pk, f'New enquiry: {enquiry.student_name}',
+                f'{course} · {enquiry.phone_number}')
+    if action == 'update' and 'status' in changes:
+        status = dict(Enquiry.STATUS_CHOICES).get(enquiry.status, enquiry.status)
+        return 'enquiry', 'updated', enquiry.pk, f'Enquiry {status.lower()}: {enquiry.student_name}', course
+    return None
+
+
+def _admission(admission, action, changes):
+    name = ' '.join(admission.full_name().split())
+    standard = dict(Admission.STANDARD_CHOICES).get(admission.standard, admission.standard)
+    if action == 'create':
+        return ('admission', 'created', admission.pk, f'New admission: {name}',
+                f'{standard} · {admission.batch or "No batch"}')
+    if action == 'delete':
+        return 'admission', 'deleted', admission.pk, f'Admission removed: {name}', standard
+    return None
+
+
+def _lecture(lecture, action, changes):
+    when = f'{lecture.get_standard_display()} / {lecture.batch} · {lecture.date} {lecture.start_time}'
+    if action == 'create':
+        return 'lecture', 'created', lecture.pk, f'Lecture scheduled: {lecture.title}', when
+    if action == 'delete':
+        return 'lecture', 'deleted', lecture.pk, f'Lecture deleted: {lecture.title}', when
+    if changes:
+        names = {f.attname: str(f.verbose_name) for f in Lecture._meta.concrete_fields}
+        changed = ', '.join(names.get(name, name) for name in changes)
+        return 'lecture', 'updated', lecture.pk, f'Lecture updated: {lecture.title}', f'Changed {changed} · {when}'
+    return None
+
+
+def _faculty(faculty, action, changes):
+    if action == 'create':
+        return 'faculty', 'created', faculty.pk, f'Faculty added: {faculty.full_name}', faculty.phone_number or ''
+    return None
+
+
+def _payment(payment, action, changes):
+    if action == 'update' and 'per_lecture_rate' in changes:
+        old, new = changes['per_lecture_rate']
+        return ('payment', 'updated', payment.faculty_id, f'Rate changed: {payment.faculty.full_name}',
+                f'₹{old} → ₹{new} per lecture for {payment.month:%b %Y}')
+    return None
+
+
+def _ledger_entry(entry, action, changes):
+    faculty = entry.payment.faculty
+    label = 'Payment recorded' if entry.kind == 'payment' else entry.get_kind_display()
+    return ('payment', 'recorded', faculty.pk, f'{label}: {faculty.full_name}',
+            f'₹{entry.amount} for {entry.payment.month:%b %Y}')
+
+
+_DESCRIBERS = {
+    Enquiry: _enquiry, Admission: _admission, Lecture: _lecture, Faculty: _faculty, Payment: _payment,
+    PaymentTransaction: _ledger_entry,
+}
+
+
+def attendance_marked(lecture, present, absent, resubmitted):
+    record('attendance', 'updated' if resubmitted else 'marked', lecture.pk,
+           f'Attendance {"updated" if resubmitted else "marked"}: {lecture.title}',
+           f'{lecture.get_standard_display()} / {lecture.batch} · {present} present, {absent} absent')
+
+
+def encode_cursor(event):
+    return f'{(event.created_at - _EPOCH) // timedelta(microseconds=1)}-{event.pk}'
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor, or None if it is missing or malformed."""
+    try:
+        micros, pk = (int(part) for part in cursor.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return _EPOCH + timedelta(microseconds=micros), pk
+
+
+def feed(kinds=None, cursor=None, limit=20):
+    """(events, next cursor or None): newest first, older than `cursor`, limited to `kinds`."""
+    events = ActivityEvent.objects.all()
+    if kinds:
+        events = events.filter(kind__in=kinds)
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        # A range on the index rather than an OR, which SQLite would answer with a scan
+        events = events.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    page = list(events[:limit + 1])
+    for event in page:
+        event.url = reverse(LINKS[event.kind], args=[event.target_id]) if event.verb != 'deleted' else None
+    return page[:limit], (encode_cursor(page[limit - 1]) if len(page) > limit else None)
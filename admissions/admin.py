@@ -1,5 +1,71 @@
+import hashlib
+
 from django.contrib import admin
-from .models import Enquiry, Admission, Faculty, Lecture, AttendanceRecord, Payment
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from .models import Enquiry, Admission, Faculty, Lecture, AttendanceRecord, Payment, PaymentTransaction, Batch
+
+AUTOCOMPLETE_RESULT_CAP = 200
+AUTOCOMPLETE_CACHE_TIMEOUT = 60
+
+
+class CappedPaginator(Paginator):
+    """Counts at most `cap` rows, so "more results" never needs a full COUNT(*)."""
+    cap = AUTOCOMPLETE_RESULT_CAP
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.cap].count()
+
+
+class CachedAutocompleteJsonView(AutocompleteJsonView):
+    """Admin autocomplete whose JSON pages are cached briefly per field, term and page."""
+
+    def get(self, request, *args, **kwargs):
+        term, self.model_admin, source_field, _ = self.process_request(request)
+        if not self.has_perm(request):
+            return super().get(request, *args, **kwargs)
+        # Results come from the branch-scoped default manager, so the branch is part of the key
+        raw = '|'.join([request.branch, source_field.model._meta.label, source_field.name, term,
+                        request.GET.get('page', '1')])
+        key = 'admin-autocomplete:' + hashlib.md5(raw.encode()).hexdigest()
+        response = cache.get(key)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            cache.set(key, response, AUTOCOMPLETE_CACHE_TIMEOUT)
+        return response
+
+
+def autocomplete_view(request):
+    return CachedAutocompleteJsonView.as_view(admin_site=admin.site)(request)
+
+
+# Set before admin.site.urls is built in super20/urls.py
+admin.site.autocomplete_view = autocomplete_view
+
+
+class PrefixAutocompleteMixin:
+    """Autocomplete lookups use the model's indexed prefix_search and a capped paginator.
+
+    The changelist search box keeps the regular search_fields behaviour.
+    """
+
+    def _is_autocomplete(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and match.url_name == 'autocomplete'
+
+    def get_search_results(self, request, queryset, search_term):
+        if self._is_autocomplete(request):
+            return queryset.prefix_search(search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if self._is_autocomplete(request):
+            return CappedPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
 
 @admin.register(Enquiry)
 class EnquiryAdmin(admin.ModelAdmin):
@@ -9,6 +75,7 @@ class EnquiryAdmin(admin.ModelAdmin):
     list_editable = ['status']
     date_hierarchy = 'enquiry_date'
     ordering = ['-enquiry_date']
+    show_full_result_count = False
     
     def get_preferred_course_display(self, obj):
         return obj.get_preferred_course_display()
@@ -38,13 +105,14 @@ class EnquiryAdmin(admin.ModelAdmin):
         return True
 
 @admin.register(Admission)
-class AdmissionAdmin(admin.ModelAdmin):
+class AdmissionAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     list_display = ['id', 'full_name', 'standard', 'batch', 'mobile_1', 'school_college', 'submitted_at']
     list_filter = ['standard', 'stream', 'submitted_at', 'date_of_birth']
     search_fields = ['surname', 'name', 'middlename', 'mobile_1', 'mobile_2', 'school_college']
     list_editable = ['batch']
     date_hierarchy = 'submitted_at'
     ordering = ['-submitted_at']
+    show_full_result_count = False
     
     fieldsets = (
         ('Personal Information', {
@@ -85,6 +153,40 @@ admin.site.site_title = "Super20 Academy Admin"
 admin.site.index_title = "Welcome to Super20 Academy Management System"
 
 
+class BatchNameFilter(admin.SimpleListFilter):
+    """Batch filter whose choices are the Batch names plus any batch typed on a lecture.
+
+    Lectures store the batch as free text and don't create a Batch, so their names are
+    merged in too. The list is cached and capped so the DISTINCT over lectures runs at
+    most once per timeout instead of on every changelist load.
+    """
+    title = 'batch'
+    parameter_name = 'batch'
+    field_path = 'batch'
+    choices_limit = 100
+    cache_key = 'admin:batch-filter-choices'
+    cache_timeout = 300
+
+    def lookups(self, request, model_admin):
+        names = cache.get(self.cache_key)
+        if names is None:
+            names = set(Batch.objects.values_list('name', flat=True))
+            names.update(Lecture.all_branches.values_list('batch', flat=True).distinct())
+            names = sorted(name for name in names if name)[:self.choices_limit]
+            cache.set(self.cache_key, names, self.cache_timeout)
+        return [(name, name) for name in names]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_path: self.value()})
+        return queryset
+
+
+class LectureBatchFilter(BatchNameFilter):
+    parameter_name = 'lecture_batch'
+    field_path = 'lecture__batch'
+
+
 @admin.register(Faculty)
 class FacultyAdmin(admin.ModelAdmin):
     list_display = ['id', 'full_name', 'user', 'phone_number', 'is_active']
@@ -92,20 +194,31 @@ class FacultyAdmin(admin.ModelAdmin):
     search_fields = ['full_name', 'user__username', 'phone_number']
 
 
+@admin.register(Batch)
+class BatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'standard', 'name']
+    list_filter = ['standard']
+    search_fields = ['name']
+
+
 @admin.register(Lecture)
-class LectureAdmin(admin.ModelAdmin):
+class LectureAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     list_display = ['id', 'title', 'date', 'start_time', 'end_time', 'standard', 'batch', 'faculty']
-    list_filter = ['date', 'standard', 'batch', 'faculty']
+    list_filter = ['date', 'standard', BatchNameFilter, 'faculty']
     search_fields = ['title', 'description', 'batch', 'faculty__full_name']
     autocomplete_fields = ['faculty']
+    list_select_related = ['faculty']
+    show_full_result_count = False
 
 
 @admin.register(AttendanceRecord)
 class AttendanceRecordAdmin(admin.ModelAdmin):
     list_display = ['id', 'lecture', 'student', 'status', 'marked_by', 'marked_at']
-    list_filter = ['status', 'lecture__date', 'lecture__standard', 'lecture__batch']
+    list_filter = ['status', 'lecture__date', 'lecture__standard', LectureBatchFilter]
     search_fields = ['student__surname', 'student__name', 'lecture__title']
-    autocomplete_fields = ['lecture']
+    autocomplete_fields = ['lecture', 'student', 'marked_by']
+    list_select_related = ['lecture', 'student', 'marked_by']
+    show_full_result_count = False
 
 
 @admin.register(Payment)
@@ -115,9 +228,35 @@ class PaymentAdmin(admin.ModelAdmin):
     search_fields = ['faculty__full_name', 'faculty__user__username']
     autocomplete_fields = ['faculty']
     list_editable = ['per_lecture_rate']
+    list_select_related = ['faculty']
+    # Payment.save() never writes amount_paid; it only changes through PaymentTransaction entries
+    readonly_fields = ['amount_paid']
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # amount_due/balance read the annotated lecture_total instead of counting per row
+        return super().get_queryset(request).with_lecture_counts()
 
+    @admin.display(ordering='lecture_total')
     def due(self, obj):
         return obj.amount_due
 
+    @admin.display(ordering='lecture_total')
     def pending(self, obj):
         return obj.balance
+
+
+@admin.register(PaymentTransaction)
+class PaymentTransactionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'payment', 'amount', 'kind', 'recorded_by', 'created_at']
+    list_filter = ['kind', 'payment__month']
+    search_fields = ['payment__faculty__full_name', 'notes']
+    list_select_related = ['payment__faculty', 'recorded_by']
+    show_full_result_count = False
+
+    # The ledger is append-only; corrections are recorded as new entries
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
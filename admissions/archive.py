@@ -0,0 +1,201 @@
+"""Move closed enquiries and past-year attendance out of the live tables.
+
+Rows are written in bounded batches to gzip-compressed JSONL segments under
+PRIVATE_ROOT/archive/<kind>/<period>/, recorded as `ArchiveSegment`s, folded
+into rollup tables, and only then deleted. `iter_archived()` reads them back
+on demand; `archived_attendance()` serves lecture pages for archived years.
+"""
+import gzip
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import audit
+from .models import (
+    ArchiveSegment, AttendanceRecord, AttendanceRollup, Enquiry, EnquiryRollup, academic_year,
+)
+
+ENQUIRY_FIELDS = ['id', 'student_name', 'guardian_name', 'phone_number', 'preferred_course',
+                  'enquiry_date', 'status', 'followup_date', 'notes', 'branch']
+ATTENDANCE_FIELDS = ['id', 'lecture_id', 'lecture__date', 'student_id', 'status', 'marked_by_id',
+                     'marked_at', 'notes', 'branch']
+
+
+def archive_root():
+    return os.path.join(settings.PRIVATE_ROOT, 'archive')
+
+
+def segment_file(segment):
+    """Absolute path of an `ArchiveSegment`'s file; segments written before PRIVATE_ROOT are under MEDIA_ROOT."""
+    path = os.path.join(settings.PRIVATE_ROOT, segment.path)
+    legacy = os.path.join(settings.MEDIA_ROOT, segment.path)
+    return legacy if not os.path.exists(path) and os.path.exists(legacy) else path
+
+
+def academic_year_start(today=None):
+    today = today or timezone.localdate()
+    year = today.year if today.month >= settings.ACADEMIC_YEAR_START_MONTH else today.year - 1
+    return date(year, settings.ACADEMIC_YEAR_START_MONTH, 1)
+
+
+def closed_enquiries(cutoff):
+    return Enquiry.objects.filter(status__in=['converted', 'not_interested'], enquiry_date__lt=cutoff)
+
+
+def past_attendance(before):
+    return AttendanceRecord.objects.filter(lecture__date__lt=before)
+
+
+def _write_segment(kind, period, rows, key):
+    name = f"{key(rows[0]):010d}-{key(rows[-1]):010d}-{min(r['id'] for r in rows)}.jsonl.gz"
+    relative = os.path.join('archive', kind, period, name)
+    path = os.path.join(settings.PRIVATE_ROOT, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.part'
+    with gzip.open(partial, 'wt', encoding='utf-8') as fh:
+        for row in rows:
+            fh.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+    os.replace(partial, path)
+    return relative, path
+
+
+def _archive_batches(kind, queryset, fields, period_of, key, rollup, batch_size, dry_run):
+    moved = 0
+    while True:
+        rows = list(queryset.order_by('id').values(*fields)[:batch_size])
+        if not rows:
+            return moved
+        if dry_run:
+            return queryset.count()
+        by_period = defaultdict(list)
+        for row in rows:
+            by_period[period_of(row)].append(row)
+        written = []
+        try:
+            for period, period_rows in by_period.items():
+                period_rows.sort(key=key)
+                relative, path = _write_segment(kind, period, period_rows, key)
+                written.append(path)
+                with transaction.atomic():
+                    ArchiveSegment.objects.create(
+                        kind=kind, period=period, path=relative, rows=len(period_rows),
+                        first_key=key(period_rows[0]), last_key=key(period_rows[-1]),
+                    )
+                    rollup(period_rows)
+                    # The segment is the record of these rows; don't audit each one as a deletion
+                    with audit.suppressed():
+                        queryset.model.objects.filter(id__in=[r['id'] for r in period_rows]).delete()
+                written.pop()
+                moved += len(period_rows)
+        except BaseException:
+            # A segment whose rows are still live must not be left behind
+            for path in written:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+
+def _roll_up_enquiries(rows):
+    counts = Counter(
+        (r['branch'], timezone.localtime(r['enquiry_date']).date().replace(day=1), r['preferred_course'], r['status'])
+        for r in rows
+    )
+    existing = {
+        (e.branch, e.month, e.preferred_course, e.status): e
+        for e in EnquiryRollup.all_branches.filter(month__in={k[1] for k in counts})
+    }
+    new = []
+    for (branch, month, course, status), total in counts.items():
+        rollup = existing.get((branch, month, course, status))
+        if rollup is None:
+            new.append(EnquiryRollup(branch=branch, month=month, preferred_course=course, status=status, total=total))
+        else:
+            rollup.total += total
+    EnquiryRollup.all_branches.bulk_create(new)
+    EnquiryRollup.all_branches.bulk_update(existing.values(), ['total'])
+
+
+def _roll_up_attendance(rows):
+    year = academic_year(rows[0]['lecture__date'])
+    counts = defaultdict(Counter)
+    for r in rows:
+        counts[r['student_id']][r['status']] += 1
+    existing = {
+        r.student_id: r
+        for r in AttendanceRollup.objects.filter(academic_year=year, student_id__in=counts.keys())
+    }
+    new = []
+    for student_id, tally in counts.items():
+        rollup = existing.get(student_id)
+        if rollup is None:
+            new.append(AttendanceRollup(academic_year=year, student_id=student_id,
+                                        present=tally['present'], absent=tally['absent']))
+        else:
+            rollup.present += tally['present']
+            rollup.absent += tally['absent']
+    AttendanceRollup.objects.bulk_create(new)
+    AttendanceRollup.objects.bulk_update(existing.values(), ['present', 'absent'])
+
+
+def archive_enquiries(cutoff, batch_size=None, dry_run=False):
+    """Archive closed enquiries made before `cutoff` (a datetime); returns the row count."""
+    return _archive_batches(
+        'enquiry', closed_enquiries(cutoff), ENQUIRY_FIELDS,
+        period_of=lambda r: str(timezone.localtime(r['enquiry_date']).year), key=lambda r: r['id'],
+        rollup=_roll_up_enquiries, batch_size=batch_size or settings.ARCHIVE_BATCH_SIZE, dry_run=dry_run,
+    )
+
+
+def archive_attendance(before, batch_size=None, dry_run=False):
+    """Archive attendance for lectures dated before `before`; returns the row count."""
+    return _archive_batches(
+        'attendance', past_attendance(before), ATTENDANCE_FIELDS,
+        period_of=lambda r: academic_year(r['lecture__date']), key=lambda r: r['lecture_id'],
+        rollup=_roll_up_attendance, batch_size=batch_size or settings.ARCHIVE_BATCH_SIZE, dry_run=dry_run,
+    )
+
+
+def analyze_live_tables():
+    # Refresh planner statistics after large deletes so the smaller tables are planned as such
+    with connection.cursor() as cursor:
+        for model in (Enquiry, AttendanceRecord):
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def iter_archived(kind, period=None, key=None, branch=None):
+    """Yield archived rows (dicts) of `kind`, optionally for one period, key (id or lecture id) and/or branch.
+
+    Every row has its `branch`; rows archived before branches were recorded
+    belong to DEFAULT_BRANCH, as their live rows did.
+    """
+    segments = ArchiveSegment.objects.filter(kind=kind)
+    if period:
+        segments = segments.filter(period=period)
+    if key is not None:
+        segments = segments.filter(first_key__lte=key, last_key__gte=key)
+    key_field = 'lecture_id' if kind == 'attendance' else 'id'
+    for segment in segments.order_by('period', 'first_key'):
+        with gzip.open(segment_file(segment), 'rt', encoding='utf-8') as fh:
+            for line in fh:
+                row = json.loads(line)
+                row.setdefault('branch', settings.DEFAULT_BRANCH)
+                if (key is None or row[key_field] == key) and (branch is None or row['branch'] == branch):
+                    yield row
+
+
+def archived_attendance(lecture):
+    """{student_id: status} for a lecture whose attendance has been archived."""
+    return {
+        row['student_id']: row['status']
+        for row in iter_archived('attendance', academic_year(lecture.date), lecture.pk, lecture.branch)
+    }
+
+
+def default_enquiry_cutoff():
+    return timezone.now() - timedelta(days=settings.ENQUIRY_RETENTION_DAYS)
@@ -0,0 +1,267 @@
+"""Audit trail: who changed what on enquiries, admissions, lectures, faculty and payments.
+
+Audited instances are snapshotted on `post_init`; `post_save` and
+`post_delete` diff against the snapshot and queue an `AuditLog` once the
+transaction commits. Queued entries are kept in memory and written by a
+background thread with one `bulk_create` per batch (every
+AUDIT_FLUSH_SECONDS, or sooner when AUDIT_BATCH_SIZE pile up), so a save
+pays for a dict comparison rather than an extra INSERT. The cost is that
+entries queued in the last AUDIT_FLUSH_SECONDS are lost if the process is
+killed outright; a normal exit flushes them. With AUDIT_ASYNC off (the
+test default) entries are written as soon as the transaction commits.
+Each entry goes to the database its change was written to, so a branch with
+a database of its own (see branches.py) keeps its own trail, and records the
+branch of the changed row, so branches sharing a database see only theirs.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, router, transaction
+from django.db.models.fields.files import FieldFile
+
+from . import branches
+from .models import Admission, AttendanceRecord, AuditLog, Enquiry, Faculty, Lecture, Payment
+
+logger = logging.getLogger(__name__)
+
+# model -> fields never worth auditing (timestamps the model maintains itself)
+AUDITED = {
+    Enquiry: {'enquiry_date'},
+    Admission: {'submitted_at'},
+    Lecture: {'created_at', 'updated_at', 'roster_frozen_at'},
+    Faculty: set(),
+    Payment: {'created_at', 'updated_at'},
+    AttendanceRecord: {'marked_at'},
+}
+
+_request = contextvars.ContextVar('audit_request', default=None)
+_suppressed = contextvars.ContextVar('audit_suppressed', default=False)
+_buffer = []
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = {'thread': None, 'pid': None}
+
+
+class AuditMiddleware:
+    """Makes the current request's user available to audit entries written while it is handled."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        # Context variables follow sync_to_async into the thread where the ORM runs
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
+
+
+def tracked_fields(model):
+    excluded = AUDITED[model]
+    return [f for f in model._meta.concrete_fields if not f.primary_key and f.name not in excluded]
+
+
+def _value(field, instance):
+    # Views assign raw form strings (e.g. a date); compare what the database would store
+    value = getattr(instance, field.attname)
+    if isinstance(value, FieldFile):  # Audit the stored name, not the file object
+        return value.name
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def snapshot(instance):
+    """The audited field values of an instance, skipping fields that were deferred when it was loaded."""
+    deferred = instance.get_deferred_fields()
+    return {f.attname: _value(f, instance) for f in tracked_fields(type(instance)) if f.attname not in deferred}
+
+
+def diff(before, after, fields=None):
+    """{attname: [old, new]} for the values that changed (limited to `fields` attnames if given)."""
+    return {
+        name: [before.get(name), value] for name, value in after.items()
+        if (fields is None or name in fields) and not _same(before.get(name), value)
+    }
+
+
+def _same(old, new):
+    # A form turns a NULL text field into '' without anyone changing it
+    return old == new or (old in (None, '') and new in (None, ''))
+
+
+def actor():
+    """(user id, username) of the user whose request is being handled, or (None, '')."""
+    request = _request.get()
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk, user.get_username()
+    return None, ''
+
+
+@contextmanager
+def suppressed():
+    """Record nothing inside the block, for bulk housekeeping that keeps its own record (archiving)."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def is_suppressed():
+    return _suppressed.get()
+
+
+def record(instance, action, changes):
+    """Queue an entry for `instance`, to be written if and when the current transaction commits."""
+    if _suppressed.get() or (action == 'update' and not changes):
+        return
+    user_id, username = actor()
+    entry = AuditLog(
+        model=instance._meta.label_lower, object_id=instance.pk, object_repr=str(instance)[:200],
+        action=action, changes=changes, user_id=user_id, username=username,
+        # Written later by the flusher thread, which serves no branch: take the record's own now
+        branch=getattr(instance, 'branch', None) or branches.current_or_default(),
+    )
+    using = router.db_for_write(type(instance))
+    # The flusher thread runs outside the request, so the target database is decided now
+    alias = router.db_for_write(AuditLog)
+    transaction.on_commit(lambda: _enqueue(alias, entry), using=using)
+
+
+def _enqueue(alias, entry):
+    if not settings.AUDIT_ASYNC:
+        AuditLog.objects.using(alias).bulk_create([entry])
+        return
+    with _lock:
+        _buffer.append((alias, entry))
+        pending = len(_buffer)
+    _ensure_flusher()
+    if pending >= settings.AUDIT_BATCH_SIZE:
+        _wake.set()
+
+
+def flush():
+    """Write everything queued so far; returns the number of entries written."""
+    with _lock:
+        batch = _buffer[:]
+        del _buffer[:]
+    if not batch:
+        return 0
+    by_alias = {}
+    for alias, entry in batch:
+        by_alias.setdefault(alias, []).append(entry)
+    written = set()
+    for alias, entries in by_alias.items():
+        try:
+            AuditLog.objects.using(alias).bulk_create(entries, batch_size=settings.AUDIT_BATCH_SIZE)
+        except Exception:
+            # Entries of the databases already written are not retried
+            unwritten = [item for item in batch if item[0] == alias or item[0] not in written]
+            with _lock:
+                # Put them back in front for the next attempt, but never hold more than the limit
+                _buffer[:0] = unwritten
+                dropped = max(0, len(_buffer) - settings.AUDIT_BUFFER_LIMIT)
+                del _buffer[:dropped]
+            if dropped:
+                logger.error('Audit buffer full; dropped %d oldest entries', dropped)
+            raise
+        written.add(alias)
+    return len(batch)
+
+
+def catch_up():
+    """Flush before reading the log so a page shows this process's own recent changes."""
+    try:
+        flush()
+    except Exception:
+        logger.exception('Writing audit entries failed; the log may lag')
+
+
+def pending():
+    with _lock:
+        return len(_buffer)
+
+
+def _ensure_flusher():
+    # One flusher per process; a forked child (process pools) starts its own if it ever audits
+    if _flusher['pid'] == os.getpid() and _flusher['thread'].is_alive():
+        return
+    with _lock:
+        if _flusher['pid'] == os.getpid() and _flusher['thread'].is_alive():
+            return
+        thread = threading.Thread(target=_run, name='audit-flusher', daemon=True)
+        _flusher.update(thread=thread, pid=os.getpid())
+        thread.start()
+
+
+def _run():
+    while True:
+        _wake.wait(settings.AUDIT_FLUSH_SECONDS)
+        _wake.clear()
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Writing audit entries failed; will retry')
+
+
+@atexit.register
+def _flush_at_exit():
+    if _buffer:
+        try:
+            flush()
+        except Exception:
+            logger.exception('Audit entries lost at exit')
+
+
+def history(model, object_id, limit=20):
+    """Newest entries for one object, with each change labelled for display."""
+    catch_up()
+    return annotate(AuditLog.objects.filter(model=model._meta.label_lower, object_id=object_id)[:limit])
+
+
+def annotate(entries):
+    """Attach `rows` (see describe()) to each entry, for the history templates."""
+    entries = list(entries)
+    for entry in entries:
+        entry.rows = describe(apps.get_model(entry.model), entry.changes)
+    return entries
+
+
+def describe(model, changes):
+    """[(label, old, new)] with field verbose names and choice labels."""
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    rows = []
+    for name, (old, new) in changes.items():
+        field = fields.get(name)
+        if field is None:  # e.g. per-student attendance recorded on a lecture
+            rows.append((name, old, new))
+            continue
+        choices = dict(field.flatchoices)
+        rows.append((str(field.verbose_name).capitalize(), choices.get(old, old), choices.get(new, new)))
+    return rows
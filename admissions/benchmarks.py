@@ -0,0 +1,63 @@
+"""Shared helpers for the benchmark management commands."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+import django
+from django.conf import settings
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99/mean/max for a list of millisecond samples."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {}
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    return {
+        'n': len(ordered),
+        'p50_ms': round(pick(50), 3),
+        'p95_ms': round(pick(95), 3),
+        'p99_ms': round(pick(99), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def environment():
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        revision = ''
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': settings.DATABASES['default']['ENGINE'],
+        'platform': platform.platform(),
+    }
+
+
+def write_results(name, results, output=None):
+    """Write a results document as JSON and return its path.
+
+    Without an explicit `output`, files go to BASE_DIR/benchmarks/<name>-<timestamp>.json
+    so successive runs can be diffed.
+    """
+    document = {'benchmark': name, 'environment': environment(), 'results': results}
+    if output is None:
+        folder = os.path.join(settings.BASE_DIR, 'benchmarks')
+        os.makedirs(folder, exist_ok=True)
+        output = os.path.join(folder, f'{name}-{datetime.now():%Y%m%d-%H%M%S}.json')
+    with open(output, 'w') as fh:
+        json.dump(document, fh, indent=2, default=str)
+    return output
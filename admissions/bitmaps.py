@@ -0,0 +1,149 @@
+"""Bitset-encoded attendance: one `LectureAttendanceBitmap` row per lecture.
+
+Bit i of `present`/`absent` is the student at frozen roster position i
+(`LectureRosterEntry.position`); a student in neither set was not marked.
+Notes are kept sparsely in `AttendanceNote`. Per-student rates are summed with
+bit-sliced counters over every lecture that shares a roster.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttendanceNote, AttendanceRecord, Lecture, LectureAttendanceBitmap, LectureRosterEntry
+
+
+def encode(positions, size):
+    """Pack an iterable of set positions into little-endian bytes for `size` bits."""
+    value = 0
+    for position in positions:
+        value |= 1 << position
+    return value.to_bytes((size + 7) // 8, 'little')
+
+
+def decode(data, size):
+    """Unpack bytes into a list of `size` booleans."""
+    value = int.from_bytes(data, 'little')
+    return [bool(value >> i & 1) for i in range(size)]
+
+
+def set_bits(value):
+    """Yield the positions of the set bits in an int, lowest first."""
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+
+def roster(lecture_id):
+    """Student ids in frozen roster order."""
+    return list(
+        LectureRosterEntry.objects.filter(lecture_id=lecture_id).order_by('position').values_list('student_id', flat=True)
+    )
+
+
+def save_lecture(lecture, statuses, marked_by_id=None, notes=None):
+    """Store {student_id: 'present'|'absent'} (and optional {student_id: note}) for a frozen lecture."""
+    order = roster(lecture.pk)
+    position = {student_id: i for i, student_id in enumerate(order)}
+    present = [position[s] for s, status in statuses.items() if status == 'present']
+    absent = [position[s] for s, status in statuses.items() if status == 'absent']
+    fields = {
+        'size': len(order), 'present': encode(present, len(order)), 'absent': encode(absent, len(order)),
+        'marked_by_id': marked_by_id,
+    }
+    # Called inside the attendance view's transaction, so skip the savepoints update_or_create would add
+    with transaction.atomic(savepoint=False):
+        if not LectureAttendanceBitmap.objects.filter(lecture=lecture).update(marked_at=timezone.now(), **fields):
+            LectureAttendanceBitmap.objects.create(lecture=lecture, **fields)
+        if notes is not None:
+            AttendanceNote.objects.filter(lecture=lecture).delete()
+            AttendanceNote.objects.bulk_create([
+                AttendanceNote(lecture=lecture, position=position[s], notes=text) for s, text in notes.items() if text
+            ])
+
+
+def lecture_statuses(lecture):
+    """{student_id: status} for the marked students of one lecture, or {} if it has no bitmap."""
+    bitmap = LectureAttendanceBitmap.objects.filter(lecture=lecture).values('present', 'absent').first()
+    if bitmap is None:
+        return {}
+    order = roster(lecture.pk)
+    statuses = {order[i]: 'present' for i in set_bits(int.from_bytes(bitmap['present'], 'little'))}
+    statuses.update({order[i]: 'absent' for i in set_bits(int.from_bytes(bitmap['absent'], 'little'))})
+    return statuses
+
+
+def student_rates(lectures):
+    """{student_id: (present, marked)} over a Lecture queryset, from the bitmaps alone."""
+    bitmaps = list(
+        LectureAttendanceBitmap.objects.filter(lecture__in=lectures).values_list('lecture_id', 'present', 'absent')
+    )
+    rosters = defaultdict(list)
+    for lecture_id, student_id in (
+        LectureRosterEntry.objects.filter(lecture_id__in=[b[0] for b in bitmaps])
+        .order_by('lecture_id', 'position').values_list('lecture_id', 'student_id')
+    ):
+        rosters[lecture_id].append(student_id)
+    return tally(bitmaps, rosters)
+
+
+def _add(planes, value):
+    """Add one bit per position of `value` into bit-sliced counters (planes[k] holds bit k of each count)."""
+    carry = value
+    for k, plane in enumerate(planes):
+        planes[k], carry = plane ^ carry, plane & carry
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def _counts(planes, size):
+    return [sum((plane >> i & 1) << k for k, plane in enumerate(planes)) for i in range(size)]
+
+
+def tally(bitmaps, rosters):
+    """Aggregate (lecture_id, present bytes, absent bytes) rows given {lecture_id: [student ids]}."""
+    # Lectures of one batch share a roster, so each group is summed with whole-int bit operations
+    # and only mapped back to students once at the end
+    per_roster = {}
+    for lecture_id, present, absent in bitmaps:
+        present = int.from_bytes(present, 'little')
+        present_planes, marked_planes = per_roster.setdefault(tuple(rosters[lecture_id]), ([], []))
+        _add(present_planes, present)
+        _add(marked_planes, present | int.from_bytes(absent, 'little'))
+    rates = defaultdict(lambda: [0, 0])
+    for order, (present_planes, marked_planes) in per_roster.items():
+        for student_id, present, marked in zip(order, _counts(present_planes, len(order)),
+                                               _counts(marked_planes, len(order))):
+            if marked:
+                rates[student_id][0] += present
+                rates[student_id][1] += marked
+    return {student_id: tuple(counts) for student_id, counts in rates.items()}
+
+
+def convert_lecture(lecture):
+    """Build the bitmap (and notes) for a lecture from its AttendanceRecord rows; returns rows converted."""
+    records = list(AttendanceRecord.objects.filter(lecture=lecture).values('student_id', 'status', 'marked_by_id', 'notes'))
+    if not records:
+        return 0
+    with transaction.atomic():
+        in_roster = set(LectureRosterEntry.objects.filter(lecture=lecture).values_list('student_id', flat=True))
+        missing = [r['student_id'] for r in records if r['student_id'] not in in_roster]
+        if missing:
+            # Lectures marked before rosters were frozen (or for students added later) get those students appended
+            start = len(in_roster)
+            LectureRosterEntry.objects.bulk_create([
+                LectureRosterEntry(lecture=lecture, student_id=student_id, position=start + i)
+                for i, student_id in enumerate(sorted(missing))
+            ])
+            if lecture.roster_frozen_at is None:
+                lecture.roster_frozen_at = timezone.now()
+                Lecture.objects.filter(pk=lecture.pk).update(roster_frozen_at=lecture.roster_frozen_at)
+        save_lecture(
+            lecture,
+            {r['student_id']: r['status'] for r in records},
+            marked_by_id=next((r['marked_by_id'] for r in records if r['marked_by_id']), None),
+            notes={r['student_id']: r['notes'] for r in records if r['notes']},
+        )
+    return len(records)
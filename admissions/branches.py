@@ -0,0 +1,219 @@
+"""Branch (centre) partitioning.
+
+Enquiries, admissions, faculty, lectures, attendance, payments and activity
+events carry the code of the branch they belong to. `BranchMiddleware` picks
+the branch for each request and `BranchManager` (the default manager of
+those models) limits every query to it, so views never filter by hand.
+
+The branch comes from, in order: BRANCH_HOSTS (a host pinned to one
+branch), the faculty's own branch, the branch a staff member switched to,
+then DEFAULT_BRANCH. Code outside a request (management commands, the
+shell) is not scoped and sees every branch unless it uses `activate()`.
+
+With BRANCH_DATABASES on, each branch other than the default keeps all of
+its tables in its own database (a SQLite file or a Postgres schema) and
+`routers.BranchRouter` sends its queries there; rows then need no filter.
+`fan_out()` runs a function once per branch in parallel for reports.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+SESSION_KEY = 'branch'
+
+_current = ContextVar('branch', default=None)
+
+
+def current():
+    """Code of the branch being served, or None outside a request and `activate()`."""
+    return _current.get()
+
+
+def current_or_default():
+    """Default for new rows: the branch being served, else DEFAULT_BRANCH."""
+    return _current.get() or settings.DEFAULT_BRANCH
+
+
+def database_for(code):
+    """Database alias holding `code`'s rows, or None when it shares the default database."""
+    return settings.BRANCH_DATABASES.get(code)
+
+
+def scope():
+    """Branch code queries must be filtered by, or None when they need no filter.
+
+    Nothing is filtered with a single branch, outside a request, or when the
+    branch has a database of its own.
+    """
+    code = _current.get()
+    if code is None or len(settings.BRANCHES) == 1 or database_for(code):
+        return None
+    return code
+
+
+@contextmanager
+def activate(code):
+    """Serve `code` inside the block (scoping, routing and defaults for new rows)."""
+    if code not in settings.BRANCHES:
+        raise ValueError(f'Unknown branch {code!r}')
+    token = _current.set(code)
+    try:
+        yield code
+    finally:
+        _current.reset(token)
+
+
+def name(code):
+    return settings.BRANCHES.get(code, code)
+
+
+def fan_out(func, codes=None, workers=None):
+    """{code: func()} for each branch, with every call run under `activate(code)`.
+
+    Calls run on a thread pool (BRANCH_REPORT_WORKERS, default one per
+    branch), each on its own database connection, so a report over N
+    branches takes about as long as the slowest branch rather than the sum.
+    """
+    codes = list(codes or settings.BRANCHES)
+    workers = min(workers or settings.BRANCH_REPORT_WORKERS or len(codes), len(codes))
+    if workers <= 1:
+        return {code: _call_in(code, func) for code in codes}
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='branch-report') as pool:
+        futures = {code: pool.submit(_call_in_thread, code, func) for code in codes}
+        return {code: future.result() for code, future in futures.items()}
+
+
+def _call_in(code, func):
+    with activate(code):
+        return func()
+
+
+def _call_in_thread(code, func):
+    try:
+        return _call_in(code, func)
+    finally:
+        connections.close_all()  # This worker thread's connections only
+
+
+def _pinned_branch(request):
+    hosts = settings.BRANCH_HOSTS
+    return hosts.get(request.get_host().rsplit(':', 1)[0]) if hosts else None
+
+
+def choose(request):
+    """The branch a request that is not pinned by its host should see.
+
+    Branches with their own database are only reachable through their host:
+    this request's session and user live in the default database.
+    """
+    access = request.access
+    if access.is_faculty:
+        chosen = access.faculty_branch
+    elif access.is_staff:
+        chosen = request.session.get(SESSION_KEY)
+    else:
+        chosen = None
+    if chosen in settings.BRANCHES and not database_for(chosen):
+        return chosen
+    return settings.DEFAULT_BRANCH
+
+
+def switchable():
+    """[(code, name)] a staff member can switch between on this deployment."""
+    return [(code, label) for code, label in settings.BRANCHES.items() if not database_for(code)]
+
+
+class BranchMiddleware:
+    """Sets the branch for the request, and for any streamed response body produced after it returns.
+
+    Goes before SessionMiddleware so that, with BRANCH_DATABASES, sessions
+    and users are read from a host-pinned branch's own database. The user's
+    own choice is applied in process_view, once the session and
+    `request.access` are available.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._bind_stream(request, response)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._bind_stream(request, response)
+
+    def _start(self, request):
+        pinned = _pinned_branch(request)
+        request.branch_pinned = pinned is not None
+        request.branch = pinned or settings.DEFAULT_BRANCH
+        return _current.set(request.branch)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.branch_pinned or len(settings.BRANCHES) == 1:
+            return None
+        request.branch = choose(request)
+        _current.set(request.branch)
+        return None
+
+    def _bind_stream(self, request, response):
+        # Streamed bodies (exports, live events) run their queries after __call__ has returned
+        if len(settings.BRANCHES) > 1 and response.streaming and not getattr(response, 'file_to_stream', None):
+            response.streaming_content = _bound(response.streaming_content, request.branch)
+        return response
+
+
+def _bound(content, code):
+    if hasattr(content, '__aiter__'):
+        async def agen():
+            iterator = aiter(content)
+            try:
+                while True:
+                    token = _current.set(code)
+                    try:
+                        part = await anext(iterator)
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        _current.reset(token)
+                    yield part
+            finally:
+                if hasattr(iterator, 'aclose'):  # e.g. live events unsubscribing on disconnect
+                    await iterator.aclose()
+        return agen()
+
+    def gen():
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current.set(code)
+                try:
+                    part = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield part
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+    return gen()
@@ -0,0 +1,168 @@
+"""iCalendar timetable feeds for faculty and class batches.
+
+Rendered VEVENTs are cached per feed scope with a version number that lecture
+saves and deletes patch in place; the version doubles as the feed's ETag.
+Use a shared cache backend when serving from more than one worker process.
+
+Scopes of a branch other than DEFAULT_BRANCH start with `<branch>/`, since
+feeds are fetched without a login and so without a branch of their own;
+scopes (and tokens) of the default branch keep their original form.
+"""
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import branches
+
+FEED_PAST_DAYS = 60
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+TOKEN_SALT = 'admissions.calendar_feed'
+
+
+def _in_branch(scope, branch):
+    branch = branch or branches.current_or_default()
+    return scope if branch == settings.DEFAULT_BRANCH else f'{branch}/{scope}'
+
+
+def faculty_scope(faculty_id, branch=None):
+    """Scope of one faculty's feed in `branch` (default: the branch being served)."""
+    return _in_branch(f'faculty:{faculty_id}', branch)
+
+
+def batch_scope(standard, batch, branch=None):
+    return _in_branch(f'batch:{standard}:{batch}', branch)
+
+
+def lecture_scopes(lecture):
+    return {faculty_scope(lecture.faculty_id, lecture.branch), batch_scope(lecture.standard, lecture.batch, lecture.branch)}
+
+
+def split_scope(scope):
+    """(branch, scope without the branch prefix)."""
+    head, _, _ = scope.partition(':')
+    if '/' in head:
+        branch, _, scope = scope.partition('/')
+        return branch, scope
+    return settings.DEFAULT_BRANCH, scope
+
+
+def feed_token(scope):
+    """Signed, URL-safe token so feeds can be subscribed to without a login."""
+    return signing.dumps(scope, salt=TOKEN_SALT, compress=True)
+
+
+def scope_from_token(token):
+    """Return the scope for a token; raises signing.BadSignature if tampered with."""
+    return signing.loads(token, salt=TOKEN_SALT)
+
+
+def _cache_key(scope):
+    return f'ical:{scope}'
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line):
+    # RFC 5545 lines are limited to 75 octets; continuation lines start with a space
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line
+    parts = []
+    while raw:
+        cut = 75 if not parts else 74
+        chunk = raw[:cut]
+        # Never split inside a multi-byte UTF-8 sequence
+        while chunk and len(chunk) < len(raw) and (raw[len(chunk)] & 0xC0) == 0x80:
+            chunk = chunk[:-1]
+        parts.append(chunk.decode('utf-8'))
+        raw = raw[len(chunk):]
+    return '\r\n '.join(parts)
+
+
+def render_event(lecture):
+    start = datetime.combine(lecture.date, lecture.start_time)
+    end = datetime.combine(lecture.date, lecture.end_time)
+    stamp = (lecture.updated_at or timezone.now()).astimezone(dt_timezone.utc)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:lecture-{lecture.pk}@super20academy',
+        f'DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}',
+        f'DTSTART:{start:%Y%m%dT%H%M%S}',
+        f'DTEND:{end:%Y%m%dT%H%M%S}',
+        f'SUMMARY:{_escape(lecture.title)} ({_escape(lecture.get_standard_display())} / {_escape(lecture.batch)})',
+    ]
+    if lecture.description:
+        lines.append(f'DESCRIPTION:{_escape(lecture.description)}')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def _scope_queryset(scope):
+    from .models import Lecture
+
+    cutoff = timezone.localdate() - timedelta(days=FEED_PAST_DAYS)
+    kind, _, rest = split_scope(scope)[1].partition(':')
+    lectures = Lecture.objects.filter(date__gte=cutoff)
+    if kind == 'faculty':
+        return lectures.filter(faculty_id=int(rest))
+    standard, _, batch = rest.partition(':')
+    return lectures.filter(standard=standard, batch=batch)
+
+
+def _build(scope):
+    with branches.activate(split_scope(scope)[0]):
+        events = {lec.pk: render_event(lec) for lec in _scope_queryset(scope).order_by('date', 'start_time')}
+    entry = {'version': time.time_ns(), 'events': events}
+    cache.set(_cache_key(scope), entry, FEED_CACHE_TIMEOUT)
+    return entry
+
+
+def get_entry(scope):
+    return cache.get(_cache_key(scope)) or _build(scope)
+
+
+def feed_etag(scope):
+    return f'{zlib.crc32(scope.encode()):x}-{get_entry(scope)["version"]}'
+
+
+def render_feed(scope, name):
+    entry = get_entry(scope)
+    header = (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        'PRODID:-//Super20 Academy//Timetable//EN\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        f'{_fold("X-WR-CALNAME:" + _escape(name))}\r\n'
+    )
+    return header + ''.join(entry['events'].values()) + 'END:VCALENDAR\r\n'
+
+
+def lecture_changed(lecture, previous_scopes=(), deleted=False):
+    """Patch the cached events of every scope the lecture is or was part of."""
+    current = set() if deleted else lecture_scopes(lecture)
+    entries = {}
+    for scope in current | set(previous_scopes):
+        entry = cache.get(_cache_key(scope))
+        # Scopes with nothing cached are built from the database on the next request
+        if entry is not None:
+            entries[scope] = entry
+    if not entries:
+        return
+    event = None
+    if not deleted:
+        # Views assign raw POST strings to date/time fields, so render from the saved row
+        event = render_event(type(lecture)._base_manager.get(pk=lecture.pk))
+    for scope, entry in entries.items():
+        if scope in current:
+            entry['events'][lecture.pk] = event
+        else:
+            entry['events'].pop(lecture.pk, None)
+        entry['version'] += 1
+        cache.set(_cache_key(scope), entry, FEED_CACHE_TIMEOUT)
@@ -0,0 +1,217 @@
+"""ID-card and roster page rendering, kept free of ORM access so it can run in worker processes.
+
+Each job renders one A4 page with Pillow and returns it as JPEG bytes;
+`pdf_parts()` wraps those pages in a PDF as they arrive. Photos are read
+through `thumbnail()`, which keeps a downscaled copy under
+MEDIA_ROOT/derivatives/ so later runs never decode the full upload again.
+"""
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+
+DPI = 150
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+PAGE_POINTS = (595.28, 841.89)
+CARD_SIZE = (506, 319)  # CR80, 85.6 x 54 mm
+CARD_GRID = (2, 4)
+CARDS_PER_PAGE = CARD_GRID[0] * CARD_GRID[1]
+ROSTER_ROWS_PER_PAGE = 25
+CARD_PHOTO = 150
+CARD_LABELS = ('Standard', 'Batch', 'Mobile', 'ID')
+DERIVATIVE_SIZE = CARD_PHOTO  # cards paste the derivative as-is
+MARGIN = 60
+INK = (33, 37, 41)
+ACCENT = (25, 135, 84)
+MUTED = (108, 117, 125)
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+
+    return ImageFont.load_default(size)
+
+
+def derivative_path(media_root, photo_name):
+    """Where the square thumbnail of an uploaded photo lives; changes whenever the upload does."""
+    stat = os.stat(os.path.join(media_root, photo_name))
+    digest = hashlib.sha1(f'{photo_name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(photo_name))[0]
+    return os.path.join(media_root, 'derivatives', 'photos', f'{stem}-{digest}.jpg')
+
+
+def thumbnail(media_root, photo_name):
+    """A DERIVATIVE_SIZE square RGB thumbnail of a student photo, or None if there is none."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if not photo_name:
+        return None
+    try:
+        path = derivative_path(media_root, photo_name)
+        if os.path.exists(path):
+            return Image.open(path)
+        with Image.open(os.path.join(media_root, photo_name)) as original:
+            # For JPEGs, draft() has the decoder scale down by up to 8x instead of decoding every pixel
+            original.draft('RGB', (DERIVATIVE_SIZE, DERIVATIVE_SIZE))
+            image = ImageOps.fit(ImageOps.exif_transpose(original).convert('RGB'),
+                                 (DERIVATIVE_SIZE, DERIVATIVE_SIZE), Image.Resampling.LANCZOS)
+    except (OSError, UnidentifiedImageError):
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.part'
+    image.save(partial, 'JPEG', quality=88)
+    os.replace(partial, path)
+    return image
+
+
+def _photo(draw, page, media_root, student, box):
+    from PIL import Image
+
+    left, top, size = box
+    image = thumbnail(media_root, student['photo'])
+    if image is None:
+        draw.rectangle((left, top, left + size, top + size), fill=(233, 236, 239))
+        initials = (student['name'][:1] + student['surname'][:1]).upper()
+        draw.text((left + size / 2, top + size / 2), initials, font=_font(size // 3), fill=MUTED, anchor='mm')
+        return
+    if image.size != (size, size):
+        image = image.resize((size, size), Image.Resampling.BILINEAR)
+    page.paste(image, (left, top))
+
+
+def _full_name(student):
+    return ' '.join(part for part in (student['surname'], student['name'], student['middlename']) if part)
+
+
+def _fit(text, font, width):
+    while text and font.getlength(text) > width:
+        text = text[:-1]
+    return text
+
+
+@lru_cache(maxsize=None)
+def _blank_card(academy):
+    """Frame, header and field labels, which are the same on every card; drawn once per process."""
+    from PIL import Image, ImageDraw
+
+    card = Image.new('RGB', (CARD_SIZE[0] + 1, CARD_SIZE[1] + 1), 'white')
+    draw = ImageDraw.Draw(card)
+    right, bottom = CARD_SIZE
+    draw.rounded_rectangle((0, 0, right, bottom), radius=18, outline=MUTED, width=2)
+    draw.rounded_rectangle((0, 0, right, 56), radius=18, fill=ACCENT)
+    draw.rectangle((0, 38, right, 56), fill=ACCENT)
+    draw.text((right / 2, 28), academy, font=_font(26), fill='white', anchor='mm')
+    for offset, label in enumerate(CARD_LABELS):
+        draw.text((190, 128 + offset * 36), label, font=_font(18), fill=MUTED)
+    return card
+
+
+def render_card_page(students, media_root, academy):
+    """Up to CARDS_PER_PAGE ID cards, laid out on cutting guides."""
+    from PIL import Image, ImageDraw
+
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    blank = _blank_card(academy)
+    columns, _ = CARD_GRID
+    gap_x = (PAGE_SIZE[0] - 2 * MARGIN - columns * CARD_SIZE[0]) // max(columns - 1, 1)
+    for index, student in enumerate(students):
+        left = MARGIN + (index % columns) * (CARD_SIZE[0] + gap_x)
+        top = MARGIN + (index // columns) * (CARD_SIZE[1] + 40)
+        page.paste(blank, (left, top))
+        _photo(draw, page, media_root, student, (left + 20, top + 76, CARD_PHOTO))
+        text_left = left + 190
+        width = left + CARD_SIZE[0] - text_left - 16
+        draw.text((text_left, top + 82), _fit(_full_name(student), _font(26), width), font=_font(26), fill=INK)
+        values = (student['standard_label'], student['batch'] or '-', student['mobile_1'], f"S20-{student['id']:05d}")
+        for offset, value in enumerate(values):
+            draw.text((text_left + 100, top + 128 + offset * 36), _fit(str(value), _font(20), width - 100),
+                      font=_font(20), fill=INK)
+    return page
+
+
+def render_roster_page(title, students, start, page_label, media_root, academy):
+    """One page of a class roster: serial, photo, name, ID and mobile per row."""
+    from PIL import Image, ImageDraw
+
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    draw.text((MARGIN, MARGIN), academy, font=_font(34), fill=ACCENT)
+    draw.text((MARGIN, MARGIN + 48), title, font=_font(28), fill=INK)
+    draw.text((PAGE_SIZE[0] - MARGIN, MARGIN + 52), page_label, font=_font(20), fill=MUTED, anchor='ra')
+    columns = [('#', MARGIN), ('Photo', MARGIN + 70), ('Name', MARGIN + 160), ('Student ID', MARGIN + 720),
+               ('Mobile', MARGIN + 880)]
+    header_y = MARGIN + 110
+    for label, x in columns:
+        draw.text((x, header_y), label, font=_font(20), fill=MUTED)
+    draw.line((MARGIN, header_y + 30, PAGE_SIZE[0] - MARGIN, header_y + 30), fill=MUTED, width=2)
+    row_height = 58
+    for offset, student in enumerate(students):
+        y = header_y + 40 + offset * row_height
+        middle = y + row_height / 2 - 4
+        draw.text((columns[0][1], middle), str(start + offset), font=_font(20), fill=INK, anchor='lm')
+        _photo(draw, page, media_root, student, (columns[1][1], y, row_height - 8))
+        draw.text((columns[2][1], middle), _fit(_full_name(student), _font(22), 540), font=_font(22), fill=INK,
+                  anchor='lm')
+        draw.text((columns[3][1], middle), f"S20-{student['id']:05d}", font=_font(20), fill=INK, anchor='lm')
+        draw.text((columns[4][1], middle), student['mobile_1'], font=_font(20), fill=INK, anchor='lm')
+        draw.line((MARGIN, y + row_height - 4, PAGE_SIZE[0] - MARGIN, y + row_height - 4), fill=(222, 226, 230))
+    return page
+
+
+def render_page_job(job):
+    """Process-pool entry point: (kind, args, media_root, academy) -> JPEG bytes of one page."""
+    kind, args, media_root, academy = job
+    if kind == 'cards':
+        page = render_card_page(*args, media_root=media_root, academy=academy)
+    else:
+        page = render_roster_page(*args, media_root=media_root, academy=academy)
+    buffer = BytesIO()
+    # 4:4:4 keeps small coloured text sharp
+    page.save(buffer, 'JPEG', quality=88, subsampling=0, dpi=(DPI, DPI))
+    return buffer.getvalue()
+
+
+def pdf_parts(pages, size=PAGE_SIZE, points=PAGE_POINTS):
+    """Yield a PDF, a page at a time, from an iterable of full-page JPEGs.
+
+    The page tree is written last so pages can be sent before their count is known.
+    """
+    offsets = {}
+    written = 0
+    kids = []
+
+    def obj(number, body, stream=None):
+        nonlocal written
+        offsets[number] = written
+        data = f'{number} 0 obj\n'.encode() + body
+        if stream is not None:
+            data += b'\nstream\n' + stream + b'\nendstream'
+        data += b'\nendobj\n'
+        written += len(data)
+        return data
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    written = len(header)
+    yield header + obj(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    number = 3
+    for jpeg in pages:
+        image, content, page = number, number + 1, number + 2
+        number += 3
+        drawing = f'q {points[0]} 0 0 {points[1]} 0 0 cm /Im0 Do Q'.encode()
+        kids.append(page)
+        yield (
+            obj(image, f'<< /Type /XObject /Subtype /Image /Width {size[0]} /Height {size[1]} '
+                       f'/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode '
+                       f'/Length {len(jpeg)} >>'.encode(), jpeg)
+            + obj(content, f'<< /Length {len(drawing)} >>'.encode(), drawing)
+            + obj(page, f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {points[0]} {points[1]}] '
+                        f'/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R >>'.encode())
+        )
+    tail = obj(2, f'<< /Type /Pages /Count {len(kids)} /Kids [{" ".join(f"{k} 0 R" for k in kids)}] >>'.encode())
+    xref = [f'xref\n0 {number}\n', '0000000000 65535 f \n']
+    xref += [f'{offsets[n]:010d} 00000 n \n' for n in range(1, number)]
+    yield tail + ''.join(xref).encode() + (
+        f'trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{written}\n%%EOF\n'
+    ).encode()
@@ -0,0 +1,150 @@
+"""Batch ID cards and class rosters as one streamed PDF.
+
+Students are read once up front; pages are then rendered in a process pool
+(`document_pages`, no ORM) and written into the PDF in order as each one
+finishes, so the first pages reach the browser while later ones render.
+One pool of DOCUMENT_WORKERS processes is shared by every request.
+"""
+import atexit
+import threading
+from itertools import groupby
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
+
+from . import document_pages
+from .models import Admission
+
+KINDS = {
+    'id-cards': 'ID cards',
+    'roster': 'Class roster',
+}
+ACADEMY = 'Super20 Academy'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def students(standard, batch=None):
+    """Plain dicts for the students of a standard (optionally one batch), in print order."""
+    admissions = Admission.objects.filter(standard=standard)
+    if batch:
+        admissions = admissions.filter(batch=batch)
+    labels = dict(Admission.STANDARD_CHOICES)
+    rows = list(
+        admissions.order_by('batch', 'surname', 'name', 'id')
+        .values('id', 'surname', 'name', 'middlename', 'standard', 'batch', 'mobile_1', 'photo')
+    )
+    for row in rows:
+        row['standard_label'] = labels.get(row['standard'], row['standard'])
+    return rows
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def page_jobs(kind, rows):
+    """(kind, args, media_root, academy) tuples for `document_pages.render_page_job`, one per page."""
+    media_root = str(settings.MEDIA_ROOT)
+    if kind == 'id-cards':
+        return [('cards', (chunk,), media_root, ACADEMY)
+                for chunk in _chunks(rows, document_pages.CARDS_PER_PAGE)]
+    jobs = []
+    # A roster starts on a fresh page for every batch
+    for batch, members in groupby(rows, key=lambda r: r['batch']):
+        members = list(members)
+        title = f"{members[0]['standard_label']} / {batch or 'No batch'} ({len(members)} students)"
+        chunks = _chunks(members, document_pages.ROSTER_ROWS_PER_PAGE)
+        for number, chunk in enumerate(chunks, start=1):
+            start = (number - 1) * document_pages.ROSTER_ROWS_PER_PAGE + 1
+            jobs.append(('roster', (title, chunk, start, f'Page {number} of {len(chunks)}'), media_root, ACADEMY))
+    return jobs
+
+
+def render(kind, rows, workers=None):
+    """Yield the PDF for `rows` (from `students()`) in pieces, rendering pages in parallel.
+
+    Pages go to the pool every request shares (see `shared_pool()`); an
+    explicit `workers` count gets a pool of its own, for benchmarks.
+    """
+    jobs = page_jobs(kind, rows)
+    if len(jobs) <= 1 or (workers or settings.DOCUMENT_WORKERS) == 1:
+        yield from document_pages.pdf_parts(map(document_pages.render_page_job, jobs))
+    elif workers:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from document_pages.pdf_parts(pool.map(document_pages.render_page_job, jobs))
+    else:
+        from concurrent.futures.process import BrokenProcessPool
+
+        pool = shared_pool()
+        try:
+            # map() hands pages back in order as soon as each is ready, and cancels the
+            # pages still queued if this generator is closed early
+            yield from document_pages.pdf_parts(pool.map(document_pages.render_page_job, jobs))
+        except BrokenProcessPool:
+            _discard(pool)
+            raise
+
+
+def shared_pool():
+    """The process pool every print run shares, started on first use.
+
+    However many requests print at once, they never run more than
+    DOCUMENT_WORKERS rendering processes between them.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Only print runs need a process pool; keep it out of worker startup
+            from concurrent.futures import ProcessPoolExecutor
+
+            _pool = ProcessPoolExecutor(max_workers=settings.DOCUMENT_WORKERS)
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
+
+
+def _discard(pool):
+    # A crashed page process breaks the whole pool; the next print run starts a new one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def stream(kind, rows, asynchronous=True):
+    """`render()` as an async iterator for the ASGI server, or as-is under WSGI."""
+    parts = render(kind, rows)
+    return _off_loop(parts) if asynchronous else parts
+
+
+async def _off_loop(parts):
+    # Rendering touches no database, so it need not queue behind the thread that owns the connection.
+    # Steps may land on different threads; the lock keeps close() from racing a step still running
+    # after the client went away.
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(parts, None)
+
+    def close():
+        with lock:
+            parts.close()
+
+    try:
+        while (data := await sync_to_async(step, thread_sensitive=False)()) is not None:
+            yield data
+    finally:
+        # Stops rendering when the client disconnects: queued pages are cancelled
+        await sync_to_async(close, thread_sensitive=False)()
+
+
+def filename(kind, standard, batch=None):
+    parts = ['Super20', kind.replace('-', '_').title(), standard] + ([batch] if batch else [])
+    return get_valid_filename('_'.join(parts) + '.pdf')
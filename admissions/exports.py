@@ -0,0 +1,300 @@
+"""Exports: styled XLSX reports and streaming CSV / gzip JSONL dumps.
+
+openpyxl (and the Pillow it pulls in) is imported inside each builder, so
+workers and management commands only pay for it when an export is made.
+
+`stream()` is a generator pipeline: rows come from `values_list().iterator()`
+in chunks, are encoded a batch at a time and, for .gz formats, pass through
+one incremental zlib compressor, so memory stays flat however many rows
+are dumped and the first bytes leave before the query is exhausted.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from io import BytesIO, StringIO
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.utils import timezone
+
+from .models import Admission, AttendanceRecord, Enquiry, Payment
+
+# dataset -> (queryset factory, [(column, lookup), ...])
+DATASETS = {
+    'enquiries': (lambda: Enquiry.objects.order_by('id'), [
+        ('id', 'id'), ('student_name', 'student_name'), ('guardian_name', 'guardian_name'),
+        ('phone_number', 'phone_number'), ('preferred_course', 'preferred_course'),
+        ('enquiry_date', 'enquiry_date'), ('status', 'status'), ('followup_date', 'followup_date'), ('notes', 'notes'),
+    ]),
+    'admissions': (lambda: Admission.objects.order_by('id'), [
+        ('id', 'id'), ('surname', 'surname'), ('name', 'name'), ('middlename', 'middlename'),
+        ('standard', 'standard'), ('batch', 'batch'), ('stream', 'stream'), ('date_of_birth', 'date_of_birth'),
+        ('father_name', 'father_name'), ('mother_name', 'mother_name'), ('mobile_1', 'mobile_1'),
+        ('mobile_2', 'mobile_2'), ('school_college', 'school_college'), ('submitted_at', 'submitted_at'),
+    ]),
+    'attendance': (lambda: AttendanceRecord.objects.order_by('id'), [
+        ('id', 'id'), ('lecture_id', 'lecture_id'), ('lecture_date', 'lecture__date'), ('lecture_title', 'lecture__title'),
+        ('student_id', 'student_id'), ('surname', 'student__surname'), ('name', 'student__name'),
+        ('status', 'status'), ('marked_by', 'marked_by__full_name'), ('marked_at', 'marked_at'), ('notes', 'notes'),
+    ]),
+    'payments': (lambda: Payment.objects.with_lecture_counts().order_by('month', 'faculty_id'), [
+        ('id', 'id'), ('faculty_id', 'faculty_id'), ('faculty', 'faculty__full_name'), ('month', 'month'),
+        ('lectures', 'lecture_total'), ('per_lecture_rate', 'per_lecture_rate'), ('amount_paid', 'amount_paid'),
+        ('notes', 'notes'),
+    ]),
+}
+# format -> (content type, encoder, gzip?)
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv', False),
+    'csv.gz': ('application/gzip', 'csv', True),
+    'jsonl.gz': ('application/gzip', 'jsonl', True),
+}
+STREAM_CHUNK_ROWS = 2000
+
+
+# A spreadsheet opening the file would evaluate text starting with these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def spreadsheet_safe(value):
+    """`value`, with a leading `'` if it is text a spreadsheet would take for a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat(timespec='seconds')
+    return '' if value is None else spreadsheet_safe(value)
+
+
+def _encode_csv(columns, rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_jsonl(columns, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in rows).encode()
+
+
+def _header(encoding, columns):
+    if encoding == 'csv':
+        buffer = StringIO()
+        csv.writer(buffer).writerow(columns)
+        return buffer.getvalue().encode()
+    return b''
+
+
+def export_filename(dataset, fmt):
+    return f'Super20_{dataset.title()}_{datetime.now():%Y%m%d_%H%M}.{fmt}'
+
+
+def stream(dataset, fmt, chunk_rows=STREAM_CHUNK_ROWS, asynchronous=True):
+    """Iterator over the encoded (and possibly gzipped) bytes of a full dataset dump.
+
+    Async by default for the ASGI server; pass asynchronous=False under WSGI,
+    where Django would otherwise buffer an async iterator in full.
+    """
+    factory, spec = DATASETS[dataset]
+    queryset = factory()
+    # The body is read after the view returns, so pick the database (replica or primary) now
+    queryset = queryset.using(router.db_for_read(queryset.model))
+    _, encoding, compressed = FORMATS[fmt]
+    parts = _encoded_parts(queryset, spec, encoding, compressed, chunk_rows)
+    return _in_thread(parts) if asynchronous else parts
+
+
+def _encoded_parts(queryset, spec, encoding, compressed, chunk_rows):
+    columns = [column for column, _ in spec]
+    encode = _encode_csv if encoding == 'csv' else _encode_jsonl
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compressed else None
+    rows = queryset.values_list(*[lookup for _, lookup in spec]).iterator(chunk_size=chunk_rows)
+    pending = _header(encoding, columns)
+    while True:
+        batch = list(islice(rows, chunk_rows))
+        if batch:
+            pending += encode(columns, batch)
+        data = compressor.compress(pending) if compressor else pending
+        pending = b''
+        if len(batch) < chunk_rows:
+            if compressor:
+                data += compressor.flush()
+            if data:
+                yield data
+            return
+        if data:
+            yield data
+
+
+async def _in_thread(parts):
+    # Fetching, encoding and compressing a batch all happen off the event loop, on the
+    # thread that owns the database connection
+    step = sync_to_async(next)
+    while (data := await step(parts, None)) is not None:
+        yield data
+
+
+def enquiries_workbook(enquiries):
+    """Enquiries report as XLSX bytes."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    # Create workbook and worksheet
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Enquiries Report"
+    
+    # Define styles
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    
+    # Define borders
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    # Add title
+    ws.merge_cells('A1:H1')
+    title_cell = ws['A1']
+    title_cell.value = f"Super20 Academy - Enquiries Report (Generated on {datetime.now().strftime('%d/%m/%Y %H:%M')})"
+    title_cell.font = Font(bold=True, size=16)
+    title_cell.alignment = Alignment(horizontal="center")
+    
+    # Add headers
+    headers = [
+        'ID', 'Student Name', 'Guardian Name', 'Phone Number', 
+        'Preferred Course', 'Enquiry Date', 'Status', 'Notes'
+    ]
+    
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=3, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+    
+    # Add data
+    row = 4
+    for enquiry in enquiries:
+        ws.cell(row=row, column=1, value=enquiry.id).border = thin_border
+        ws.cell(row=row, column=2, value=spreadsheet_safe(enquiry.student_name)).border = thin_border
+        ws.cell(row=row, column=3, value=spreadsheet_safe(enquiry.guardian_name)).border = thin_border
+        ws.cell(row=row, column=4, value=spreadsheet_safe(enquiry.phone_number)).border = thin_border
+        ws.cell(row=row, column=5, value=enquiry.get_preferred_course_display()).border = thin_border
+        ws.cell(row=row, column=6, value=enquiry.enquiry_date.strftime('%d/%m/%Y %H:%M')).border = thin_border
+        ws.cell(row=row, column=7, value=enquiry.get_status_display()).border = thin_border
+        ws.cell(row=row, column=8, value=spreadsheet_safe(enquiry.notes or '')).border = thin_border
+        row += 1
+    
+    # Auto-adjust column widths
+    for column in ws.columns:
+        max_length = 0
+        column_letter = get_column_letter(column[0].column)
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = min(max_length + 2, 50)
+        ws.column_dimensions[column_letter].width = adjusted_width
+    
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def admissions_workbook(admissions):
+    """Admissions report as XLSX bytes."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    # Create workbook and worksheet
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Admissions Report"
+    
+    # Define styles
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    
+    # Define borders
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    # Add title
+    ws.merge_cells('A1:L1')
+    title_cell = ws['A1']
+    title_cell.value = f"Super20 Academy - Admissions Report (Generated on {datetime.now().strftime('%d/%m/%Y %H:%M')})"
+    title_cell.font = Font(bold=True, size=16)
+    title_cell.alignment = Alignment(horizontal="center")
+    
+    # Add headers
+    headers = [
+        'ID', 'Full Name', 'Standard', 'Batch', 'Stream', 'Date of Birth', 'Age',
+        'Father Name', 'Mother Name', 'Mobile 1', 'Mobile 2', 'School/College'
+    ]
+    
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=3, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+    
+    # Add data
+    row = 4
+    for admission in admissions:
+        # Calculate age
+        today = date.today()
+        age = today.year - admission.date_of_birth.year - ((today.month, today.day) < (admission.date_of_birth.month, admission.date_of_birth.day))
+        
+        ws.cell(row=row, column=1, value=admission.id).border = thin_border
+        ws.cell(row=row, column=2, value=spreadsheet_safe(admission.full_name())).border = thin_border
+        ws.cell(row=row, column=3, value=admission.get_standard_display()).border = thin_border
+        ws.cell(row=row, column=4, value=spreadsheet_safe(admission.batch)).border = thin_border
+        ws.cell(row=row, column=5, value=admission.get_stream_display() if admission.stream else '').border = thin_border
+        ws.cell(row=row, column=6, value=admission.date_of_birth.strftime('%d/%m/%Y')).border = thin_border
+        ws.cell(row=row, column=7, value=age).border = thin_border
+        ws.cell(row=row, column=8, value=spreadsheet_safe(admission.father_name)).border = thin_border
+        ws.cell(row=row, column=9, value=spreadsheet_safe(admission.mother_name)).border = thin_border
+        ws.cell(row=row, column=10, value=spreadsheet_safe(admission.mobile_1)).border = thin_border
+        ws.cell(row=row, column=11, value=spreadsheet_safe(admission.mobile_2 or '')).border = thin_border
+        ws.cell(row=row, column=12, value=spreadsheet_safe(admission.school_college)).border = thin_border
+        row += 1
+    
+    # Auto-adjust column widths
+    for column in ws.columns:
+        max_length = 0
+        column_letter = get_column_letter(column[0].column)
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = min(max_length + 2, 50)
+        ws.column_dimensions[column_letter].width = adjusted_width
+    
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,178 @@
+"""Per-request SQL, template and latency instrumentation.
+
+`InstrumentationMiddleware` measures every request and keeps the samples in a
+bounded in-process ring buffer per URL name; `summaries()` turns them into the
+percentiles shown on the staff diagnostics page. Views that run more queries
+than their `QUERY_BUDGETS` entry log a warning, or raise when
+`QUERY_BUDGET_STRICT` is on (as it is under `manage.py test`).
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('admissions.instrumentation')
+
+RING_SIZE = 500
+
+_current = ContextVar('request_metrics', default=None)
+_samples = defaultdict(lambda: deque(maxlen=getattr(settings, 'INSTRUMENTATION_RING_SIZE', RING_SIZE)))
+_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ('sql_count', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a connection execute_wrapper for the duration of a request
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose top-level renders are timed per request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with self._wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            # Connections are context-local, so the wrappers follow ORM calls into sync_to_async threads
+            with self._wrap_connections(metrics):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    def _wrap_connections(self, metrics):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics))
+        return stack
+
+    def _finish(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.url_name if match else None) or '<unresolved>'
+        record(view_name, total, metrics)
+        response['Server-Timing'] = (
+            f'sql;desc="{metrics.sql_count} queries";dur={metrics.sql_time * 1000:.1f}, '
+            f'tpl;dur={metrics.template_time * 1000:.1f}, total;dur={total * 1000:.1f}'
+        )
+        check_budget(view_name, metrics.sql_count, request)
+        return response
+
+
+def record(view_name, total, metrics):
+    with _lock:
+        _samples[view_name].append((total, metrics.sql_count, metrics.sql_time, metrics.template_time))
+
+
+def check_budget(view_name, sql_count, request=None):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    budget = budgets.get(view_name, budgets.get('*'))
+    if budget is None or sql_count <= budget:
+        return
+    message = f'{view_name} ran {sql_count} SQL queries (budget {budget})'
+    if request is not None:
+        message += f' for {request.method} {request.path}'
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summaries():
+    """Percentile summary per URL name, slowest p95 first."""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    rows = []
+    for name, samples in snapshot.items():
+        totals = sorted(s[0] * 1000 for s in samples)
+        queries = sorted(s[1] for s in samples)
+        rows.append({
+            'view': name,
+            'requests': len(samples),
+            'p50_ms': _percentile(totals, 50),
+            'p95_ms': _percentile(totals, 95),
+            'p99_ms': _percentile(totals, 99),
+            'avg_sql_ms': sum(s[2] for s in samples) * 1000 / len(samples),
+            'avg_template_ms': sum(s[3] for s in samples) * 1000 / len(samples),
+            'p50_queries': _percentile(queries, 50),
+            'max_queries': queries[-1],
+            'budget': getattr(settings, 'QUERY_BUDGETS', {}).get(name),
+        })
+    rows.sort(key=lambda r: r['p95_ms'], reverse=True)
+    return rows
+
+
+def reset():
+    with _lock:
+        _samples.clear()
@@ -0,0 +1,63 @@
+"""In-process publish/subscribe for pages that update live.
+
+Writers call `publish()` (usually via `publish_on_commit()`) from any thread;
+each subscriber is an asyncio queue on the event loop that opened it, fed
+with `call_soon_threadsafe`. Queues are small and a full queue drops the
+message: subscribers treat a message as "something changed" and re-read
+the database, so a burst of writes costs them one refresh, not one each.
+
+Only subscribers in the same process are notified. With several workers,
+subscribers also refresh on a timer (LIVE_BOARD_REFRESH_SECONDS) to pick
+up writes made elsewhere.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.db import transaction
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+
+
+def publish(topic, message):
+    """Hand `message` to every current subscriber of `topic`; returns how many there were."""
+    with _lock:
+        subscribers = list(_subscribers[topic])
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_offer, queue, message)
+        except RuntimeError:  # The subscriber's loop has already closed
+            pass
+    return len(subscribers)
+
+
+def publish_on_commit(topic, message):
+    """Publish once the current transaction commits, so subscribers never read ahead of it."""
+    transaction.on_commit(lambda: publish(topic, message))
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+@asynccontextmanager
+async def subscribe(topic, maxsize=16):
+    """`async with subscribe(topic) as queue:` receives messages published while the block runs."""
+    entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=maxsize))
+    with _lock:
+        _subscribers[topic].add(entry)
+    try:
+        yield entry[1]
+    finally:
+        with _lock:
+            _subscribers[topic].discard(entry)
+
+
+def subscriber_count(topic):
+    with _lock:
+        return len(_subscribers[topic])
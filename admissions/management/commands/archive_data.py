@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admissions import archive
+
+
+class Command(BaseCommand):
+    help = ('Move closed enquiries and attendance from past academic years into compressed '
+            'archive segments under PRIVATE_ROOT/archive, leaving rollups behind')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enquiries-before', help='Archive closed enquiries made before this date '
+                                                       '(YYYY-MM-DD, default: ENQUIRY_RETENTION_DAYS ago)')
+        parser.add_argument('--attendance-before', help='Archive attendance for lectures before this date '
+                                                        '(YYYY-MM-DD, default: start of the current academic year)')
+        parser.add_argument('--only', choices=['enquiries', 'attendance'])
+        parser.add_argument('--batch-size', type=int, help='Rows per batch (default: ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would move')
+
+    def handle(self, *args, **options):
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        moved = 0
+        if options['only'] in (None, 'enquiries'):
+            cutoff = self._date(options['enquiries_before'])
+            cutoff = timezone.make_aware(datetime.combine(cutoff, datetime.min.time())) if cutoff else archive.default_enquiry_cutoff()
+            count = archive.archive_enquiries(cutoff, options['batch_size'], options['dry_run'])
+            self.stdout.write(f'{verb} {count} closed enquiries from before {cutoff:%Y-%m-%d}')
+            moved += count
+        if options['only'] in (None, 'attendance'):
+            before = self._date(options['attendance_before']) or archive.academic_year_start()
+            count = archive.archive_attendance(before, options['batch_size'], options['dry_run'])
+            self.stdout.write(f'{verb} {count} attendance records from lectures before {before:%Y-%m-%d}')
+            moved += count
+        if moved and not options['dry_run']:
+            archive.analyze_live_tables()
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved} rows in total'))
+
+    def _date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Dates must look like 2025-06-01')
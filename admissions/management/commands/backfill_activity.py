@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from admissions import activity
+from admissions.models import ActivityEvent, Admission, Enquiry, Lecture, PaymentTransaction
+
+# (queryset, creation timestamp field); faculty records have no timestamp to place them by
+SOURCES = (
+    (Enquiry.objects.all(), 'enquiry_date'),
+    (Admission.objects.all(), 'submitted_at'),
+    (Lecture.objects.all(), 'created_at'),
+    (PaymentTransaction.objects.select_related('payment__faculty'), 'created_at'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Add "created" activity events for records made before the activity feed existed '
+            '(everything older than the oldest event, so running it again adds nothing)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        oldest = ActivityEvent.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        total = 0
+        for queryset, field in SOURCES:
+            rows = queryset.filter(**{f'{field}__lt': oldest}) if oldest else queryset
+            batch = []
+            for obj in rows.order_by(field, 'pk').iterator(chunk_size=options['batch_size']):
+                kind, verb, target_id, title, detail = activity.describe(obj)
+                batch.append(ActivityEvent(created_at=getattr(obj, field), kind=kind, verb=verb,
+                                           target_id=target_id, title=title[:200], detail=detail[:200]))
+                if len(batch) >= options['batch_size']:
+                    total += len(ActivityEvent.objects.bulk_create(batch))
+                    batch = []
+            total += len(ActivityEvent.objects.bulk_create(batch))
+        self.stdout.write(self.style.SUCCESS(f'Added {total} activity events'))
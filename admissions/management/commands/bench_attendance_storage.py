@@ -0,0 +1,162 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from admissions import bitmaps
+from admissions.benchmarks import percentiles, write_results
+
+# Mirrors the tables Django creates for AttendanceRecord (before and after dropping the
+# duplicate index), LectureAttendanceBitmap and LectureRosterEntry.
+ROW_SCHEMA = '''
+CREATE TABLE record (id INTEGER PRIMARY KEY AUTOINCREMENT, status varchar(7) NOT NULL, marked_at datetime NOT NULL,
+                     notes varchar(255) NULL, lecture_id integer NOT NULL, marked_by_id integer NULL,
+                     student_id integer NOT NULL);
+CREATE UNIQUE INDEX record_lecture_student_uniq ON record (lecture_id, student_id);
+CREATE INDEX record_student ON record (student_id);
+CREATE INDEX record_marked_by ON record (marked_by_id);
+'''
+DUPLICATE_INDEX = 'CREATE INDEX record_lecture_student_idx ON record (lecture_id, student_id);'
+BITMAP_SCHEMA = '''
+CREATE TABLE bitmap (lecture_id integer NOT NULL PRIMARY KEY, size integer NOT NULL, present BLOB NOT NULL,
+                     absent BLOB NOT NULL, marked_by_id integer NULL, marked_at datetime NOT NULL);
+CREATE INDEX bitmap_marked_by ON bitmap (marked_by_id);
+'''
+# Frozen rosters exist whichever store is used, so they live in their own file
+ROSTER_SCHEMA = '''
+CREATE TABLE roster (id INTEGER PRIMARY KEY AUTOINCREMENT, lecture_id integer NOT NULL, student_id integer NOT NULL,
+                     position integer NOT NULL);
+CREATE UNIQUE INDEX roster_lecture_student_uniq ON roster (lecture_id, student_id);
+CREATE INDEX roster_student ON roster (student_id);
+'''
+
+
+class Command(BaseCommand):
+    help = ('Compare on-disk size and query time of row-per-student attendance against per-lecture '
+            'bitmaps on synthetic SQLite databases')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=10)
+        parser.add_argument('--students', type=int, default=60, help='Students per batch')
+        parser.add_argument('--lectures', type=int, default=500, help='Lectures per batch')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/attendance-storage-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        random.seed(41)
+        data = self._synthesize(options)
+        folder = tempfile.mkdtemp()
+        try:
+            roster_path = os.path.join(folder, 'roster.sqlite3')
+            stores = {
+                'rows_with_duplicate_index': self._build_rows(os.path.join(folder, 'dup.sqlite3'), data, duplicate=True),
+                'rows': self._build_rows(os.path.join(folder, 'rows.sqlite3'), data, duplicate=False),
+                'bitmap': self._build_bitmaps(os.path.join(folder, 'bitmap.sqlite3'), roster_path, data),
+            }
+            results = {'roster_bytes': os.path.getsize(roster_path)}
+            for name, path in stores.items():
+                conn = sqlite3.connect(path)
+                conn.execute('ATTACH DATABASE ? AS frozen', (roster_path,))
+                results[name] = {
+                    'file_bytes': os.path.getsize(path),
+                    'batch_rates': self._time(conn, name, 'rates', data, options['iterations']),
+                    'one_lecture': self._time(conn, name, 'lecture', data, options['iterations']),
+                }
+                conn.close()
+                summary = results[name]
+                self.stdout.write(
+                    f"{name:<26} {summary['file_bytes'] / 1024:>8.0f} KiB  "
+                    f"batch rates p50 {summary['batch_rates']['p50_ms']:>8.2f} ms  "
+                    f"one lecture p50 {summary['one_lecture']['p50_ms']:>6.3f} ms"
+                )
+            self.stdout.write(f"(frozen rosters, shared by both designs: {results['roster_bytes'] / 1024:.0f} KiB)")
+        finally:
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
+        path = write_results('attendance-storage', {
+            'options': {k: options[k] for k in ('batches', 'students', 'lectures', 'iterations')},
+            'stores': results,
+        }, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _synthesize(self, options):
+        lectures = []  # (lecture_id, batch, [statuses by position])
+        rosters = {}
+        for batch in range(options['batches']):
+            rosters[batch] = [batch * options['students'] + s + 1 for s in range(options['students'])]
+        lecture_id = 0
+        for _ in range(options['lectures']):
+            for batch in rosters:
+                lecture_id += 1
+                lectures.append((lecture_id, batch, [random.random() < 0.9 for _ in rosters[batch]]))
+        return {'lectures': lectures, 'rosters': rosters}
+
+    def _finish(self, conn, path):
+        conn.commit()
+        conn.execute('VACUUM')
+        conn.close()
+        return path
+
+    def _build_rows(self, path, data, duplicate):
+        conn = sqlite3.connect(path)
+        conn.executescript(ROW_SCHEMA + (DUPLICATE_INDEX if duplicate else ''))
+        rows = []
+        for lecture_id, batch, statuses in data['lectures']:
+            for student_id, present in zip(data['rosters'][batch], statuses):
+                rows.append(('present' if present else 'absent', '2025-10-06 09:00:00', None, lecture_id, 1, student_id))
+        conn.executemany('INSERT INTO record (status, marked_at, notes, lecture_id, marked_by_id, student_id) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return self._finish(conn, path)
+
+    def _build_bitmaps(self, path, roster_path, data):
+        conn = sqlite3.connect(path)
+        conn.executescript(BITMAP_SCHEMA)
+        roster = sqlite3.connect(roster_path)
+        roster.executescript(ROSTER_SCHEMA)
+        for lecture_id, batch, statuses in data['lectures']:
+            size = len(statuses)
+            present = [i for i, flag in enumerate(statuses) if flag]
+            absent = [i for i, flag in enumerate(statuses) if not flag]
+            conn.execute('INSERT INTO bitmap VALUES (?, ?, ?, ?, ?, ?)', (
+                lecture_id, size, bitmaps.encode(present, size), bitmaps.encode(absent, size), 1, '2025-10-06 09:00:00',
+            ))
+            roster.executemany('INSERT INTO roster (lecture_id, student_id, position) VALUES (?, ?, ?)',
+                               [(lecture_id, s, i) for i, s in enumerate(data['rosters'][batch])])
+        self._finish(roster, roster_path)
+        return self._finish(conn, path)
+
+    def _time(self, conn, store, query, data, iterations):
+        batch_lectures = [lecture_id for lecture_id, batch, _ in data['lectures'] if batch == 0]
+        placeholders = ','.join('?' * len(batch_lectures))
+        samples = []
+        for i in range(iterations + 1):
+            lecture_id = batch_lectures[i % len(batch_lectures)]
+            start = time.perf_counter()
+            if store != 'bitmap':
+                if query == 'rates':
+                    conn.execute(f"SELECT student_id, SUM(status = 'present'), COUNT(*) FROM record "
+                                 f"WHERE lecture_id IN ({placeholders}) GROUP BY student_id", batch_lectures).fetchall()
+                else:
+                    conn.execute('SELECT student_id, status FROM record WHERE lecture_id = ?', (lecture_id,)).fetchall()
+            elif query == 'rates':
+                rows = conn.execute(f'SELECT lecture_id, present, absent FROM bitmap WHERE lecture_id IN ({placeholders})',
+                                    batch_lectures).fetchall()
+                rosters = {}
+                for lec, student_id in conn.execute(
+                    f'SELECT lecture_id, student_id FROM frozen.roster WHERE lecture_id IN ({placeholders}) '
+                    f'ORDER BY lecture_id, position', batch_lectures
+                ):
+                    rosters.setdefault(lec, []).append(student_id)
+                bitmaps.tally(rows, rosters)
+            else:
+                size, present = conn.execute('SELECT size, present FROM bitmap WHERE lecture_id = ?', (lecture_id,)).fetchone()
+                order = [s for (s,) in conn.execute('SELECT student_id FROM frozen.roster WHERE lecture_id = ? ORDER BY position',
+                                                    (lecture_id,))]
+                dict(zip(order, bitmaps.decode(present, size)))
+            if i:  # first pass warms the page cache
+                samples.append((time.perf_counter() - start) * 1000)
+        return percentiles(samples)
@@ -0,0 +1,90 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from admissions import document_pages, documents
+from admissions.benchmarks import write_results
+
+
+class Command(BaseCommand):
+    help = ('Time ID-card and roster PDF generation for a synthetic class with camera-sized photos: '
+            'serial vs process pool, and first run (derivatives built) vs repeat run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--workers', type=int, help='Process pool size (default: DOCUMENT_WORKERS / every core)')
+        parser.add_argument('--photo-size', default='1200x1600', help='Uploaded photo dimensions, WxH')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/documents-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='super20-documents-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                rows = self._students(media_root, options)
+                results = {}
+                for kind in documents.KINDS:
+                    runs = [('serial_cold', 1), ('pool_cold', options['workers']), ('pool_warm', options['workers'])]
+                    results[kind] = {}
+                    for label, workers in runs:
+                        if label.endswith('cold'):
+                            shutil.rmtree(os.path.join(media_root, 'derivatives'), ignore_errors=True)
+                        results[kind][label] = self._time(kind, rows, workers, media_root)
+                        summary = results[kind][label]
+                        self.stdout.write(
+                            f"{kind:<9} {label:<12} {summary['pages']:>4} pages  {summary['wall_s']:>6.2f} s  "
+                            f"first byte {summary['first_page_ms']:>7.0f} ms  {summary['bytes'] / 2 ** 20:>6.1f} MiB"
+                        )
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        path = write_results('documents', {
+            'options': {k: options[k] for k in ('students', 'workers', 'photo_size')},
+            'kinds': results,
+        }, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _students(self, media_root, options):
+        from PIL import Image, ImageDraw
+
+        width, height = (int(n) for n in options['photo_size'].split('x'))
+        os.makedirs(os.path.join(media_root, 'photos'))
+        variants = []
+        for shade in range(16):
+            image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+            draw = ImageDraw.Draw(image)
+            draw.ellipse((width // 4, height // 6, width * 3 // 4, height // 2), fill=(200 - shade * 8, 160, 120))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=90)
+            variants.append(buffer.getvalue())
+        rows = []
+        for i in range(options['students']):
+            name = f'photos/student_{i}.jpg'
+            with open(os.path.join(media_root, name), 'wb') as fh:
+                fh.write(variants[i % len(variants)])
+            rows.append({
+                'id': i + 1, 'surname': f'Surname{i}', 'name': f'Student{i}', 'middlename': '',
+                'standard': '10', 'standard_label': '10th', 'batch': f'Batch {i // 60}',
+                'mobile_1': f'9{i:09d}', 'photo': name,
+            })
+        return rows
+
+    def _time(self, kind, rows, workers, media_root):
+        start = time.perf_counter()
+        first = None
+        size = 0
+        for part in documents.render(kind, rows, workers=workers):
+            size += len(part)
+            if first is None and b'/Type /Page ' in part:
+                first = (time.perf_counter() - start) * 1000
+        derivatives = os.path.dirname(document_pages.derivative_path(media_root, rows[0]['photo']))
+        return {
+            'pages': len(documents.page_jobs(kind, rows)),
+            'wall_s': round(time.perf_counter() - start, 3),
+            'first_page_ms': round(first or 0, 1),
+            'bytes': size,
+            'derivatives': len(os.listdir(derivatives)),
+        }
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+from admissions.benchmarks import percentiles, write_results
+from admissions.models import Enquiry
+
+BOT_NAME = 'Flood Bot'
+
+
+class Command(BaseCommand):
+    help = ('Flood the public enquiry form from a handful of IPs and measure staff dashboard latency '
+            'with and without the form rate limiter')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each phase')
+        parser.add_argument('--bots', type=int, default=20, help='Concurrent flooding clients')
+        parser.add_argument('--ips', type=int, default=4, help='Distinct source addresses the bots use')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/flood-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3') and settings.SQLITE_PROFILE != 'production':
+            self.stdout.write(self.style.WARNING(
+                'SQLITE_PROFILE is not "production"; concurrent writes will hit "database is locked".'
+            ))
+        staff, created = User.objects.get_or_create(username='bench-flood-staff', defaults={'is_staff': True})
+        client = Client()
+        client.force_login(staff)
+        session_cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        first_id = (Enquiry.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        phases = {
+            'quiet': (0, settings.FORM_RATE_LIMITS),
+            'flood_unprotected': (options['bots'], {}),
+            'flood_protected': (options['bots'], settings.FORM_RATE_LIMITS),
+        }
+        results = {}
+        # Built before touching the logger: get_asgi_application() reruns the LOGGING config
+        application = get_asgi_application()
+        # Every 429 would otherwise be logged as a warning
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for name, (bots, limits) in phases.items():
+                cache.clear()
+                with override_settings(ALLOWED_HOSTS=['*'], QUERY_BUDGETS={}, FORM_RATE_LIMITS=limits,
+                                       RATE_LIMIT_TRUSTED_PROXIES=0):
+                    results[name] = asyncio.run(self._phase(application, bots, session_cookie, options))
+                summary = results[name]
+                self.stdout.write(
+                    f"{name:<18} staff p50 {summary['staff'].get('p50_ms', 0):>7.1f} ms  "
+                    f"p95 {summary['staff'].get('p95_ms', 0):>7.1f} ms  "
+                    f"bot posts {summary['bot_requests']:>5}  written {summary['rows_written']:>5}  "
+                    f"rejected {summary['rejected']:>5}"
+                )
+        finally:
+            request_logger.setLevel(level)
+            Enquiry.objects.filter(id__gte=first_id, student_name=BOT_NAME).delete()
+            if created:
+                staff.delete()
+        path = write_results('flood', {
+            'options': {k: options[k] for k in ('seconds', 'bots', 'ips')},
+            'phases': results,
+        }, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    async def _phase(self, application, bots, session_cookie, options):
+        stop = time.monotonic() + options['seconds']
+        token = get_random_string(32)
+        stats = {'bot_requests': 0, 'rejected': 0, 'statuses': {}}
+        before = await Enquiry.objects.filter(student_name=BOT_NAME).acount()
+
+        async def call(method, path, client, cookie, body=b''):
+            status = []
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.sleep(3600)  # Waiting for a disconnect that never comes
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            headers = [(b'host', b'bench'), (b'cookie', cookie.encode())]
+            if body:
+                headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                            (b'content-length', str(len(body)).encode())]
+            await application({
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                'root_path': '', 'server': ('bench', 80), 'client': (client, 40000), 'headers': headers,
+            }, receive, send)
+            return status[0]
+
+        async def bot(index):
+            cookie = f'{settings.CSRF_COOKIE_NAME}={token}'
+            address = f'203.0.113.{index % options["ips"] + 1}'
+            while time.monotonic() < stop:
+                body = urlencode({
+                    'csrfmiddlewaretoken': token, 'student_name': BOT_NAME, 'guardian_name': 'Bot',
+                    'phone_number': f'9{random.randrange(10 ** 9):09d}', 'preferred_course': '10',
+                }).encode()
+                status = await call('POST', '/enquiry/', address, cookie, body)
+                stats['bot_requests'] += 1
+                stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+                if status == 429:
+                    stats['rejected'] += 1
+
+        async def staff():
+            samples = []
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                await call('GET', '/dashboard/', '198.51.100.1', session_cookie)
+                samples.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.02)
+            return samples
+
+        outcome = await asyncio.gather(staff(), *(bot(i) for i in range(bots)))
+        stats['staff'] = percentiles(outcome[0])
+        stats['rows_written'] = await Enquiry.objects.filter(student_name=BOT_NAME).acount() - before
+        return stats
@@ -0,0 +1,76 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admissions.benchmarks import percentiles, write_results
+
+SETUP = 'import django; django.setup(); '
+SCENARIOS = {
+    'setup': SETUP,
+    # What every worker and manage.py command with system checks pays before serving anything
+    'urlconf': SETUP + f'import {settings.ROOT_URLCONF}',
+    'asgi': 'import super20.asgi',
+}
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)$')
+
+
+class Command(BaseCommand):
+    help = ('Time cold interpreter startup with `python -X importtime` and fail if the URLconf '
+            'pulls in heavy modules or exceeds a time budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to report')
+        parser.add_argument('--budget-ms', type=float, help='Fail if the urlconf p50 exceeds this')
+        parser.add_argument('--forbid', nargs='*', default=['openpyxl', 'PIL'],
+                            help='Packages the urlconf must not import at startup')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/startup-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'super20.settings'),
+                   WARMUP='')
+        results = {}
+        for name, code in SCENARIOS.items():
+            walls, imports = [], defaultdict(list)
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR,
+                                      env=env, capture_output=True, text=True)
+                walls.append((time.perf_counter() - start) * 1000)
+                if proc.returncode:
+                    raise CommandError(f'{name} failed:\n{proc.stderr[-2000:]}')
+                for package, cumulative_us in self._top_level(proc.stderr).items():
+                    imports[package].append(cumulative_us / 1000)
+            slowest = sorted(((sum(v) / len(v), k) for k, v in imports.items()), reverse=True)[:options['top']]
+            results[name] = {
+                'wall': percentiles(walls),
+                'slowest_imports_ms': {package: round(ms, 2) for ms, package in slowest},
+                'packages': sorted(imports),
+            }
+            self.stdout.write(f"{name:<8} p50 {results[name]['wall']['p50_ms']:>7.1f} ms  slowest: " + ', '.join(
+                f'{package} {ms:.0f}' for ms, package in slowest[:5]))
+        path = write_results('startup', results, options['output'])
+
+        problems = [f'urlconf imports {package}' for package in options['forbid']
+                    if package in results['urlconf']['packages']]
+        budget = options['budget_ms']
+        if budget and results['urlconf']['wall']['p50_ms'] > budget:
+            problems.append(f"urlconf p50 {results['urlconf']['wall']['p50_ms']:.0f} ms exceeds {budget:.0f} ms")
+        if problems:
+            raise CommandError('; '.join(problems) + f' (details in {path})')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _top_level(self, stderr):
+        """Import time in microseconds per top-level package, from each module's own (self) time."""
+        totals = defaultdict(int)
+        for line in stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                totals[match.group(2).split('.')[0]] += int(match.group(1))
+        return totals
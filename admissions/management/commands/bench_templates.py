@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Engine, RequestContext
+from django.template.backends.django import get_installed_libraries
+from django.test.utils import ContextList, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+
+from admissions import urls as admission_urls
+from admissions.benchmarks import percentiles, write_results
+from admissions.management.commands.run_benchmarks import FACULTY_VIEWS, SKIPPED, Command as ViewBenchmark
+from admissions.models import Enquiry
+
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class Command(BaseCommand):
+    help = ('Render the template behind every GET view with the context it was given, and compare '
+            'uncached and cached template loaders')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--only', nargs='*', help='Limit to these URL names')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/templates-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        engines = {'uncached': self._engine(BASE_LOADERS),
+                   'cached': self._engine([('django.template.loaders.cached.Loader', BASE_LOADERS)])}
+        results = {}
+        for name, (request, context) in self._captured_contexts(options['only']).items():
+            row = {}
+            for label, engine in engines.items():
+                engine.get_template(name).render(RequestContext(request, context))  # warm-up
+                samples = []
+                for _ in range(options['iterations']):
+                    start = time.perf_counter()
+                    engine.get_template(name).render(RequestContext(request, context))
+                    samples.append((time.perf_counter() - start) * 1000)
+                row[label] = percentiles(samples)
+            results[name] = row
+            self.stdout.write(
+                f"{name:<42} uncached p50 {row['uncached']['p50_ms']:>8.2f} ms  "
+                f"cached p50 {row['cached']['p50_ms']:>8.2f} ms"
+            )
+        path = write_results('templates', results, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _engine(self, loaders):
+        config = settings.TEMPLATES[0]
+        return Engine(
+            dirs=[str(d) for d in config['DIRS']],
+            loaders=loaders,
+            context_processors=config['OPTIONS']['context_processors'],
+            libraries=get_installed_libraries(),
+        )
+
+    def _captured_contexts(self, only):
+        """GET each view once and keep the top-level template name and its flattened context."""
+        views = ViewBenchmark()
+        kwargs_by_name = views._sample_kwargs()
+        captured = {}
+        # The test environment makes the client record the templates and contexts it rendered
+        try:
+            setup_test_environment()
+            started = True
+        except RuntimeError:  # Already inside one, e.g. under manage.py test
+            started = False
+        try:
+            with views.clients() as (staff, faculty), override_settings(QUERY_BUDGETS={}, ALLOWED_HOSTS=['*']):
+                for pattern in admission_urls.urlpatterns:
+                    if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED:
+                        continue
+                    if only and pattern.name not in only:
+                        continue
+                    kwargs = {key: kwargs_by_name.get(key) for key in pattern.pattern.converters}
+                    if pattern.name == 'edit_enquiry':
+                        kwargs['id'] = Enquiry.objects.values_list('id', flat=True).first()
+                    client = faculty if pattern.name in FACULTY_VIEWS else staff
+                    if None in kwargs.values() or client is None:
+                        continue
+                    response = client.get(reverse(pattern.name, kwargs=kwargs))
+                    if response.status_code != 200 or not response.templates:
+                        continue
+                    name = response.templates[0].name
+                    context = response.context[0] if isinstance(response.context, ContextList) else response.context
+                    captured.setdefault(name, (response.wsgi_request, context.flatten()))
+        finally:
+            if started:
+                teardown_test_environment()
+        return captured
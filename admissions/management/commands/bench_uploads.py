@@ -0,0 +1,197 @@
+import asyncio
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+from admissions import storage
+from admissions.benchmarks import percentiles, write_results
+from admissions.models import Admission
+
+
+class SlowInput(io.RawIOBase):
+    """wsgi.input that trickles the body in like a slow mobile client."""
+
+    def __init__(self, body, chunk, delay):
+        self.stream = io.BytesIO(body)
+        self.chunk = chunk
+        self.delay = delay
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        time.sleep(self.delay)
+        size = self.chunk if size is None or size < 0 else min(size, self.chunk)
+        return self.stream.read(size)
+
+    def readline(self, size=-1):
+        time.sleep(self.delay)
+        return self.stream.readline(self.chunk if size is None or size < 0 else min(size, self.chunk))
+
+
+class Command(BaseCommand):
+    help = ('Compare how many concurrent slow admission-form uploads one process completes '
+            'under the ASGI handler versus a threaded WSGI worker')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=50, help='Concurrent uploads per run')
+        parser.add_argument('--threads', type=int, default=4, help='WSGI worker threads (gunicorn --threads)')
+        parser.add_argument('--photo-kib', type=int, default=256, help='Size of the uploaded photo')
+        parser.add_argument('--chunk-kib', type=int, default=16, help='Bytes the client sends per tick')
+        parser.add_argument('--delay', type=float, default=0.05, help='Seconds between chunks')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/uploads-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3') and settings.SQLITE_PROFILE != 'production':
+            # Concurrent ASGI requests each get their own connection and sync thread
+            self.stdout.write(self.style.WARNING(
+                'SQLITE_PROFILE is not "production"; concurrent uploads will hit "database is locked".'
+            ))
+        body, cookie = self._body(options['photo_kib'] * 1024)
+        first_id = (Admission.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], QUERY_BUDGETS={}):
+                results['wsgi'] = self._wsgi(body, cookie, options)
+                results['asgi'] = asyncio.run(self._asgi(body, cookie, options))
+        finally:
+            self._cleanup(first_id)
+
+        for mode, summary in results.items():
+            self.stdout.write(
+                f"{mode}: {summary['completed']}/{options['uploads']} uploads in {summary['wall_s']:.2f} s  "
+                f"p50 {summary['latency'].get('p50_ms', 0):.0f} ms  p95 {summary['latency'].get('p95_ms', 0):.0f} ms  "
+                f"peak in flight {summary['peak_in_flight']}"
+            )
+        path = write_results('uploads', {
+            'options': {k: options[k] for k in ('uploads', 'threads', 'photo_kib', 'chunk_kib', 'delay')},
+            'modes': results,
+        }, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _body(self, photo_size):
+        from PIL import Image
+
+        # Noise keeps the JPEG close to the requested size
+        image = Image.frombytes('RGB', (512, max(1, photo_size // 1536)), os.urandom(512 * max(1, photo_size // 1536) * 3))
+        photo = io.BytesIO()
+        image.save(photo, 'JPEG', quality=95)
+        photo.seek(0)
+        photo.name = 'bench.jpg'
+        token = get_random_string(32)
+        data = {
+            'csrfmiddlewaretoken': token, 'surname': 'Bench', 'name': 'Upload', 'photo': photo,
+            'contact_number': '9000000000', 'mobile_1': '9000000000', 'date_of_birth': '2010-01-01',
+            'mother_name': 'M', 'father_name': 'F', 'father_occupation': 'X', 'standard': '10',
+            'batch': 'Bench', 'school_college': 'School', 'previous_percentage': '80',
+        }
+        return encode_multipart(BOUNDARY, data), f'{settings.CSRF_COOKIE_NAME}={token}'
+
+    def _finish(self, latencies, statuses, wall, peak):
+        return {
+            'completed': sum(1 for status in statuses if status in (200, 302)),
+            'statuses': sorted(set(statuses)),
+            'wall_s': round(wall, 3),
+            'uploads_per_s': round(len(latencies) / wall, 2) if wall else 0,
+            'peak_in_flight': peak,
+            'latency': percentiles(latencies),
+        }
+
+    def _wsgi(self, body, cookie, options):
+        application = get_wsgi_application()
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def upload(_):
+            environ = {
+                'REQUEST_METHOD': 'POST', 'PATH_INFO': '/admission/', 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                'SERVER_NAME': 'bench', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': str(len(body)), 'HTTP_COOKIE': cookie,
+                'wsgi.input': SlowInput(body, options['chunk_kib'] * 1024, options['delay']),
+                'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(), 'wsgi.version': (1, 0),
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            status = []
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            try:
+                for _ in application(environ, lambda s, h, exc_info=None: status.append(int(s[:3]))):
+                    pass
+            finally:
+                with lock:
+                    state['in_flight'] -= 1
+            return (time.perf_counter() - start) * 1000, status[0]
+
+        # Every client connects at once; latency includes time queued behind busy threads
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            outcomes = list(pool.map(upload, range(options['uploads'])))
+        wall = time.perf_counter() - start
+        return self._finish([lat for lat, _ in outcomes], [s for _, s in outcomes], wall, state['peak'])
+
+    async def _asgi(self, body, cookie, options):
+        application = get_asgi_application()
+        chunk = options['chunk_kib'] * 1024
+        state = {'in_flight': 0, 'peak': 0}
+
+        async def upload():
+            offsets = list(range(0, len(body), chunk))
+            messages = iter(offsets)
+            status = []
+
+            async def receive():
+                offset = next(messages, None)
+                if offset is None:
+                    await asyncio.sleep(3600)  # Waiting for a disconnect that never comes
+                await asyncio.sleep(options['delay'])
+                return {'type': 'http.request', 'body': body[offset:offset + chunk],
+                        'more_body': offset + chunk < len(body)}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+                'scheme': 'http', 'path': '/admission/', 'raw_path': b'/admission/', 'query_string': b'',
+                'root_path': '', 'server': ('bench', 80), 'client': ('127.0.0.1', 0),
+                'headers': [
+                    (b'host', b'bench'), (b'content-type', MULTIPART_CONTENT.encode()),
+                    (b'content-length', str(len(body)).encode()), (b'cookie', cookie.encode()),
+                ],
+            }
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            try:
+                await application(scope, receive, send)
+            finally:
+                state['in_flight'] -= 1
+            return (time.perf_counter() - start) * 1000, status[0]
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(upload() for _ in range(options['uploads'])))
+        wall = time.perf_counter() - start
+        return self._finish([lat for lat, _ in outcomes], [s for _, s in outcomes], wall, state['peak'])
+
+    def _cleanup(self, first_id):
+        names = set()
+        for admission in Admission.objects.filter(id__gte=first_id, surname='Bench', batch='Bench'):
+            if admission.photo:
+                names.add(admission.photo.name)
+            admission.delete()
+        # Every upload stored the same bytes once; remove it now rather than after gc_media's grace period
+        referenced = storage.references(list(names))
+        for name in names - set(referenced):
+            os.remove(default_storage.path(name))
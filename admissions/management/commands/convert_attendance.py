@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from admissions import bitmaps
+from admissions.models import AttendanceRecord, Lecture
+
+
+class Command(BaseCommand):
+    help = 'Build compact attendance bitmaps (and notes) from existing AttendanceRecord rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild lectures that already have a bitmap')
+        parser.add_argument('--verify', action='store_true', help='Check every converted lecture decodes to its records')
+
+    def handle(self, *args, **options):
+        lectures = Lecture.objects.filter(attendance_records__isnull=False).distinct().order_by('id')
+        if not options['all']:
+            lectures = lectures.filter(attendance_bitmap__isnull=True)
+        converted = rows = mismatched = 0
+        for lecture in lectures.iterator(chunk_size=500):
+            rows += bitmaps.convert_lecture(lecture)
+            converted += 1
+            if options['verify']:
+                expected = dict(AttendanceRecord.objects.filter(lecture=lecture).values_list('student_id', 'status'))
+                if bitmaps.lecture_statuses(lecture) != expected:
+                    mismatched += 1
+                    self.stdout.write(self.style.WARNING(f'Lecture {lecture.id} does not round-trip'))
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'{mismatched} lectures did not round-trip'))
+        self.stdout.write(self.style.SUCCESS(f'Converted {rows} records across {converted} lectures'))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admissions import storage
+
+
+class Command(BaseCommand):
+    help = ('Delete content-addressed media files no row references any more (run periodically, e.g. '
+            'from cron); --adopt first moves files uploaded before content addressing into it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument('--adopt', action='store_true',
+                            help='Store files kept under their upload names by content hash, deduplicating them')
+
+    def handle(self, *args, **options):
+        if options['adopt']:
+            if options['dry_run']:
+                self.stdout.write('Skipping --adopt in a dry run')
+            else:
+                moved, removed = storage.adopt()
+                self.stdout.write(f'Adopted {moved} rows; removed {removed} old files')
+        removed, freed = storage.collect(dry_run=options['dry_run'])
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        grace = settings.MEDIA_GC_GRACE_SECONDS
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} unreferenced files ({freed / 1024:.1f} KiB) {verb}; files younger than {grace}s were kept'
+        ))
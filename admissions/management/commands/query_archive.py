@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from admissions import archive
+
+
+class Command(BaseCommand):
+    help = 'Print archived enquiry or attendance rows as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['enquiry', 'attendance'])
+        parser.add_argument('--period', help='Calendar year (enquiries) or academic year such as 2024-25 (attendance)')
+        parser.add_argument('--key', type=int, help='Enquiry id, or lecture id for attendance')
+        parser.add_argument('--branch', help='Only rows of this branch code')
+        parser.add_argument('--search', help='Case-insensitive text that must appear in the row')
+
+    def handle(self, *args, **options):
+        needle = (options['search'] or '').lower()
+        shown = 0
+        for row in archive.iter_archived(options['kind'], options['period'], options['key'], options['branch']):
+            line = json.dumps(row)
+            if needle and needle not in line.lower():
+                continue
+            self.stdout.write(line)
+            shown += 1
+        self.stderr.write(f'{shown} rows')
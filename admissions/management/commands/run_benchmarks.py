@@ -0,0 +1,129 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from admissions import urls as admission_urls
+from admissions.benchmarks import percentiles, write_results
+from admissions.models import Enquiry, Admission, Faculty, Lecture
+
+# Views that change state or end the session are not replayed
+SKIPPED = {'admin_logout', 'faculty_logout', 'lecture_delete', 'payroll_download'}
+# Views that only make sense for a logged-in faculty member
+FACULTY_VIEWS = {'faculty_dashboard'}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every GET view in admissions/urls.py and write latency, query and memory figures as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', nargs='*', help='Limit to these URL names')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/views-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        kwargs_by_name = self._sample_kwargs()
+        results = {}
+        with self.clients() as (staff, faculty):
+            self._run(staff, faculty, kwargs_by_name, results, options)
+
+        path = write_results('views', results, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _run(self, staff, faculty, kwargs_by_name, results, options):
+        # Budgets would only add log noise here; the numbers end up in the JSON instead
+        with override_settings(QUERY_BUDGETS={}, ALLOWED_HOSTS=['*']):
+            for pattern in admission_urls.urlpatterns:
+                if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED:
+                    continue
+                if options['only'] and pattern.name not in options['only']:
+                    continue
+                kwargs = {key: kwargs_by_name.get(key) for key in pattern.pattern.converters}
+                if pattern.name == 'edit_enquiry':
+                    kwargs['id'] = Enquiry.objects.values_list('id', flat=True).first()
+                if None in kwargs.values():
+                    self.stdout.write(self.style.WARNING(f'Skipping {pattern.name}: no sample data'))
+                    continue
+                client = faculty if pattern.name in FACULTY_VIEWS else staff
+                if client is None:
+                    continue
+                url = reverse(pattern.name, kwargs=kwargs)
+                results[pattern.name] = self._measure(client, url, options['iterations'], options['warmup'])
+                summary = results[pattern.name]
+                self.stdout.write(
+                    f"{pattern.name:<22} p50 {summary['p50_ms']:>9.2f} ms  p95 {summary['p95_ms']:>9.2f} ms  "
+                    f"queries {summary['queries']:>5}  peak {summary['peak_kib']:>9.1f} KiB"
+                )
+
+    def _measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = client.get(url)
+            if hasattr(response, 'streaming_content'):
+                for _ in response.streaming_content:
+                    pass
+            samples.append((time.perf_counter() - start) * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            response = client.get(url)
+            if hasattr(response, 'streaming_content'):
+                for _ in response.streaming_content:
+                    pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        summary = percentiles(samples)
+        summary.update({
+            'url': url,
+            'status': response.status_code,
+            'queries': len(queries),
+            'peak_kib': round(peak / 1024, 1),
+        })
+        return summary
+
+    def _sample_kwargs(self):
+        return {
+            'id': Admission.objects.values_list('id', flat=True).first(),
+            'lecture_id': Lecture.objects.values_list('id', flat=True).last(),
+            'faculty_id': Faculty.objects.values_list('id', flat=True).first(),
+            'token': self._feed_token(),
+        }
+
+    def _feed_token(self):
+        from admissions import calendar_feed
+        faculty_id = Faculty.objects.values_list('id', flat=True).first()
+        return calendar_feed.feed_token(calendar_feed.faculty_scope(faculty_id)) if faculty_id else None
+
+    @contextmanager
+    def clients(self):
+        """(staff client, faculty client or None); the benchmark user and sessions are removed afterwards."""
+        user, created = User.objects.get_or_create(username='bench_staff', defaults={'is_staff': True})
+        staff = Client()
+        staff.force_login(user)
+        faculty = self._faculty_client()
+        try:
+            yield staff, faculty
+        finally:
+            for client in (staff, faculty):
+                if client is not None:
+                    client.logout()
+            if created:
+                user.delete()
+
+    def _faculty_client(self):
+        faculty = Faculty.objects.select_related('user').filter(is_active=True).first()
+        if faculty is None:
+            return None
+        client = Client()
+        client.force_login(faculty.user)
+        return client
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admissions import branches
+from admissions.payroll import PayrollBusy, run_payroll
+
+
+class Command(BaseCommand):
+    help = 'Compute month-end payroll and bundle per-faculty payslips into one archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Payroll month as YYYY-MM (defaults to the previous month)')
+        parser.add_argument('--workers', type=int, default=None, help='Payslip worker processes (default: CPU count)')
+        parser.add_argument('--branch', choices=list(settings.BRANCHES),
+                            help='Only this branch (default: each branch in turn, with its own archive)')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must look like 2025-10')
+        else:
+            month = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        for code in [options['branch']] if options['branch'] else settings.BRANCHES:
+            with branches.activate(code):
+                self._run(month, code, options['workers'])
+
+    def _run(self, month, code, workers):
+        try:
+            result = run_payroll(month, workers=workers)
+        except PayrollBusy as exc:
+            raise CommandError(str(exc))
+        for row in result['rows']:
+            self.stdout.write(
+                f"{row['full_name']}: {row['lecture_total']} lectures, due {row['amount_due']}, "
+                f"paid {row['amount_paid']}, pending {row['balance']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Payroll {month:%Y-%m} ({branches.name(code)}): {result['generated']} payslips generated, "
+            f"{result['skipped']} unchanged. Archive: {result['archive']}"
+        ))
@@ -0,0 +1,203 @@
+import os
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from admissions.models import (
+    Enquiry, Admission, Batch, BatchMembership, Faculty, Lecture, AttendanceRecord, Payment,
+)
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ishaan', 'Riya', 'Ananya', 'Diya', 'Saanvi', 'Kabir', 'Meera',
+               'Arjun', 'Zoya', 'Neha', 'Rohan', 'Tanvi', 'Yash', 'Pooja', 'Omkar', 'Sneha', 'Karan']
+SURNAMES = ['Patil', 'Shah', 'Deshmukh', 'Kulkarni', 'Joshi', 'Khan', 'Iyer', 'Pawar', 'Mehta', 'Naik',
+            'Gupta', 'Jadhav', 'More', 'Shinde', 'Rao', 'Bhosale', 'Chavan', 'Sawant', 'Kale', 'Gaikwad']
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'Accounts', 'Economics', 'History']
+SLOTS = [time(8), time(10), time(12), time(15), time(17)]
+
+
+class Command(BaseCommand):
+    help = 'Seed realistic synthetic data with bulk_create (use --scale to shrink or grow the defaults)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplier applied to every count below')
+        parser.add_argument('--enquiries', type=int, default=100_000)
+        parser.add_argument('--admissions', type=int, default=50_000)
+        parser.add_argument('--faculties', type=int, default=200)
+        parser.add_argument('--years', type=float, default=3, help='Years of lecture history ending today')
+        parser.add_argument('--students-per-batch', type=int, default=60)
+        parser.add_argument('--lectures-per-week', type=int, default=5, help='Lectures per batch per week')
+        parser.add_argument('--photos', type=int, default=200, help='Distinct generated photos shared by admissions')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        scale = options['scale']
+        n_enquiries = int(options['enquiries'] * scale)
+        n_admissions = int(options['admissions'] * scale)
+        n_faculties = max(1, int(options['faculties'] * scale))
+        n_photos = max(1, int(options['photos'] * scale)) if n_admissions else 0
+        days = int(365 * options['years'])
+
+        self._enquiries(n_enquiries, days)
+        photo_names = self._photos(n_photos)
+        batches = self._admissions(n_admissions, days, options['students_per_batch'], photo_names)
+        faculty_ids = self._faculties(n_faculties)
+        self._lectures(batches, faculty_ids, days, options['lectures_per_week'])
+        self.stdout.write(self.style.SUCCESS('Seeding complete.'))
+
+    def _chunks(self, iterable):
+        chunk = []
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(SURNAMES)
+
+    def _phone(self):
+        return f'9{self.rng.randrange(10**8, 10**9)}'
+
+    def _past(self, days):
+        return timezone.now() - timedelta(days=self.rng.randrange(max(days, 1)), minutes=self.rng.randrange(1440))
+
+    def _enquiries(self, count, days):
+        courses = [c for c, _ in Enquiry.COURSE_CHOICES]
+        statuses = ['in_process', 'converted', 'not_interested']
+
+        def rows():
+            for _ in range(count):
+                first, last = self._name()
+                yield Enquiry(
+                    student_name=f'{first} {last}', guardian_name=f'{self.rng.choice(FIRST_NAMES)} {last}',
+                    phone_number=self._phone(), preferred_course=self.rng.choice(courses),
+                    status=self.rng.choices(statuses, weights=[5, 3, 2])[0],
+                )
+
+        for chunk in self._chunks(rows()):
+            created = Enquiry.objects.bulk_create(chunk)
+            # enquiry_date is auto_now_add, so backdate it after insert
+            for enquiry in created:
+                enquiry.enquiry_date = self._past(days)
+            Enquiry.objects.bulk_update(created, ['enquiry_date'])
+        self.stdout.write(f'Created {count} enquiries')
+
+    def _photos(self, count):
+        from PIL import Image, ImageDraw
+
+        folder = os.path.join(settings.MEDIA_ROOT, 'photos', 'seed')
+        os.makedirs(folder, exist_ok=True)
+        names = []
+        for i in range(count):
+            name = f'photos/seed/student_{i}.jpg'
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if not os.path.exists(path):
+                image = Image.new('RGB', (300, 380), tuple(self.rng.randrange(256) for _ in range(3)))
+                ImageDraw.Draw(image).text((20, 20), f'Student {i}', fill=(255, 255, 255))
+                image.save(path, 'JPEG', quality=80)
+            names.append(name)
+        self.stdout.write(f'Prepared {count} photos')
+        return names
+
+    def _admissions(self, count, days, per_batch, photo_names):
+        standards = [s for s, _ in Admission.STANDARD_CHOICES]
+        n_batches = max(1, -(-count // per_batch))
+        batch_keys = [(standards[i % len(standards)], f'Batch {i // len(standards) + 1}') for i in range(n_batches)]
+        Batch.objects.bulk_create([Batch(standard=s, name=n) for s, n in batch_keys], ignore_conflicts=True)
+        batch_ids = {(b.standard, b.name): b.id for b in Batch.objects.all()}
+
+        def rows():
+            for i in range(count):
+                first, last = self._name()
+                standard, batch_name = batch_keys[i % n_batches]
+                yield Admission(
+                    surname=last, name=first, middlename=self.rng.choice(FIRST_NAMES),
+                    photo=photo_names[i % len(photo_names)] if photo_names else None,
+                    contact_number=self._phone(), mobile_1=self._phone(),
+                    date_of_birth=date(2005, 1, 1) + timedelta(days=self.rng.randrange(4000)),
+                    mother_name=f'{self.rng.choice(FIRST_NAMES)} {last}', father_name=f'{self.rng.choice(FIRST_NAMES)} {last}',
+                    father_occupation='Business', standard=standard, batch=batch_name,
+                    school_college='City School', previous_percentage=Decimal(self.rng.randrange(4000, 10000)) / 100,
+                    stream=self.rng.choice(['science', 'commerce', 'arts']) if standard in ('11', '12') else None,
+                )
+
+        for chunk in self._chunks(rows()):
+            # bulk_create bypasses Admission.save(), so memberships are written here
+            created = Admission.objects.bulk_create(chunk)
+            BatchMembership.objects.bulk_create([
+                BatchMembership(student=a, batch_id=batch_ids[(a.standard, a.batch)]) for a in created
+            ])
+            for admission in created:
+                admission.submitted_at = self._past(days)
+            Admission.objects.bulk_update(created, ['submitted_at'])
+        self.stdout.write(f'Created {count} admissions in {n_batches} batches')
+        return [(s, n, batch_ids[(s, n)]) for s, n in batch_keys] if count else []
+
+    def _faculties(self, count):
+        password = make_password('faculty123')
+        prefix = f'seed{self.rng.randrange(10**6)}_'
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}{i}', password=password, is_active=True) for i in range(count)
+        ])
+        faculties = Faculty.objects.bulk_create([
+            Faculty(user=u, full_name=' '.join(self._name()), phone_number=self._phone()) for u in users
+        ])
+        self.stdout.write(f'Created {count} faculties')
+        return [f.id for f in faculties]
+
+    def _lectures(self, batches, faculty_ids, days, per_week):
+        if not batches or not faculty_ids:
+            return
+        today = timezone.localdate()
+        start = today - timedelta(days=days)
+        members = {}
+        for batch_id, student_id in BatchMembership.objects.values_list('batch_id', 'student_id').iterator():
+            members.setdefault(batch_id, []).append(student_id)
+
+        lecture_count = attendance_count = 0
+        months = set()
+        for standard, name, batch_id in batches:
+            faculty_id = self.rng.choice(faculty_ids)
+            day = start
+            lectures = []
+            while day <= today:
+                if day.weekday() < min(per_week, 6):
+                    lectures.append(Lecture(
+                        title=self.rng.choice(SUBJECTS), date=day, start_time=(slot := self.rng.choice(SLOTS)),
+                        end_time=(datetime.combine(day, slot) + timedelta(hours=1)).time(),
+                        standard=standard, batch=name, faculty_id=faculty_id,
+                    ))
+                    months.add((faculty_id, day.replace(day=1)))
+                day += timedelta(days=1)
+
+            with transaction.atomic():
+                for chunk in self._chunks(lectures):
+                    created = Lecture.objects.bulk_create(chunk)
+                    lecture_count += len(created)
+                    records = [
+                        AttendanceRecord(lecture=lec, student_id=sid, marked_by_id=faculty_id,
+                                         status='present' if self.rng.random() < 0.9 else 'absent')
+                        for lec in created if lec.date < today
+                        for sid in members.get(batch_id, [])
+                    ]
+                    for record_chunk in self._chunks(records):
+                        AttendanceRecord.objects.bulk_create(record_chunk)
+                    attendance_count += len(records)
+
+        Payment.objects.bulk_create([
+            Payment(faculty_id=fid, month=month, per_lecture_rate=Decimal(self.rng.choice([300, 400, 500])))
+            for fid, month in months
+        ], ignore_conflicts=True)
+        self.stdout.write(f'Created {lecture_count} lectures and {attendance_count} attendance records')
@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from admissions.models import Faculty, Payment, PaymentTransaction
+
+
+class Command(BaseCommand):
+    help = "Pay every faculty's outstanding balance for a month in a single transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to settle as YYYY-MM (defaults to the previous month)')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be paid without writing')
+
+    def handle(self, *args, **options):
+        month_start = self._month(options['month'])
+        settled = []
+        with transaction.atomic():
+            # Every active faculty gets a row for the month so nobody is skipped
+            Payment.objects.bulk_create(
+                [Payment(faculty_id=fid, month=month_start)
+                 for fid in Faculty.objects.filter(is_active=True).values_list('id', flat=True)],
+                ignore_conflicts=True,
+            )
+            payments = (
+                Payment.objects.select_for_update()
+                .filter(month=month_start)
+                .with_lecture_counts()
+                .select_related('faculty')
+            )
+            for payment in payments:
+                if payment.balance > 0:
+                    settled.append((payment, payment.balance))
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                PaymentTransaction.objects.bulk_create([
+                    PaymentTransaction(payment=payment, amount=amount, kind='settlement',
+                                       notes=f'Month-end settlement {month_start:%Y-%m}')
+                    for payment, amount in settled
+                ])
+                now = timezone.now()
+                for payment, amount in settled:
+                    Payment.objects.filter(pk=payment.pk).update(amount_paid=F('amount_paid') + amount, updated_at=now)
+
+        total = sum((amount for _, amount in settled), Decimal('0.00'))
+        for payment, amount in settled:
+            self.stdout.write(f'{payment.faculty.full_name}: {amount}')
+        verb = 'Would settle' if options['dry_run'] else 'Settled'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(settled)} faculty balances for {month_start:%Y-%m}, total {total}'
+        ))
+
+    def _month(self, value):
+        if not value:
+            today = date.today()
+            previous = today.replace(day=1) - timedelta(days=1)
+            return previous.replace(day=1)
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError('--month must look like 2025-10')
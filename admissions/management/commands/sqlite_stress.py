@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admissions.benchmarks import percentiles, write_results
+
+SCHEMA = '''
+CREATE TABLE enquiry (id INTEGER PRIMARY KEY, student_name TEXT, phone TEXT, created REAL);
+CREATE TABLE attendance (lecture INTEGER, student INTEGER, status TEXT, PRIMARY KEY (lecture, student));
+'''
+
+
+class Command(BaseCommand):
+    help = ('Compare "database is locked" errors and write latency between the default and '
+            'production SQLite profiles under many parallel writers')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--students', type=int, default=60, help='Rows written per attendance transaction')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/sqlite-stress-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        profiles = {
+            # What Django does out of the box: rollback journal, deferred BEGIN, 5 s timeout
+            'default': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0},
+            'production': {
+                'pragmas': settings.SQLITE_PRODUCTION_PRAGMAS,
+                'begin': 'BEGIN IMMEDIATE',
+                'timeout': 20.0,
+            },
+        }
+        results = {}
+        for name, profile in profiles.items():
+            results[name] = self._run(profile, options)
+            summary = results[name]
+            self.stdout.write(
+                f"{name:<11} writes {summary['writes']:>6}  locked errors {summary['locked_errors']:>5}  "
+                f"write p50 {summary['write_latency'].get('p50_ms', 0):>8.2f} ms  "
+                f"p99 {summary['write_latency'].get('p99_ms', 0):>8.2f} ms  reads {summary['reads']:>6}"
+            )
+        path = write_results('sqlite-stress', {'options': {k: options[k] for k in ('writers', 'readers', 'seconds', 'students')},
+                                               'profiles': results}, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def _connect(self, path, profile):
+        conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        for name, value in profile['pragmas'].items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _run(self, profile, options):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, 'stress.sqlite3')
+        setup = self._connect(path, profile)
+        setup.executescript(SCHEMA)
+        setup.close()
+
+        stop = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        stats = {'writes': 0, 'reads': 0, 'locked_errors': 0, 'latencies': []}
+
+        def writer(index):
+            conn = self._connect(path, profile)
+            lecture = index * 1_000_000
+            while time.monotonic() < stop:
+                lecture += 1
+                start = time.perf_counter()
+                try:
+                    conn.execute(profile['begin'])
+                    # Read-then-write, like update_or_create inside an atomic block
+                    conn.execute('SELECT COUNT(*) FROM attendance WHERE lecture = ?', (lecture,)).fetchone()
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO attendance VALUES (?, ?, ?)',
+                        [(lecture, s, 'present') for s in range(options['students'])],
+                    )
+                    conn.execute('INSERT INTO enquiry (student_name, phone, created) VALUES (?, ?, ?)',
+                                 (f'Student {index}', '9000000000', time.time()))
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError as exc:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    if 'locked' not in str(exc) and 'busy' not in str(exc):
+                        raise
+                    with lock:
+                        stats['locked_errors'] += 1
+                    continue
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    stats['writes'] += 1
+                    stats['latencies'].append(elapsed)
+            conn.close()
+
+        def reader():
+            conn = self._connect(path, profile)
+            while time.monotonic() < stop:
+                try:
+                    conn.execute('SELECT COUNT(*), MAX(created) FROM enquiry').fetchone()
+                except sqlite3.OperationalError:
+                    with lock:
+                        stats['locked_errors'] += 1
+                    continue
+                with lock:
+                    stats['reads'] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rmdir(folder)
+        return {
+            'writes': stats['writes'],
+            'reads': stats['reads'],
+            'locked_errors': stats['locked_errors'],
+            'write_latency': percentiles(stats['latencies']),
+        }
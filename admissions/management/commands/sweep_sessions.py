@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Delete expired database sessions in small batches so the write lock is '
+            'released between batches (run periodically, e.g. from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SESSION_SWEEP_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count expired sessions')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write('Signed-cookie sessions are not stored in the database; sweeping leftovers only.')
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{expired.count()} expired sessions would be deleted'))
+            return
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+                if not keys:
+                    break
+                deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
@@ -0,0 +1,159 @@
+"""Serving uploaded media: ETags, conditional GETs, single byte ranges and front-server offload.
+
+Content-addressed files (see storage.py) never change, so their hash is a
+strong ETag and browsers may cache them for a year without revalidating.
+Other files get a weak ETag from their size and modification time.
+
+With MEDIA_OFFLOAD set, Django only checks the login and the conditional
+headers; the response carries an `X-Accel-Redirect` (nginx) or `X-Sendfile`
+(Apache, lighttpd) header and the front server sends the bytes itself,
+ranges included, so no worker is tied up streaming a file. Without it, ASGI
+responses read the file in chunks in worker threads rather than on the
+event loop.
+"""
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+from .storage import digest_of
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MUTABLE_MAX_AGE = 60 * 60
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def servable(name):
+    """Whether `name` is in one of the upload directories /media/ may serve (MEDIA_SERVED_PREFIXES)."""
+    return not name.startswith('/') and '..' not in name.split('/') and name.startswith(
+        tuple(settings.MEDIA_SERVED_PREFIXES)
+    )
+
+
+def locate(name):
+    """(absolute path, os.stat_result) of a servable stored file, or None if there is none."""
+    if not servable(name):
+        return None
+    try:
+        path = default_storage.path(name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        return None
+    return (path, stat) if os.path.isfile(path) else None
+
+
+def etag(name, stat):
+    digest = digest_of(name)
+    return quote_etag(digest) if digest else f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def last_modified(stat):
+    return datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+
+
+def byte_range(header, size):
+    """(start, end inclusive) for a `Range` header, None to send the whole file, or False if unsatisfiable.
+
+    Only single ranges are honoured; a multi-range request gets the whole
+    file, which RFC 9110 allows.
+    """
+    match = _RANGE.match((header or '').replace(' ', ''))
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        return (max(0, size - length), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return None if end < start else (start, end)
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+async def _aread(path, start, length):
+    # Opening, seeking and every read run in a worker thread, so the event loop never waits on the disk
+    f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+    try:
+        await sync_to_async(f.seek, thread_sensitive=False)(start)
+        read = sync_to_async(f.read, thread_sensitive=False)
+        while length > 0:
+            chunk = await read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def response(request, name, path, stat):
+    """The response for a stored file; conditional headers have already been checked."""
+    tag = etag(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    offload = settings.MEDIA_OFFLOAD
+    if offload == 'x-accel-redirect':
+        result = HttpResponse(content_type=content_type)
+        result['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif offload == 'x-sendfile':
+        result = HttpResponse(content_type=content_type)
+        result['X-Sendfile'] = path
+    else:
+        result = _serve(request, path, stat.st_size, tag, content_type)
+    result['ETag'] = tag
+    result['Last-Modified'] = http_date(stat.st_mtime)
+    result['Accept-Ranges'] = 'bytes'
+    # Student photos: browsers may keep them, shared caches may not
+    if digest_of(name):
+        result['Cache-Control'] = f'private, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        result['Cache-Control'] = f'private, max-age={MUTABLE_MAX_AGE}'
+    return result
+
+
+def _serve(request, path, size, tag, content_type):
+    wanted = byte_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if wanted and if_range and (if_range != tag or tag.startswith('W/')):
+        wanted = None  # The client's copy may be outdated (weak tags never match): send the whole file
+    if wanted is False:
+        result = HttpResponse(status=416)
+        result['Content-Range'] = f'bytes */{size}'
+        return result
+    asgi = isinstance(request, ASGIRequest)
+    if wanted is None:
+        if not asgi:
+            # Under WSGI, FileResponse hands the file to wsgi.file_wrapper (sendfile() on servers
+            # such as gunicorn); an ASGI server would read a sync body into memory in one go
+            return FileResponse(open(path, 'rb'), content_type=content_type)
+        result = StreamingHttpResponse(_aread(path, 0, size), content_type=content_type)
+        result['Content-Length'] = str(size)
+        return result
+    start, end = wanted
+    length = end - start + 1
+    chunks = _aread(path, start, length) if asgi else _read(path, start, length)
+    result = StreamingHttpResponse(chunks, status=206, content_type=content_type)
+    result['Content-Range'] = f'bytes {start}-{end}/{size}'
+    result['Content-Length'] = str(length)
+    return result
@@ -0,0 +1,74 @@
+# Generated by Django 5.1 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_batches(apps, schema_editor):
+    Admission = apps.get_model('admissions', 'Admission')
+    Lecture = apps.get_model('admissions', 'Lecture')
+    Batch = apps.get_model('admissions', 'Batch')
+    BatchMembership = apps.get_model('admissions', 'BatchMembership')
+
+    pairs = set()
+    for model in (Admission, Lecture):
+        for standard, name in model.objects.values_list('standard', 'batch').distinct():
+            pairs.add((standard, (name or '').strip()))
+    Batch.objects.bulk_create([Batch(standard=s, name=n) for s, n in pairs], ignore_conflicts=True)
+    batch_ids = {(b.standard, b.name): b.id for b in Batch.objects.all()}
+
+    memberships = [
+        BatchMembership(student_id=pk, batch_id=batch_ids[(standard, (name or '').strip())])
+        for pk, standard, name in Admission.objects.values_list('id', 'standard', 'batch').iterator()
+    ]
+    BatchMembership.objects.bulk_create(memberships, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0004_payment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='roster_frozen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Batch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('standard', models.CharField(choices=[('jr_kg', 'Jr. KG'), ('sr_kg', 'Sr. KG'), ('1', '1st'), ('2', '2nd'), ('3', '3rd'), ('4', '4th'), ('5', '5th'), ('6', '6th'), ('7', '7th'), ('8', '8th'), ('9', '9th'), ('10', '10th'), ('11', '11th'), ('12', '12th')], max_length=10)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['standard', 'name'],
+                'unique_together': {('standard', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BatchMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='admissions.batch')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='batch_membership', to='admissions.admission')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LectureRosterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_entries', to='admissions.lecture')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_entries', to='admissions.admission')),
+            ],
+            options={
+                'ordering': ['lecture', 'position'],
+                'unique_together': {('lecture', 'student')},
+            },
+        ),
+        migrations.RunPython(populate_batches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-19 17:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    # Carry existing paid totals into the ledger so amount_paid stays equal to its sum
+    Payment = apps.get_model('admissions', 'Payment')
+    PaymentTransaction = apps.get_model('admissions', 'PaymentTransaction')
+    PaymentTransaction.objects.bulk_create([
+        PaymentTransaction(payment_id=pk, amount=paid, kind='opening', notes='Balance before ledger')
+        for pk, paid in Payment.objects.filter(amount_paid__gt=0).values_list('id', 'amount_paid')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0005_batch_roster_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('payment', 'Payment'), ('settlement', 'Month-end settlement'), ('opening', 'Opening balance')], default='payment', max_length=10)),
+                ('notes', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='admissions.payment')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['payment', 'created_at'], name='admissions__payment_5f3154_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
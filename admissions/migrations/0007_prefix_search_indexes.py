@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-19 18:04
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0006_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(django.db.models.functions.text.Lower('surname'), name='admission_surname_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='admission_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(django.db.models.functions.text.Lower('mobile_1'), name='admission_mobile_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='lecture_title_lower_idx'),
+        ),
+    ]
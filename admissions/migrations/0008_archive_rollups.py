@@ -0,0 +1,59 @@
+# Generated by Django 5.1 on 2026-10-19 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0007_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('enquiry', 'Enquiries'), ('attendance', 'Attendance')], max_length=10)),
+                ('period', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('rows', models.PositiveIntegerField()),
+                ('first_key', models.PositiveIntegerField()),
+                ('last_key', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['kind', 'period', 'first_key'],
+                'indexes': [models.Index(fields=['kind', 'period'], name='admissions__kind_783959_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EnquiryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('preferred_course', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('month', 'preferred_course', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=7)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='admissions.admission')),
+            ],
+            options={
+                'ordering': ['-academic_year'],
+                'unique_together': {('academic_year', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0008_archive_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceNote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('notes', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LectureAttendanceBitmap',
+            fields=[
+                ('lecture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_bitmap', serialize=False, to='admissions.lecture')),
+                ('size', models.PositiveIntegerField(help_text='Roster length when attendance was taken')),
+                ('present', models.BinaryField()),
+                ('absent', models.BinaryField()),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='attendancerecord',
+            name='admissions__lecture_07f5f4_idx',
+        ),
+        migrations.AddField(
+            model_name='attendancenote',
+            name='lecture',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_notes', to='admissions.lecture'),
+        ),
+        migrations.AddField(
+            model_name='lectureattendancebitmap',
+            name='marked_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='admissions.faculty'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendancenote',
+            unique_together={('lecture', 'position')},
+        ),
+    ]
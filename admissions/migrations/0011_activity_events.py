@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-19 18:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0010_audit_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('kind', models.CharField(choices=[('enquiry', 'Enquiries'), ('admission', 'Admissions'), ('lecture', 'Lectures'), ('attendance', 'Attendance'), ('payment', 'Payments'), ('faculty', 'Faculty')], max_length=12)),
+                ('verb', models.CharField(max_length=12)),
+                ('target_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('detail', models.CharField(blank=True, max_length=200)),
+                ('username', models.CharField(blank=True, max_length=150)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='activity_feed_idx'), models.Index(fields=['kind', '-created_at', '-id'], name='activity_kind_idx')],
+            },
+        ),
+    ]
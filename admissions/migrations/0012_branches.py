@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-19 19:06
+
+import admissions.branches
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0011_activity_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityevent',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='admission',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='faculty',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def unfreeze_empty_rosters(apps, schema_editor):
+    # Lectures opened before their batch had members were frozen with no students; let them refreeze
+    Lecture = apps.get_model('admissions', 'Lecture')
+    Lecture.objects.filter(roster_frozen_at__isnull=False, roster_entries__isnull=True,
+                           attendance_records__isnull=True).update(roster_frozen_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0012_branches'),
+    ]
+
+    operations = [
+        migrations.RunPython(unfreeze_empty_rosters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-19 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0013_unfreeze_empty_rosters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='admission',
+            name='admission_mobile_lower_idx',
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['mobile_1'], name='admission_mobile_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 19:44
+
+import admissions.branches
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0014_admission_mobile_index'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='enquiryrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='enquiryrollup',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AlterUniqueTogether(
+            name='enquiryrollup',
+            unique_together={('branch', 'month', 'preferred_course', 'status')},
+        ),
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['branch', '-created_at', '-id'], name='activity_branch_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['branch', 'kind', '-created_at', '-id'], name='activity_branch_kind_idx'),
+        ),
+    ]
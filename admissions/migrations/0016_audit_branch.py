@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-19 20:01
+
+import admissions.branches
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0015_branch_rollups_and_activity_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='branch',
+            field=models.CharField(default=admissions.branches.current_or_default, editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['branch', '-created_at', '-id'], name='audit_branch_idx'),
+        ),
+    ]
@@ -1,11 +1,36 @@
-from django.db import models
+import sys
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Lower, TruncMonth
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date
 
+from . import branches
+
 # Create your models here.
 
+
+class BranchManager(models.Manager):
+    """Default manager of branch-partitioned models: only the current branch's rows (see `branches`).
+
+    Their `branch` column is deliberately not indexed on its own: with a
+    handful of branches SQLite would pick it over the selective indexes.
+    """
+
+    def __init__(self, lookup='branch'):
+        super().__init__()
+        # Models without a branch of their own are scoped through a relation, e.g. 'payment__branch'
+        self.lookup = lookup
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        code = branches.scope()
+        return queryset if code is None else queryset.filter(**{self.lookup: code})
+
+
 class Enquiry(models.Model):
     id = models.AutoField(primary_key=True)
     student_name = models.CharField(max_length=100)
@@ -44,10 +69,62 @@ class Enquiry(models.Model):
         ('not_interested', 'Not Interested'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_process')
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
 
     def __str__(self):
         return self.student_name
 
+class PrefixSearchQuerySet(models.QuerySet):
+    """Case-insensitive prefix search that index range scans can answer.
+
+    Each word must prefix one of `prefix_fields`, written as
+    lower(field) >= word AND lower(field) < successor, where the successor
+    is `word` with its last character incremented: exactly the strings
+    starting with `word` under the code-point order SQLite's BINARY and
+    Postgres's "C" collations use. Both databases serve that from an index
+    on Lower(field); LIKE 'word%' would not use a plain index on either.
+    `uncased_fields` (digits and codes) are compared as stored, so a plain
+    index on the column serves them.
+    """
+    prefix_fields = ()
+    uncased_fields = ()
+    max_words = 3
+
+    def prefix_search(self, term):
+        words = (term or '').lower().split()[:self.max_words]
+        lowered = [field for field in self.prefix_fields if field not in self.uncased_fields]
+        qs = self.alias(**{f'{field}_lower': Lower(field) for field in lowered})
+        for word in words:
+            bound = prefix_successor(word)
+            match = models.Q()
+            for field in self.prefix_fields:
+                column = f'{field}_lower' if field in lowered else field
+                condition = models.Q(**{f'{column}__gte': word})
+                if bound:
+                    condition &= models.Q(**{f'{column}__lt': bound})
+                match |= condition
+            qs = qs.filter(match)
+        return qs
+
+
+def prefix_successor(prefix):
+    """The smallest string after every string starting with `prefix`, or '' if there is none."""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else ''
+
+
+class AdmissionQuerySet(PrefixSearchQuerySet):
+    prefix_fields = ('surname', 'name', 'mobile_1')
+    uncased_fields = ('mobile_1',)
+
+
+class LectureQuerySet(PrefixSearchQuerySet):
+    prefix_fields = ('title',)
+
+
 class Admission(models.Model):
     id = models.AutoField(primary_key=True)
     surname = models.CharField(max_length=50)
@@ -83,6 +160,17 @@ class Admission(models.Model):
     )
 
     submitted_at = models.DateTimeField(auto_now_add=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager.from_queryset(AdmissionQuerySet)()
+    all_branches = AdmissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(Lower('surname'), name='admission_surname_lower_idx'),
+            models.Index(Lower('name'), name='admission_name_lower_idx'),
+            models.Index(fields=['mobile_1'], name='admission_mobile_idx'),
+        ]
 
     def full_name(self):
         return f"{self.surname} {self.name} {self.middlename or ''}"
@@ -90,6 +178,47 @@ class Admission(models.Model):
     def __str__(self):
         return self.full_name()
 
+    def save(self, *args, **kwargs):
+        self.batch = (self.batch or '').strip()
+        super().save(*args, **kwargs)
+        BatchMembership.assign(self)
+
+
+class Batch(models.Model):
+    """Normalized (standard, batch name) pair that admissions and lectures refer to."""
+    standard = models.CharField(max_length=10, choices=Admission.STANDARD_CHOICES)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('standard', 'name')
+        ordering = ['standard', 'name']
+
+    def __str__(self):
+        return f"{self.get_standard_display()} / {self.name}"
+
+    @classmethod
+    def resolve(cls, standard, name, create=True):
+        """Return the Batch for a free-text batch name, optionally creating it."""
+        name = (name or '').strip()
+        if create:
+            return cls.objects.get_or_create(standard=standard, name=name)[0]
+        return cls.objects.filter(standard=standard, name=name).first()
+
+
+class BatchMembership(models.Model):
+    """Current batch of a student. One row per admission, moved when the batch changes."""
+    student = models.OneToOneField(Admission, on_delete=models.CASCADE, related_name='batch_membership')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='memberships')
+    joined_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student} in {self.batch}"
+
+    @classmethod
+    def assign(cls, admission):
+        batch = Batch.resolve(admission.standard, admission.batch)
+        cls.objects.update_or_create(student=admission, defaults={'batch': batch})
+
 
 class Faculty(models.Model):
     """Faculty profile linked to Django auth User for login."""
@@ -97,6 +226,10 @@ class Faculty(models.Model):
     full_name = models.CharField(max_length=120)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
 
     def __str__(self):
         return self.full_name
@@ -112,17 +245,68 @@ class Lecture(models.Model):
     standard = models.CharField(max_length=10, choices=Admission.STANDARD_CHOICES)
     batch = models.CharField(max_length=100)
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='lectures')
+    # Set when attendance is first opened; from then on the roster is read from LectureRosterEntry
+    roster_frozen_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager.from_queryset(LectureQuerySet)()
+    all_branches = LectureQuerySet.as_manager()
 
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(Lower('title'), name='lecture_title_lower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.get_standard_display()} ({self.batch}) on {self.date}"
 
+    def save(self, *args, **kwargs):
+        self.batch = (self.batch or '').strip()
+        super().save(*args, **kwargs)
+
     def get_target_students_queryset(self):
-        return Admission.objects.filter(standard=self.standard, batch=self.batch).order_by('surname', 'name')
+        """Students of this lecture: the frozen snapshot if taken, else the live batch."""
+        if self.roster_frozen_at:
+            return Admission.objects.filter(roster_entries__lecture=self).order_by('roster_entries__position')
+        batch = Batch.resolve(self.standard, self.batch, create=False)
+        if batch is None:
+            return Admission.objects.none()
+        return Admission.objects.filter(batch_membership__batch=batch).order_by('surname', 'name')
+
+    def freeze_roster(self):
+        """Snapshot the current batch members so later batch moves don't change this lecture.
+
+        A batch with no members yet is not frozen, so students admitted later still appear.
+        """
+        if self.roster_frozen_at:
+            return
+        with transaction.atomic():
+            locked = Lecture.objects.select_for_update().get(pk=self.pk)
+            if locked.roster_frozen_at is None:
+                student_ids = list(self.get_target_students_queryset().values_list('id', flat=True))
+                if not student_ids:
+                    return
+                LectureRosterEntry.objects.bulk_create([
+                    LectureRosterEntry(lecture=self, student_id=sid, position=pos)
+                    for pos, sid in enumerate(student_ids)
+                ])
+                locked.roster_frozen_at = timezone.now()
+                Lecture.objects.filter(pk=self.pk).update(roster_frozen_at=locked.roster_frozen_at)
+            self.roster_frozen_at = locked.roster_frozen_at
+
+
+class LectureRosterEntry(models.Model):
+    """Frozen roster row: which student sat in a lecture, in display order."""
+    lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='roster_entries')
+    student = models.ForeignKey(Admission, on_delete=models.CASCADE, related_name='roster_entries')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('lecture', 'student')
+        ordering = ['lecture', 'position']
 
 
 class AttendanceRecord(models.Model):
@@ -138,22 +322,70 @@ class AttendanceRecord(models.Model):
     marked_by = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name='marked_attendance')
     marked_at = models.DateTimeField(auto_now_add=True)
     notes = models.CharField(max_length=255, blank=True, null=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
 
     class Meta:
+        # The unique constraint's index already covers (lecture, student) lookups
         unique_together = ('lecture', 'student')
-        indexes = [
-            models.Index(fields=['lecture', 'student']),
-        ]
 
     def __str__(self):
         return f"{self.student.full_name()} - {self.lecture.title} - {self.status}"
 
 
+class LectureAttendanceBitmap(models.Model):
+    """Compact attendance for one lecture: bit i is roster position i (see `bitmaps`)."""
+    lecture = models.OneToOneField(Lecture, on_delete=models.CASCADE, primary_key=True, related_name='attendance_bitmap')
+    size = models.PositiveIntegerField(help_text='Roster length when attendance was taken')
+    present = models.BinaryField()
+    absent = models.BinaryField()
+    marked_by = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    marked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.lecture.title} - {int.from_bytes(self.present, 'little').bit_count()}/{self.size} present"
+
+
+class AttendanceNote(models.Model):
+    """Sparse per-student note for a bitmap-stored lecture."""
+    lecture = models.ForeignKey(Lecture, on_delete=models.CASCADE, related_name='attendance_notes')
+    position = models.PositiveIntegerField()
+    notes = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('lecture', 'position')
+
+
+def month_bounds(month: date):
+    """Return (first day, first day of next month) for the month containing `month`."""
+    month_start = date(month.year, month.month, 1)
+    if month.month == 12:
+        return month_start, date(month.year + 1, 1, 1)
+    return month_start, date(month.year, month.month + 1, 1)
+
+
+class PaymentQuerySet(models.QuerySet):
+    def with_lecture_counts(self):
+        """Annotate `lecture_total` (lectures in each payment's month) via one correlated subquery."""
+        lectures = (
+            Lecture.objects.annotate(lecture_month=TruncMonth('date'))
+            .filter(faculty=models.OuterRef('faculty'), lecture_month=models.OuterRef('month'))
+            .values('faculty')
+            .annotate(c=models.Count('id'))
+            .values('c')
+        )
+        return self.annotate(lecture_total=Coalesce(models.Subquery(lectures[:1]), 0))
+
+
 class Payment(models.Model):
     """Monthly payment tracking for a faculty, including per-lecture rate and paid amount.
 
     The number of lectures for the month is derived from the `Lecture` model
-    for the given `faculty` and `month` range.
+    for the given `faculty` and `month` range. `amount_paid` is a cached sum of
+    the month's `PaymentTransaction` ledger and is only changed through
+    `record_payment()`.
     """
     faculty = models.ForeignKey('Faculty', on_delete=models.CASCADE, related_name='payments')
     # Use the first day of the month to represent the month (e.g., 2025-10-01)
@@ -163,6 +395,10 @@ class Payment(models.Model):
     notes = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager.from_queryset(PaymentQuerySet)()
+    all_branches = PaymentQuerySet.as_manager()
 
     class Meta:
         unique_together = ('faculty', 'month')
@@ -172,17 +408,23 @@ class Payment(models.Model):
         ym = self.month.strftime('%Y-%m')
         return f"{self.faculty.full_name} - {ym}"
 
+    def save(self, *args, **kwargs):
+        # Never write a stale amount_paid over a concurrent ledger update
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'amount_paid'
+            ]
+        super().save(*args, **kwargs)
+
     @staticmethod
     def month_start_for(d: date) -> date:
         return date(d.year, d.month, 1)
 
     @property
     def lectures_count(self) -> int:
-        month_start = date(self.month.year, self.month.month, 1)
-        if self.month.month == 12:
-            next_month = date(self.month.year + 1, 1, 1)
-        else:
-            next_month = date(self.month.year, self.month.month + 1, 1)
+        if 'lecture_total' in self.__dict__:
+            return self.lecture_total
+        month_start, next_month = month_bounds(self.month)
         return self.faculty.lectures.filter(date__gte=month_start, date__lt=next_month).count()
 
     @property
@@ -192,3 +434,211 @@ class Payment(models.Model):
     @property
     def balance(self) -> Decimal:
         return self.amount_due - (self.amount_paid or Decimal('0.00'))
+
+    def record_payment(self, amount, user=None, kind='payment', notes=None):
+        """Append a ledger entry and bump the cached total atomically."""
+        with transaction.atomic():
+            entry = PaymentTransaction.objects.create(
+                payment=self, amount=amount, kind=kind, recorded_by=user, notes=notes,
+            )
+            Payment.objects.filter(pk=self.pk).update(
+                amount_paid=models.F('amount_paid') + amount, updated_at=timezone.now(),
+            )
+        self.refresh_from_db(fields=['amount_paid', 'updated_at'])
+        return entry
+
+    def recompute_amount_paid(self):
+        """Rebuild the cached total from the ledger (repairs drift after manual edits)."""
+        total = self.transactions.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+        Payment.objects.filter(pk=self.pk).update(amount_paid=total)
+        self.amount_paid = total
+        return total
+
+
+class PaymentTransaction(models.Model):
+    """Append-only ledger entry for money paid against a monthly `Payment`."""
+    KIND_CHOICES = (
+        ('payment', 'Payment'),
+        ('settlement', 'Month-end settlement'),
+        ('opening', 'Opening balance'),
+    )
+
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='transactions')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='payment')
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment_transactions')
+    notes = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BranchManager('payment__branch')
+    all_branches = models.Manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['payment', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.payment} - {self.amount} ({self.kind})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries are append-only; record a correcting entry instead.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only; record a correcting entry instead.')
+
+
+def academic_year(day: date) -> str:
+    """Label such as '2024-25' for the academic year containing `day`."""
+    from django.conf import settings
+
+    start = day.year if day.month >= settings.ACADEMIC_YEAR_START_MONTH else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+class ArchiveSegment(models.Model):
+    """One compressed JSONL file of rows moved out of a live table by `archive_data`."""
+    KIND_CHOICES = (
+        ('enquiry', 'Enquiries'),
+        ('attendance', 'Attendance'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    period = models.CharField(max_length=10)  # calendar year for enquiries, academic year for attendance
+    path = models.CharField(max_length=255)  # relative to PRIVATE_ROOT
+    rows = models.PositiveIntegerField()
+    # Key range inside the file (enquiry id / lecture id) so lookups can skip segments
+    first_key = models.PositiveIntegerField()
+    last_key = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['kind', 'period', 'first_key']
+        indexes = [
+            models.Index(fields=['kind', 'period']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.period} ({self.rows} rows)"
+
+
+class EnquiryRollup(models.Model):
+    """Monthly enquiry counts kept after the rows themselves are archived, per branch."""
+    month = models.DateField()
+    preferred_course = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    total = models.PositiveIntegerField(default=0)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
+
+    class Meta:
+        unique_together = ('branch', 'month', 'preferred_course', 'status')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.preferred_course} {self.status}: {self.total}"
+
+
+class AttendanceRollup(models.Model):
+    """Per-student attendance totals for an archived academic year."""
+    academic_year = models.CharField(max_length=7)
+    student = models.ForeignKey(Admission, on_delete=models.CASCADE, related_name='attendance_rollups')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('academic_year', 'student')
+        ordering = ['-academic_year']
+
+    def __str__(self):
+        return f"{self.student} {self.academic_year}: {self.present}/{self.present + self.absent}"
+
+
+class AuditLog(models.Model):
+    """Append-only record of one change to an audited model, written in batches by admissions/audit.py."""
+    ACTION_CHOICES = (
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    model = models.CharField(max_length=50)  # app_label.model_name
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)  # {field: [old, new]}
+    # Covered by the (user, created_at) index; the username survives the account being deleted
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_index=False)
+    username = models.CharField(max_length=150, blank=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['model', 'object_id', '-created_at'], name='audit_object_idx'),
+            models.Index(fields=['user', '-created_at'], name='audit_user_idx'),
+            models.Index(fields=['branch', '-created_at', '-id'], name='audit_branch_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.username or 'system'} {self.action} {self.model} #{self.object_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Audit entries are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Audit entries are append-only.')
+
+
+class ActivityEvent(models.Model):
+    """One line of the staff activity feed; written by admissions/activity.py, never changed afterwards."""
+    KIND_CHOICES = (
+        ('enquiry', 'Enquiries'),
+        ('admission', 'Admissions'),
+        ('lecture', 'Lectures'),
+        ('attendance', 'Attendance'),
+        ('payment', 'Payments'),
+        ('faculty', 'Faculty'),
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    verb = models.CharField(max_length=12)  # created, updated, deleted, marked, recorded
+    target_id = models.BigIntegerField()  # What the event links to (see activity.LINKS)
+    title = models.CharField(max_length=200)
+    detail = models.CharField(max_length=200, blank=True)
+    username = models.CharField(max_length=150, blank=True)
+    branch = models.CharField(max_length=20, default=branches.current_or_default, editable=False)
+
+    objects = BranchManager()
+    all_branches = models.Manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='activity_feed_idx'),
+            models.Index(fields=['kind', '-created_at', '-id'], name='activity_kind_idx'),
+            # The same feeds filtered to the branch being served
+            models.Index(fields=['branch', '-created_at', '-id'], name='activity_branch_feed_idx'),
+            models.Index(fields=['branch', 'kind', '-created_at', '-id'], name='activity_branch_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M} {self.title}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Activity events are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Activity events are append-only.')
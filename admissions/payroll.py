@@ -0,0 +1,130 @@
+"""Month-end payroll: one grouped query for every faculty, payslips rendered in parallel."""
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import branches
+from .models import Faculty, Payment, month_bounds
+from .payslips import render_payslip_job
+
+ZERO = Decimal('0.00')
+# Longest a run may hold its month's lock if the process dies mid-run
+LOCK_TIMEOUT = 15 * 60
+
+
+class PayrollBusy(Exception):
+    """Another run for the same month is in progress."""
+
+
+def payroll_rows(month):
+    """Lecture counts, dues and balances for every active faculty in a single query."""
+    month_start, next_month = month_bounds(month)
+    payment = Payment.objects.filter(faculty=OuterRef('pk'), month=month_start)
+    money = DecimalField(max_digits=12, decimal_places=2)
+    rows = (
+        Faculty.objects.filter(is_active=True)
+        .annotate(
+            lecture_total=Count('lectures', filter=Q(lectures__date__gte=month_start, lectures__date__lt=next_month)),
+            per_lecture_rate=Coalesce(Subquery(payment.values('per_lecture_rate')[:1]), Value(ZERO), output_field=money),
+            amount_paid=Coalesce(Subquery(payment.values('amount_paid')[:1]), Value(ZERO), output_field=money),
+        )
+        .order_by('full_name')
+        .values('id', 'full_name', 'lecture_total', 'per_lecture_rate', 'amount_paid')
+    )
+    result = []
+    for row in rows:
+        row['amount_due'] = row['per_lecture_rate'] * row['lecture_total']
+        row['balance'] = row['amount_due'] - row['amount_paid']
+        result.append(row)
+    return result
+
+
+def payroll_dir(month):
+    """Payslips and archive of the branch being served (each branch pays its own faculty)."""
+    return os.path.join(settings.PRIVATE_ROOT, 'payroll', branches.current_or_default(), f'{month:%Y-%m}')
+
+
+def archive_path(month):
+    return os.path.join(payroll_dir(month), f'Super20_Payroll_{month:%Y-%m}.zip')
+
+
+def _fingerprint(row):
+    payload = json.dumps({k: str(v) for k, v in sorted(row.items())})
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_payroll(month, workers=None):
+    """Generate payslips for `month`, skipping faculties whose inputs are unchanged.
+
+    Covers the branch being served. Returns a summary dict with the rows,
+    generated/skipped counts and the zip path. Runs for the same branch and
+    month are serialised through a cache lock (shared between workers when
+    CACHE_URL is set); a second one raises PayrollBusy.
+    """
+    month_start, _ = month_bounds(month)
+    lock = f'payroll-lock:{branches.current_or_default()}:{month_start:%Y-%m}'
+    if not cache.add(lock, os.getpid(), timeout=LOCK_TIMEOUT):
+        raise PayrollBusy(f'Payroll for {month_start:%Y-%m} is already being generated')
+    try:
+        return _run(month_start, workers)
+    finally:
+        cache.delete(lock)
+
+
+def _run(month_start, workers):
+    # Only month-end runs need process pools and zip files; keep them out of worker startup
+    import zipfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    rows = payroll_rows(month_start)
+    out_dir = payroll_dir(month_start)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        manifest = {}
+
+    label = f'{month_start:%Y-%m}'
+    jobs, fingerprints = [], {}
+    for row in rows:
+        filename = f'payslip_{row["id"]}.xlsx'
+        fingerprints[filename] = _fingerprint(row)
+        if manifest.get(filename) == fingerprints[filename] and os.path.exists(os.path.join(out_dir, filename)):
+            continue
+        jobs.append((filename, row, label))
+
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render_payslip_job, jobs, chunksize=8))
+    else:
+        results = [render_payslip_job(job) for job in jobs]
+    for filename, content in results:
+        with open(os.path.join(out_dir, filename), 'wb') as fh:
+            fh.write(content)
+
+    with open(manifest_path, 'w') as fh:
+        json.dump(fingerprints, fh)
+
+    zip_path = archive_path(month_start)
+    if results or not os.path.exists(zip_path) or set(fingerprints) != set(manifest):
+        tmp_path = zip_path + '.tmp'
+        # XLSX files are already deflated, so store them as-is
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as bundle:
+            for filename in fingerprints:
+                bundle.write(os.path.join(out_dir, filename), filename)
+        os.replace(tmp_path, zip_path)
+
+    return {
+        'rows': rows,
+        'generated': len(results),
+        'skipped': len(rows) - len(results),
+        'archive': zip_path,
+    }
@@ -0,0 +1,42 @@
+"""Payslip rendering, kept free of ORM access so it can run in worker processes."""
+from io import BytesIO
+
+
+def render_payslip(row, month_label):
+    """Return an XLSX payslip for one payroll row (a plain dict) as bytes."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Payslip'
+    ws.merge_cells('A1:B1')
+    ws['A1'] = f'Super20 Academy - Payslip {month_label}'
+    ws['A1'].font = Font(bold=True, size=14)
+    ws['A1'].alignment = Alignment(horizontal='center')
+
+    lines = [
+        ('Faculty', row['full_name']),
+        ('Faculty ID', row['id']),
+        ('Month', month_label),
+        ('Lectures', row['lecture_total']),
+        ('Per Lecture Rate', float(row['per_lecture_rate'])),
+        ('Gross Salary', float(row['amount_due'])),
+        ('Paid', float(row['amount_paid'])),
+        ('Pending', float(row['balance'])),
+    ]
+    for offset, (label, value) in enumerate(lines, start=3):
+        ws.cell(row=offset, column=1, value=label).font = Font(bold=True)
+        ws.cell(row=offset, column=2, value=value)
+    ws.column_dimensions['A'].width = 20
+    ws.column_dimensions['B'].width = 30
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def render_payslip_job(job):
+    """Process-pool entry point: (filename, row, month_label) -> (filename, bytes)."""
+    filename, row, month_label = job
+    return filename, render_payslip(row, month_label)
@@ -0,0 +1,114 @@
+"""Branch and primary/replica database routing.
+
+`BranchRouter` comes first: while a branch with its own database is being
+served (BRANCH_DATABASES, see admissions/branches.py) every query goes to
+that database, and the rules below only apply to the default one.
+
+Writes always go to the primary. Reads go to the `replica` alias only while a
+whitelisted read-heavy view (settings.REPLICA_READ_VIEWS) handles a GET, and
+only if the client has not written recently: every unsafe request sets a short
+`pin_primary` cookie so the next pages read their own writes from the primary.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'pin_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class BranchRouter:
+    def _branch_database(self):
+        from .branches import current, database_for
+
+        code = current()
+        return database_for(code) if code else None
+
+    def db_for_read(self, model, **hints):
+        return self._branch_database()
+
+    def db_for_write(self, model, **hints):
+        return self._branch_database()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Branch databases hold every table, auth and sessions included
+        return None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary through replication
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_configured():
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if (
+            request.method in ('GET', 'HEAD')
+            and match is not None
+            and match.url_name in settings.REPLICA_READ_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            _use_replica.set(True)
+        return None
+
+
+def read_from_replica():
+    """True when reads in the current request are being served by the replica."""
+    return _use_replica.get() and replica_configured()
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import activity, audit, calendar_feed, live, storage
+from .models import AttendanceRecord, Lecture, PaymentTransaction
+
+
+@receiver(post_init, sender=Lecture)
+def remember_lecture_scopes(sender, instance, **kwargs):
+    # Feeds the lecture belonged to when loaded, so an edit can also update the old ones
+    if instance.pk and not instance.get_deferred_fields() & {'faculty_id', 'standard', 'batch', 'branch'}:
+        instance._calendar_scopes = calendar_feed.lecture_scopes(instance)
+
+
+@receiver(post_save, sender=Lecture)
+def lecture_saved(sender, instance, **kwargs):
+    calendar_feed.lecture_changed(instance, getattr(instance, '_calendar_scopes', ()))
+    instance._calendar_scopes = calendar_feed.lecture_scopes(instance)
+
+
+@receiver(post_delete, sender=Lecture)
+def lecture_deleted(sender, instance, **kwargs):
+    calendar_feed.lecture_changed(instance, getattr(instance, '_calendar_scopes', ()), deleted=True)
+
+
+@receiver(post_save, sender=Lecture)
+@receiver(post_delete, sender=Lecture)
+def lecture_changed_live(sender, instance, **kwargs):
+    # str(): the create/edit views assign the form's date string straight to the field
+    live.publish_on_commit('attendance', {'lecture_id': instance.pk, 'date': str(instance.date)})
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def attendance_changed_live(sender, instance, **kwargs):
+    # Single-row writes (admin, shell); the attendance view's bulk writes publish for themselves.
+    # No delete receiver: it would stop lecture deletes and archiving from deleting rows in bulk
+    live.publish_on_commit('attendance', {'lecture_id': instance.lecture_id})
+
+
+def audit_snapshot(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._audit_snapshot = audit.snapshot(instance)
+
+
+def audited_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # One diff feeds both the audit trail and the activity feed
+    if raw:  # loaddata
+        return
+    after = audit.snapshot(instance)
+    if created:
+        action, changes = 'create', {name: [None, value] for name, value in after.items() if value not in (None, '')}
+    else:
+        fields = {sender._meta.get_field(name).attname for name in update_fields} if update_fields else None
+        action, changes = 'update', audit.diff(getattr(instance, '_audit_snapshot', {}), after, fields)
+    audit.record(instance, action, changes)
+    activity.model_changed(instance, action, changes)
+    instance._audit_snapshot = after
+
+
+def audited_deleted(sender, instance, **kwargs):
+    before = getattr(instance, '_audit_snapshot', None) or audit.snapshot(instance)
+    changes = {name: [value, None] for name, value in before.items() if value not in (None, '')}
+    audit.record(instance, 'delete', changes)
+    activity.model_changed(instance, 'delete', changes)
+
+
+for _model in audit.AUDITED:
+    post_init.connect(audit_snapshot, sender=_model, dispatch_uid=f'audit-init-{_model._meta.label_lower}')
+    post_save.connect(audited_saved, sender=_model, dispatch_uid=f'audit-save-{_model._meta.label_lower}')
+    if _model is not AttendanceRecord:  # See attendance_changed_live
+        post_delete.connect(audited_deleted, sender=_model, dispatch_uid=f'audit-delete-{_model._meta.label_lower}')
+
+
+def remember_stored_files(sender, instance, **kwargs):
+    instance._stored_files = storage.stored_names(instance)
+
+
+def stored_files_saved(sender, instance, raw=False, **kwargs):
+    # A replaced photo loses a reference; it is removed if that was the last one
+    before = getattr(instance, '_stored_files', {})
+    after = storage.stored_names(instance)
+    storage.release_on_commit(instance, [name for attname, name in before.items() if name and after.get(attname) != name])
+    instance._stored_files = after
+
+
+def stored_files_deleted(sender, instance, **kwargs):
+    storage.release_on_commit(instance, [name for name in getattr(instance, '_stored_files', {}).values() if name])
+
+
+for _model in {model for model, _ in storage.file_fields()}:
+    post_init.connect(remember_stored_files, sender=_model, dispatch_uid=f'media-init-{_model._meta.label_lower}')
+    post_save.connect(stored_files_saved, sender=_model, dispatch_uid=f'media-save-{_model._meta.label_lower}')
+    post_delete.connect(stored_files_deleted, sender=_model, dispatch_uid=f'media-delete-{_model._meta.label_lower}')
+
+
+@receiver(post_save, sender=PaymentTransaction)
+def payment_recorded(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        activity.model_changed(instance, 'create', {})
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,247 @@
+"""Content-addressed storage for uploaded media.
+
+An upload to `photos/` is stored as `photos/<aa>/<sha256>.<ext>`, named by
+the SHA-256 of its bytes, so re-uploading the same photo (or the same photo
+for two students) stores it once instead of piling up `_abc123` copies.
+Files are written to a temporary name and renamed into place, and never
+change once there, which lets them be served with the hash as a strong
+ETag and cached as immutable (see media.py).
+
+A stored file's reference count is the number of rows in any database
+(the default one and every branch database) whose file field names it.
+`release()` removes a file once nothing references it; saves and deletes
+call it after they commit. `collect()` (`manage.py gc_media`) sweeps
+whatever was missed: files of uploads whose form never saved, rows removed
+with raw SQL, crashes. Neither touches a file stored or re-used within
+MEDIA_GC_GRACE_SECONDS, so an upload whose row has not committed yet is
+never taken for an orphan.
+
+Files uploaded before this storage keep their names and are served as
+before; `gc_media --adopt` moves them into the content-addressed layout.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models, router, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+INCOMING_DIR = '.incoming'
+_ADDRESS = re.compile(r'^(?:.+/)?[0-9a-f]{2}/([0-9a-f]{64})(?:\.[a-z0-9]{1,10})?$')
+_EXTENSION = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def digest_of(name):
+    """The SHA-256 a content-addressed name was derived from, or None for any other name."""
+    match = _ADDRESS.match(name or '')
+    return match.group(1) if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, so there is nothing to make unique here
+        return name
+
+    def address(self, name, digest):
+        """`<upload dir>/<aa>/<digest>.<ext>` for an upload originally called `name`."""
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        if not _EXTENSION.match(extension):
+            extension = ''
+        return '/'.join(part for part in (directory, digest[:2], digest + extension) if part)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            # Large uploads are already on disk: hash them, then move rather than copy
+            for chunk in content.chunks():
+                digest.update(chunk)
+            staged = None
+        else:
+            staged = self._stage(content, digest)
+        final = self.address(name, digest.hexdigest())
+        path = self.path(final)
+        try:
+            if os.path.exists(path):
+                os.utime(path)  # Re-used: restart its grace period (see collectable())
+                return final
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if staged is None:
+                file_move_safe(content.temporary_file_path(), path, allow_overwrite=True)  # A racing identical upload
+            else:
+                os.replace(staged, path)
+                staged = None
+            os.chmod(path, self.file_permissions_mode or 0o644)
+        finally:
+            if staged is not None:
+                os.unlink(staged)
+        return final
+
+    def _stage(self, content, digest):
+        """Copy `content` to a temporary file in MEDIA_ROOT while hashing it; returns its path."""
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, staged = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(staged)
+            raise
+        return staged
+
+    def delete(self, name):
+        """Remove `name` only if nothing references it any more (see release())."""
+        if digest_of(name):
+            release(name, self)
+        else:
+            super().delete(name)
+
+
+def file_fields():
+    """[(model, field)] for every file field kept in content-addressed storage."""
+    return [
+        (model, field) for model in apps.get_models() for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def _databases():
+    return ['default', *settings.BRANCH_DATABASES.values()]
+
+
+def references(names=None):
+    """Counter {name: rows referring to it} over every database (limited to `names` if given)."""
+    counts = Counter()
+    for model, field in file_fields():
+        for alias in _databases():
+            rows = model._base_manager.using(alias).exclude(**{field.attname: ''}).exclude(
+                **{f'{field.attname}__isnull': True}
+            )
+            if names is not None:
+                rows = rows.filter(**{f'{field.attname}__in': names})
+            for name, total in rows.values_list(field.attname).annotate(total=models.Count('pk')).order_by():
+                counts[name] += total
+    return counts
+
+
+def collectable(path, now=None):
+    """Whether an unreferenced file is old enough to remove."""
+    try:
+        modified = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    return (now or time.time()) - modified >= settings.MEDIA_GC_GRACE_SECONDS
+
+
+def release(name, storage=None):
+    """Remove a content-addressed file if no row references it; returns whether it was removed."""
+    storage = storage or default_storage
+    if not digest_of(name) or references([name])[name]:
+        return False
+    path = storage.path(name)
+    if not collectable(path):
+        return False
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def stored_names(instance):
+    """{attname: stored name} of an instance's content-addressed file fields that were loaded."""
+    names = {}
+    for field in instance._meta.concrete_fields:
+        if (isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+                and field.attname in instance.__dict__):
+            value = instance.__dict__[field.attname]
+            if isinstance(value, FieldFile):
+                value = value.name
+            if value is None or isinstance(value, str):  # Not an upload still waiting to be stored
+                names[field.attname] = value
+    return names
+
+
+def release_on_commit(instance, names):
+    """release() each of `names` once the transaction that dropped them commits."""
+    names = [name for name in names if digest_of(name)]
+    if not names:
+        return
+
+    def run():
+        for name in names:
+            try:
+                release(name)
+            except Exception:
+                logger.exception('Releasing media file %s failed; gc_media will remove it', name)
+    transaction.on_commit(run, using=router.db_for_write(type(instance)))
+
+
+def collect(storage=None, dry_run=False):
+    """Remove unreferenced content-addressed files and stale uploads; returns (files, bytes)."""
+    storage = storage or default_storage
+    root = storage.path('')
+    referenced = references()
+    now = time.time()
+    removed = freed = 0
+    for directory, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(directory, root)
+        in_incoming = relative_dir.split(os.sep)[0] == INCOMING_DIR
+        for filename in filenames:
+            name = os.path.normpath(os.path.join(relative_dir, filename)).replace(os.sep, '/')
+            if not in_incoming and (not digest_of(name) or name in referenced):
+                continue
+            path = os.path.join(directory, filename)
+            if not collectable(path, now):
+                continue
+            size = os.path.getsize(path)
+            if not dry_run:
+                os.unlink(path)
+            removed += 1
+            freed += size
+    return removed, freed
+
+
+def adopt(storage=None):
+    """Move files stored under their upload names into the content-addressed layout.
+
+    Rows are repointed with `update()` (no signals: the file's content does
+    not change). Returns (rows repointed, old files removed).
+    """
+    from django.core.files import File
+
+    moved = removed = 0
+    for model, field in file_fields():
+        target = storage or field.storage
+        for alias in _databases():
+            rows = model._base_manager.using(alias).exclude(**{field.attname: ''}).exclude(
+                **{f'{field.attname}__isnull': True}
+            )
+            legacy = {name for name in rows.values_list(field.attname, flat=True) if not digest_of(name)}
+            for name in sorted(legacy):
+                if not target.exists(name):
+                    logger.warning('Missing media file %s; left as is', name)
+                    continue
+                with target.open(name) as original:
+                    new_name = target.save(name, File(original, name=name))
+                moved += rows.filter(**{field.attname: name}).update(**{field.attname: new_name})
+                if not references([name])[name]:
+                    target.delete(name)
+                    removed += 1
+    return moved, removed
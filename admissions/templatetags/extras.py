@@ -1,4 +1,5 @@
 from django import template
+from django.urls import reverse
 
 register = template.Library()
 
@@ -11,3 +12,87 @@ def get_item(d, key):
         return None
 
 
+def _choice_labels():
+    from admissions.models import Enquiry, Admission, AttendanceRecord, PaymentTransaction
+
+    def labels(model, field):
+        return {str(value): str(label) for value, label in model._meta.get_field(field).flatchoices}
+
+    return {
+        'course': labels(Enquiry, 'preferred_course'),
+        'enquiry_status': labels(Enquiry, 'status'),
+        'standard': labels(Admission, 'standard'),
+        'stream': labels(Admission, 'stream'),
+        'attendance_status': labels(AttendanceRecord, 'status'),
+        'ledger_kind': labels(PaymentTransaction, 'kind'),
+    }
+
+
+# Built once per process; get_FOO_display() rebuilds a dict from the field's choices on every call
+CHOICE_LABELS = _choice_labels()
+
+
+@register.filter
+def choice_label(value, kind):
+    """`{{ enquiry.status|choice_label:"enquiry_status" }}` -> "In Process"."""
+    if value is None or value == '':
+        return ''
+    return CHOICE_LABELS[kind].get(str(value), value)
+
+
+@register.simple_tag(takes_context=True)
+def form_guard(context):
+    """Hidden honeypot and idempotency-key inputs for the public forms (see admissions.throttle)."""
+    from uuid import uuid4
+
+    from django.conf import settings
+    from django.utils.html import format_html
+
+    from admissions.throttle import IDEMPOTENCY_FIELD
+
+    request = context.get('request')
+    # A form re-shown with errors keeps its key, so the corrected resubmission is still one submission
+    key = request.POST.get(IDEMPOTENCY_FIELD, '') if request is not None and request.method == 'POST' else ''
+    return format_html(
+        '<input type="hidden" name="{}" value="{}">'
+        '<div aria-hidden="true" style="position:absolute;left:-10000px;">'
+        '<label>Leave this empty <input type="text" name="{}" tabindex="-1" autocomplete="off"></label></div>',
+        IDEMPOTENCY_FIELD, key or uuid4().hex, settings.FORM_HONEYPOT_FIELD,
+    )
+
+
+@register.inclusion_tag('admissions/_audit_history.html', takes_context=True)
+def audit_history(context, obj, limit=20):
+    """`{% audit_history enquiry %}`: the object's recent audit entries, shown to staff only."""
+    from admissions import audit
+
+    request = context.get('request')
+    if request is None or not request.access.is_staff:
+        return {'entries': None}
+    return {
+        'entries': audit.history(type(obj), obj.pk, limit),
+        'log_url': f"{reverse('audit_log')}?model={obj._meta.label_lower}&object={obj.pk}",
+    }
+
+
+@register.inclusion_tag('admissions/_branch_switcher.html', takes_context=True)
+def branch_switcher(context):
+    """`{% branch_switcher %}`: the branch being served, and for staff a menu to change it.
+
+    Renders nothing on a single-branch deployment.
+    """
+    from django.conf import settings
+
+    from admissions import branches
+
+    request = context.get('request')
+    if request is None or len(settings.BRANCHES) == 1 or not hasattr(request, 'branch'):
+        return {'branch': None}
+    can_switch = request.access.is_staff and not request.branch_pinned
+    return {
+        'branch': branches.name(request.branch),
+        'code': request.branch,
+        'choices': branches.switchable() if can_switch else [],
+        'is_staff': request.access.is_staff,
+        'csrf_token': context.get('csrf_token'),
+    }
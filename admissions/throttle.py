@@ -0,0 +1,135 @@
+"""Abuse shedding for the public enquiry and admission forms.
+
+`protect_form` screens a POST before the view validates it, cheapest check
+first: a token bucket per client IP (headers only, nothing parsed), a
+honeypot field bots tend to fill, a token bucket per phone number, and an
+idempotency key rendered into the form by `{% form_guard %}` so a double
+click or retry does not create a second row. Buckets and keys live in the
+default cache, which is shared by every worker when it is Redis.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import redirect
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_FIELD = 'idempotency_key'
+_lock = threading.Lock()
+
+
+def client_ip(request):
+    """The client address, trusting X-Forwarded-For only as far as RATE_LIMIT_TRUSTED_PROXIES hops."""
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take(scope, ident, now=None):
+    """Spend one token from the `scope` bucket for `ident`; returns seconds to wait, or 0 if allowed."""
+    limit = settings.FORM_RATE_LIMITS.get(scope)
+    if not limit or not ident:
+        return 0
+    capacity, per_seconds = limit
+    rate = capacity / per_seconds
+    key = f'bucket:{scope}:{ident}'
+    now = time.time() if now is None else now
+    # The lock makes read-modify-write atomic within a process; across processes a
+    # lost update can only let an extra request through, never block a real one
+    with _lock:
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * rate)
+        if tokens < 1:
+            return max(1, math.ceil((1 - tokens) / rate))
+        cache.set(key, (tokens - 1, now), timeout=per_seconds)
+    return 0
+
+
+def _too_many(wait):
+    response = HttpResponse('Too many submissions. Please try again in a few minutes.', status=429,
+                            content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def _screen(request, kind, phone_field):
+    """Return (response to send instead of the view, or None, idempotency cache key or None)."""
+    wait = take(f'{kind}-ip', client_ip(request))
+    if wait:
+        return _too_many(wait), None
+    if request.POST.get(settings.FORM_HONEYPOT_FIELD):
+        # Look like a success so the bot has nothing to tune against
+        logger.info('Honeypot filled on %s form from %s', kind, client_ip(request))
+        return redirect('home'), None
+    phone = re.sub(r'\D', '', request.POST.get(phone_field, ''))[-10:]
+    wait = take(f'{kind}-phone', phone)
+    if wait:
+        return _too_many(wait), None
+    token = request.POST.get(IDEMPOTENCY_FIELD, '')
+    if not re.fullmatch(r'[0-9a-f]{32}', token):
+        return None, None
+    key = f'idempotency:{kind}:{token}'
+    if not cache.add(key, 'pending', timeout=settings.IDEMPOTENCY_KEY_TTL):
+        messages.info(request, 'We already received this submission.')
+        return redirect('home'), None
+    return None, key
+
+
+def _settle(key, response):
+    # Only a successful submission (a redirect) consumes the key; a form with errors can be resent
+    if response.status_code != 302:
+        _release(key)
+    return response
+
+
+def _release(key):
+    if key:
+        cache.delete(key)
+
+
+def protect_form(kind, phone_field):
+    """Rate-limit, honeypot-check and de-duplicate POSTs to a public form view (sync or async)."""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                key = None
+                if request.method == 'POST':
+                    # Cache calls (Redis in production), body parsing and the session all block
+                    rejection, key = await sync_to_async(_screen)(request, kind, phone_field)
+                    if rejection is not None:
+                        return rejection
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                except BaseException:
+                    await sync_to_async(_release)(key)
+                    raise
+                return await sync_to_async(_settle)(key, response)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = None
+            if request.method == 'POST':
+                rejection, key = _screen(request, kind, phone_field)
+                if rejection is not None:
+                    return rejection
+            try:
+                response = view_func(request, *args, **kwargs)
+            except BaseException:
+                _release(key)
+                raise
+            return _settle(key, response)
+        return wrapper
+    return decorator
@@ -14,6 +14,9 @@ urlpatterns = [
     path('admissions/', views.admission_list, name='admission_list'),
     path('admission/<int:id>/', views.admission_detail, name='admission_detail'),
     path('export-admissions/', views.export_admissions, name='export_admissions'),
+    path('export/<slug:dataset>.<str:fmt>', views.stream_export, name='stream_export'),
+    path('documents/<slug:kind>.pdf', views.print_documents, name='print_documents'),
+    path('diagnostics/', views.diagnostics, name='diagnostics'),
     path('about-us/', views.about_us, name='about_us'),
     path('contact/', views.contact, name='contact'),
 
@@ -22,6 +25,9 @@ urlpatterns = [
     path('faculty/logout/', views.faculty_logout, name='faculty_logout'),
     path('faculty/dashboard/', views.faculty_dashboard, name='faculty_dashboard'),
     path('faculty/<int:faculty_id>/', views.faculty_profile, name='faculty_profile'),
+    path('payments/ledger/', views.payment_ledger, name='payment_ledger'),
+    path('payroll/', views.payroll, name='payroll'),
+    path('payroll/<str:month>/download/', views.payroll_download, name='payroll_download'),
 
     # Lecture schedule and attendance
     path('lectures/', views.lecture_list, name='lecture_list'),
@@ -30,4 +36,17 @@ urlpatterns = [
     path('lectures/<int:lecture_id>/edit/', views.lecture_edit, name='lecture_edit'),
     path('lectures/<int:lecture_id>/delete/', views.lecture_delete, name='lecture_delete'),
     path('lectures/<int:lecture_id>/attendance/', views.lecture_attendance, name='lecture_attendance'),
+    path('attendance/board/', views.attendance_board, name='attendance_board'),
+    path('attendance/board/events/', views.attendance_board_events, name='attendance_board_events'),
+
+    # Audit trail and activity feed
+    path('audit/', views.audit_log, name='audit_log'),
+    path('activity/', views.activity_feed, name='activity'),
+
+    # Branches
+    path('branches/switch/', views.switch_branch, name='switch_branch'),
+    path('branches/report/', views.branch_report, name='branch_report'),
+
+    # Subscribable timetable feeds
+    path('calendar/<str:token>.ics', views.calendar_feed_view, name='calendar_feed'),
 ] 
\ No newline at end of file
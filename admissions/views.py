@@ -3,22 +3,53 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
-from django.db.models import Q, Count
-from django.http import JsonResponse, HttpResponse
+from django.db import router, transaction
+from django.db.models import Q, Count, Sum, Max
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.core.paginator import Paginator
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+import asyncio
+import json
+import os
 from datetime import datetime
-from .models import Enquiry, Admission, Faculty, Lecture, AttendanceRecord, Payment
+from asgiref.sync import sync_to_async
+from .models import (
+    Enquiry, Admission, Faculty, Lecture, AttendanceRecord, Payment, PaymentTransaction, EnquiryRollup,
+    AuditLog,
+)
 from .forms import EnquiryForm, AdmissionForm, EnquiryUpdateForm
+from . import calendar_feed
+from . import payroll as payroll_service
+from . import instrumentation
+from . import access
+from . import archive
+from . import bitmaps
+from . import exports
+from . import documents
+from . import live
+from . import audit
+from . import activity
+from . import branches
+from . import media
+from .access import staff_required, faculty_required, lecture_access
+from .throttle import protect_form
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+UPCOMING_LECTURES_LIMIT = 20
+DASHBOARD_ACTIVITY_LIMIT = 10
+ACTIVITY_PAGE_SIZE = 50
+
 def home(request):
     """Home page with hero section and navigation"""
     return render(request, 'admissions/home.html')
 
+@protect_form('enquiry', phone_field='phone_number')
 def enquiry_form(request):
     """Enquiry form submission"""
     if request.method == 'POST':
@@ -32,18 +63,26 @@ def enquiry_form(request):
     
     return render(request, 'admissions/enquiry_form.html', {'form': form})
 
-def admission_form(request):
-    """Admission form submission"""
+def _save_admission(form):
+    # Photo validation (Pillow) and the insert share one hop to the sync thread
+    if form.is_valid():
+        form.save()
+        return True
+    return False
+
+
+@protect_form('admission', phone_field='mobile_1')
+async def admission_form(request):
+    """Admission form submission (async: slow photo uploads don't hold a worker thread)"""
     if request.method == 'POST':
         form = AdmissionForm(request.POST, request.FILES)
-        if form.is_valid():
-            form.save()
+        if await sync_to_async(_save_admission)(form):
             messages.success(request, 'Admission form submitted successfully! We will review and contact you soon.')
             return redirect('home')
     else:
         form = AdmissionForm()
     
-    return render(request, 'admissions/admission_form.html', {'form': form})
+    return await sync_to_async(render)(request, 'admissions/admission_form.html', {'form': form})
 
 def admin_login(request):
     """Admin login view"""
@@ -55,6 +94,7 @@ def admin_login(request):
             user = authenticate(username=username, password=password)
             if user is not None and user.is_staff:
                 login(request, user)
+                access.remember(request)
                 messages.success(request, f'Welcome back, {username}!')
                 return redirect('dashboard')
             else:
@@ -71,19 +111,20 @@ def admin_logout(request):
     messages.success(request, 'You have been logged out successfully.')
     return redirect('home')
 
-@login_required
+@staff_required
 def dashboard(request):
     """Admin dashboard with statistics"""
-    if not request.user.is_staff:
-        return redirect('home')
-    total_enquiries = Enquiry.objects.count()
+    # Archived enquiries still count towards the totals through their monthly rollups
+    archived = EnquiryRollup.objects.aggregate(
+        enquiries=Sum('total'), converted=Sum('total', filter=Q(status='converted'))
+    )
+    total_enquiries = Enquiry.objects.count() + (archived['enquiries'] or 0)
     total_admissions = Admission.objects.count()
-    converted_enquiries = Enquiry.objects.filter(status='converted').count()
+    converted_enquiries = Enquiry.objects.filter(status='converted').count() + (archived['converted'] or 0)
     conversion_rate = (converted_enquiries / total_enquiries * 100) if total_enquiries > 0 else 0
     
-    # Recent activities
-    recent_enquiries = Enquiry.objects.order_by('-enquiry_date')[:5]
-    recent_admissions = Admission.objects.order_by('-submitted_at')[:5]
+    # Recent activities: one query over the merged feed
+    recent_activity, _ = activity.feed(limit=DASHBOARD_ACTIVITY_LIMIT)
     
     # Handle quick-create faculty
     if request.method == 'POST' and request.POST.get('action') == 'create_faculty':
@@ -101,13 +142,21 @@ def dashboard(request):
             messages.success(request, f'Faculty "{fac.full_name}" created with username "{username}".')
             return redirect('dashboard')
 
-    faculties = Faculty.objects.select_related('user').order_by('-id')[:10]
+    faculties = list(Faculty.objects.select_related('user').order_by('-id')[:10])
     # Prepare current month payment snapshots for quick view
     from datetime import date
     month_start = date.today().replace(day=1)
+    # Written and read back on the primary: on a GET the rest of the page may come from
+    # the replica, which can lag behind and not have these rows yet
+    primary = Payment.objects.db_manager(router.db_for_write(Payment))
+    primary.bulk_create([Payment(faculty=f, month=month_start) for f in faculties], ignore_conflicts=True)
+    payments = {
+        p.faculty_id: p
+        for p in primary.filter(faculty__in=faculties, month=month_start).with_lecture_counts()
+    }
     faculty_cards = []
     for f in faculties:
-        payment, _ = Payment.objects.get_or_create(faculty=f, month=month_start, defaults={'per_lecture_rate': 0, 'amount_paid': 0})
+        payment = payments[f.id]
         faculty_cards.append({
             'obj': f,
             'lectures_count': payment.lectures_count,
@@ -122,8 +171,7 @@ def dashboard(request):
         'total_admissions': total_admissions,
         'converted_enquiries': converted_enquiries,
         'conversion_rate': round(conversion_rate, 1),
-        'recent_enquiries': recent_enquiries,
-        'recent_admissions': recent_admissions,
+        'recent_activity': recent_activity,
         'faculties': faculties,
         'faculty_cards': faculty_cards,
     }
@@ -255,170 +303,55 @@ def contact(request):
     return render(request, 'admissions/contact.html')
 
 @login_required
-def export_enquiries(request):
+async def export_enquiries(request):
     """Export enquiries to Excel file organized by preferred course"""
-    # Get all enquiries
-    enquiries = Enquiry.objects.all().order_by('preferred_course', 'enquiry_date')
-    
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Enquiries Report"
-    
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Define borders
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Add title
-    ws.merge_cells('A1:H1')
-    title_cell = ws['A1']
-    title_cell.value = f"Super20 Academy - Enquiries Report (Generated on {datetime.now().strftime('%d/%m/%Y %H:%M')})"
-    title_cell.font = Font(bold=True, size=16)
-    title_cell.alignment = Alignment(horizontal="center")
-    
-    # Add headers
-    headers = [
-        'ID', 'Student Name', 'Guardian Name', 'Phone Number', 
-        'Preferred Course', 'Enquiry Date', 'Status', 'Notes'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Add data
-    row = 4
-    for enquiry in enquiries:
-        ws.cell(row=row, column=1, value=enquiry.id).border = thin_border
-        ws.cell(row=row, column=2, value=enquiry.student_name).border = thin_border
-        ws.cell(row=row, column=3, value=enquiry.guardian_name).border = thin_border
-        ws.cell(row=row, column=4, value=enquiry.phone_number).border = thin_border
-        ws.cell(row=row, column=5, value=enquiry.get_preferred_course_display()).border = thin_border
-        ws.cell(row=row, column=6, value=enquiry.enquiry_date.strftime('%d/%m/%Y %H:%M')).border = thin_border
-        ws.cell(row=row, column=7, value=enquiry.get_status_display()).border = thin_border
-        ws.cell(row=row, column=8, value=enquiry.notes or '').border = thin_border
-        row += 1
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Create response
+    enquiries = [e async for e in Enquiry.objects.all().order_by('preferred_course', 'enquiry_date')]
+    # Building the workbook is CPU-bound and touches no database, so it may leave the sync thread
+    content = await sync_to_async(exports.enquiries_workbook, thread_sensitive=False)(enquiries)
     response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = f'attachment; filename="Super20_Enquiries_{datetime.now().strftime("%Y%m%d_%H%M")}.xlsx"'
-    
-    wb.save(response)
     return response
 
+
 @login_required
-def export_admissions(request):
+async def export_admissions(request):
     """Export admissions to Excel file organized by standard"""
-    # Get all admissions
-    admissions = Admission.objects.all().order_by('standard', 'name')
-    
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Admissions Report"
-    
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Define borders
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Add title
-    ws.merge_cells('A1:L1')
-    title_cell = ws['A1']
-    title_cell.value = f"Super20 Academy - Admissions Report (Generated on {datetime.now().strftime('%d/%m/%Y %H:%M')})"
-    title_cell.font = Font(bold=True, size=16)
-    title_cell.alignment = Alignment(horizontal="center")
-    
-    # Add headers
-    headers = [
-        'ID', 'Full Name', 'Standard', 'Batch', 'Stream', 'Date of Birth', 'Age',
-        'Father Name', 'Mother Name', 'Mobile 1', 'Mobile 2', 'School/College'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Add data
-    row = 4
-    for admission in admissions:
-        # Calculate age
-        from datetime import date
-        today = date.today()
-        age = today.year - admission.date_of_birth.year - ((today.month, today.day) < (admission.date_of_birth.month, admission.date_of_birth.day))
-        
-        ws.cell(row=row, column=1, value=admission.id).border = thin_border
-        ws.cell(row=row, column=2, value=admission.full_name()).border = thin_border
-        ws.cell(row=row, column=3, value=admission.get_standard_display()).border = thin_border
-        ws.cell(row=row, column=4, value=admission.batch).border = thin_border
-        ws.cell(row=row, column=5, value=admission.get_stream_display() if admission.stream else '').border = thin_border
-        ws.cell(row=row, column=6, value=admission.date_of_birth.strftime('%d/%m/%Y')).border = thin_border
-        ws.cell(row=row, column=7, value=age).border = thin_border
-        ws.cell(row=row, column=8, value=admission.father_name).border = thin_border
-        ws.cell(row=row, column=9, value=admission.mother_name).border = thin_border
-        ws.cell(row=row, column=10, value=admission.mobile_1).border = thin_border
-        ws.cell(row=row, column=11, value=admission.mobile_2 or '').border = thin_border
-        ws.cell(row=row, column=12, value=admission.school_college).border = thin_border
-        row += 1
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Create response
+    admissions = [a async for a in Admission.objects.all().order_by('standard', 'name')]
+    content = await sync_to_async(exports.admissions_workbook, thread_sensitive=False)(admissions)
     response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = f'attachment; filename="Super20_Admissions_{datetime.now().strftime("%Y%m%d_%H%M")}.xlsx"'
-    
-    wb.save(response)
+    return response
+
+
+@staff_required
+async def stream_export(request, dataset, fmt):
+    """Full dump of a dataset as CSV or gzip JSONL, streamed while it is read."""
+    if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+        raise Http404('Unknown export')
+    parts = exports.stream(dataset, fmt, asynchronous=isinstance(request, ASGIRequest))
+    response = StreamingHttpResponse(parts, content_type=exports.FORMATS[fmt][0])
+    response['Content-Disposition'] = f'attachment; filename="{exports.export_filename(dataset, fmt)}"'
+    return response
+
+
+@staff_required
+async def print_documents(request, kind):
+    """ID cards or class rosters for a standard (optionally one batch) as a single PDF."""
+    standard = request.GET.get('standard', '')
+    if kind not in documents.KINDS or standard not in dict(Admission.STANDARD_CHOICES):
+        raise Http404('Unknown document')
+    batch = request.GET.get('batch', '').strip()
+    rows = await sync_to_async(documents.students)(standard, batch)
+    if not rows:
+        messages.info(request, 'No students match that standard and batch.')
+        return redirect(f"{reverse('admission_list')}?standard={standard}")
+    parts = documents.stream(kind, rows, asynchronous=isinstance(request, ASGIRequest))
+    response = StreamingHttpResponse(parts, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{documents.filename(kind, standard, batch)}"'
     return response
 
 
@@ -431,9 +364,11 @@ def faculty_login(request):
             username = form.cleaned_data.get('username')
             password = form.cleaned_data.get('password')
             user = authenticate(username=username, password=password)
-            if user is not None and hasattr(user, 'faculty_profile') and user.is_active:
+            faculty = Faculty.objects.filter(user=user).first() if user is not None else None
+            if faculty is not None and user.is_active:
                 login(request, user)
-                messages.success(request, f'Welcome, {user.faculty_profile.full_name}!')
+                access.remember(request, faculty)
+                messages.success(request, f'Welcome, {faculty.full_name}!')
                 return redirect('faculty_dashboard')
             messages.error(request, 'Invalid faculty credentials or account inactive.')
     else:
@@ -443,37 +378,66 @@ def faculty_login(request):
 
 @login_required
 def faculty_logout(request):
-    if hasattr(request.user, 'faculty_profile') or request.user.is_staff:
+    if request.access.is_faculty or request.access.is_staff:
         logout(request)
         messages.success(request, 'Logged out successfully.')
     return redirect('home')
 
 
-@login_required
+@faculty_required
 def faculty_dashboard(request):
     """Faculty dashboard showing upcoming and past lectures."""
-    if not hasattr(request.user, 'faculty_profile'):
-        return redirect('home')
-    faculty = request.user.faculty_profile
+    faculty_id = request.access.faculty_id
     today = timezone.localdate()
-    upcoming = Lecture.objects.filter(faculty=faculty, date__gte=today).order_by('date', 'start_time')
-    past = Lecture.objects.filter(faculty=faculty, date__lt=today).order_by('-date', '-start_time')[:10]
+    upcoming = Lecture.objects.filter(faculty_id=faculty_id, date__gte=today).order_by('date', 'start_time')[:UPCOMING_LECTURES_LIMIT]
+    past = Lecture.objects.filter(faculty_id=faculty_id, date__lt=today).order_by('-date', '-start_time')[:10]
     # Salary info for current month
     from datetime import date
     month_start = date.today().replace(day=1)
-    payment, _ = Payment.objects.get_or_create(faculty=faculty, month=month_start, defaults={'per_lecture_rate': 0, 'amount_paid': 0})
+    payment, _ = Payment.objects.get_or_create(faculty_id=faculty_id, month=month_start, defaults={'per_lecture_rate': 0, 'amount_paid': 0})
     return render(request, 'admissions/faculty_dashboard.html', {
         'upcoming_lectures': upcoming,
         'recent_lectures': past,
         'payment': payment,
+        'calendar_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[calendar_feed.feed_token(calendar_feed.faculty_scope(faculty_id))])
+        ),
     })
 
 
-@login_required
+def _feed_etag(request, token):
+    try:
+        return calendar_feed.feed_etag(calendar_feed.scope_from_token(token))
+    except signing.BadSignature:
+        return None
+
+
+@condition(etag_func=_feed_etag)
+def calendar_feed_view(request, token):
+    """Subscribable iCalendar feed for one faculty or one class batch."""
+    try:
+        scope = calendar_feed.scope_from_token(token)
+    except signing.BadSignature:
+        raise Http404('Unknown calendar feed')
+    branch, unprefixed = calendar_feed.split_scope(scope)
+    if branch not in settings.BRANCHES:
+        raise Http404('Unknown calendar feed')
+    kind, _, rest = unprefixed.partition(':')
+    with branches.activate(branch):
+        if kind == 'faculty':
+            faculty = get_object_or_404(Faculty, id=int(rest))
+            name = f'Super20 - {faculty.full_name}'
+        else:
+            standard, _, batch = rest.partition(':')
+            name = f"Super20 - {dict(Admission.STANDARD_CHOICES).get(standard, standard)} / {batch}"
+        response = HttpResponse(calendar_feed.render_feed(scope, name), content_type='text/calendar; charset=utf-8')
+    patch_cache_control(response, private=True, max_age=300)
+    return response
+
+
+@staff_required
 def faculty_profile(request, faculty_id):
     """Admin view: per-faculty profile, monthly payment management."""
-    if not request.user.is_staff:
-        return redirect('home')
     faculty = get_object_or_404(Faculty, id=faculty_id)
     from datetime import date
     month_start = date.today().replace(day=1)
@@ -492,7 +456,7 @@ def faculty_profile(request, faculty_id):
                 if rate_val < 0:
                     raise InvalidOperation
                 payment.per_lecture_rate = rate_val
-                payment.save()
+                payment.save(update_fields=['per_lecture_rate', 'updated_at'])
                 messages.success(request, 'Per-lecture rate updated.')
             except Exception:
                 messages.error(request, 'Invalid rate value.')
@@ -504,45 +468,145 @@ def faculty_profile(request, faculty_id):
                 amount_val = Decimal(amount_clean)
                 if amount_val < 0:
                     raise InvalidOperation
-                payment.amount_paid = (payment.amount_paid or 0) + amount_val
-                payment.save()
+                payment.record_payment(amount_val, user=request.user)
                 messages.success(request, 'Payment recorded.')
             except Exception:
                 messages.error(request, 'Invalid payment amount.')
         return redirect('faculty_profile', faculty_id=faculty.id)
 
     # History: last 6 months
-    history = Payment.objects.filter(faculty=faculty).order_by('-month')[:6]
+    history = Payment.objects.filter(faculty=faculty).with_lecture_counts().order_by('-month')[:6]
+    transactions = (
+        PaymentTransaction.objects.filter(payment__faculty=faculty)
+        .select_related('payment', 'recorded_by')[:10]
+    )
 
     return render(request, 'admissions/faculty_profile.html', {
         'faculty': faculty,
         'payment': payment,
         'history': history,
+        'transactions': transactions,
+    })
+
+
+@staff_required
+def payment_ledger(request):
+    """Admin view: ledger totals per month and faculty, aggregated in the database."""
+    entries = PaymentTransaction.objects.all()
+    month_filter = request.GET.get('month', '')
+    if month_filter:
+        try:
+            month_start = datetime.strptime(month_filter, '%Y-%m').date()
+            entries = entries.filter(payment__month=month_start)
+        except ValueError:
+            messages.error(request, 'Month must look like 2025-10.')
+    faculty_filter = request.GET.get('faculty', '')
+    if faculty_filter.isdigit():
+        entries = entries.filter(payment__faculty_id=int(faculty_filter))
+
+    rows = (
+        entries.values('payment__month', 'payment__faculty_id', 'payment__faculty__full_name')
+        .annotate(
+            total=Sum('amount'),
+            entry_count=Count('id'),
+            settled=Sum('amount', filter=Q(kind='settlement')),
+            last_paid_at=Max('created_at'),
+        )
+        .order_by('-payment__month', 'payment__faculty__full_name')
+    )
+    paginator = Paginator(rows, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'admissions/payment_ledger.html', {
+        'page_obj': page_obj,
+        'grand_total': entries.aggregate(total=Sum('amount'))['total'] or 0,
+        'month_filter': month_filter,
+        'faculty_filter': faculty_filter,
+        'faculties': Faculty.objects.order_by('full_name').only('id', 'full_name'),
     })
 
 
+@staff_required
+def payroll(request):
+    """Admin view: month-end payroll table with payslip generation."""
+    from datetime import date
+    month_raw = request.POST.get('month') or request.GET.get('month') or date.today().strftime('%Y-%m')
+    try:
+        month = datetime.strptime(month_raw, '%Y-%m').date()
+    except ValueError:
+        messages.error(request, 'Month must look like 2025-10.')
+        month = date.today().replace(day=1)
+
+    if request.method == 'POST':
+        # One payslip at a time, in this worker: forking a process pool inside a web worker is
+        # unsafe and would starve its neighbours. `manage.py run_payroll` renders in parallel.
+        try:
+            result = payroll_service.run_payroll(month, workers=1)
+        except payroll_service.PayrollBusy:
+            messages.warning(request, f'Payslips for {month:%B %Y} are already being generated; try again shortly.')
+        else:
+            messages.success(
+                request,
+                f"Payslips ready: {result['generated']} generated, {result['skipped']} unchanged since the last run.",
+            )
+        return redirect(f"{reverse('payroll')}?month={month:%Y-%m}")
+
+    rows = payroll_service.payroll_rows(month)
+    return render(request, 'admissions/payroll.html', {
+        'rows': rows,
+        'month': month,
+        'totals': {
+            'lectures': sum(r['lecture_total'] for r in rows),
+            'due': sum(r['amount_due'] for r in rows),
+            'paid': sum(r['amount_paid'] for r in rows),
+            'balance': sum(r['balance'] for r in rows),
+        },
+        'archive_ready': os.path.exists(payroll_service.archive_path(month)),
+    })
+
+
+@staff_required
+def payroll_download(request, month):
+    """Admin view: download the bundled payslips for a month."""
+    try:
+        month_start = datetime.strptime(month, '%Y-%m').date()
+    except ValueError:
+        raise Http404('Unknown payroll month')
+    path = payroll_service.archive_path(month_start)
+    if not os.path.exists(path):
+        raise Http404('Payroll has not been run for this month')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
+@staff_required
+def diagnostics(request):
+    """Admin view: per-view latency and query percentiles from the instrumentation buffer."""
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        instrumentation.reset()
+        messages.success(request, 'Diagnostics samples cleared.')
+        return redirect('diagnostics')
+    return render(request, 'admissions/diagnostics.html', {'rows': instrumentation.summaries()})
+
+
 # -------------------- LECTURES CRUD AND ATTENDANCE --------------------
 @login_required
 def lecture_list(request):
     """Admin list of all lectures with filters. Faculty sees own lectures."""
-    if hasattr(request.user, 'faculty_profile') and not request.user.is_staff:
-        lectures = Lecture.objects.filter(faculty=request.user.faculty_profile)
+    if request.access.is_faculty and not request.access.is_staff:
+        lectures = Lecture.objects.filter(faculty_id=request.access.faculty_id)
     else:
         lectures = Lecture.objects.all()
     q = request.GET.get('q', '')
     if q:
         lectures = lectures.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(batch__icontains=q))
-    paginator = Paginator(lectures.order_by('-date', '-start_time'), 20)
+    paginator = Paginator(lectures.select_related('faculty').order_by('-date', '-start_time'), 20)
     page = request.GET.get('page')
     page_obj = paginator.get_page(page)
     return render(request, 'admissions/lecture_list.html', {'page_obj': page_obj, 'q': q})
 
 
-@login_required
+@staff_required(redirect_to='lecture_list')
 def lecture_create(request):
     """Create a lecture (admin only)."""
-    if not request.user.is_staff:
-        return redirect('lecture_list')
     if request.method == 'POST':
         # Minimal inline form handling to avoid creating a new forms.py class for now
         data = request.POST
@@ -566,10 +630,8 @@ def lecture_create(request):
     })
 
 
-@login_required
+@staff_required(redirect_to='lecture_list')
 def lecture_edit(request, lecture_id):
-    if not request.user.is_staff:
-        return redirect('lecture_list')
     lecture = get_object_or_404(Lecture, id=lecture_id)
     if request.method == 'POST':
         data = request.POST
@@ -581,6 +643,10 @@ def lecture_edit(request, lecture_id):
         lecture.standard = data.get('standard')
         lecture.batch = data.get('batch')
         lecture.faculty = get_object_or_404(Faculty, id=data.get('faculty'))
+        # Drop an unused roster snapshot so it is retaken for the (possibly new) class
+        if lecture.roster_frozen_at and not lecture.attendance_records.exists():
+            lecture.roster_entries.all().delete()
+            lecture.roster_frozen_at = None
         lecture.save()
         messages.success(request, 'Lecture updated successfully.')
         return redirect('lecture_detail', lecture_id=lecture.id)
@@ -591,52 +657,85 @@ def lecture_edit(request, lecture_id):
     })
 
 
-@login_required
+@staff_required(redirect_to='lecture_list')
 def lecture_delete(request, lecture_id):
-    if not request.user.is_staff:
-        return redirect('lecture_list')
     lecture = get_object_or_404(Lecture, id=lecture_id)
     lecture.delete()
     messages.success(request, 'Lecture deleted successfully.')
     return redirect('lecture_list')
 
 
-@login_required
-def lecture_detail(request, lecture_id):
-    lecture = get_object_or_404(Lecture, id=lecture_id)
-    # Authorization: staff or assigned faculty only
-    if hasattr(request.user, 'faculty_profile') and lecture.faculty != request.user.faculty_profile and not request.user.is_staff:
-        return redirect('faculty_dashboard')
-    students = list(lecture.get_target_students_queryset())
-    records = {r.student_id: r for r in AttendanceRecord.objects.filter(lecture=lecture)}
-    for s in students:
-        setattr(s, 'attendance_record', records.get(s.id))
+@lecture_access
+def lecture_detail(request, lecture):
+    students = _students_with_records(lecture)
     return render(request, 'admissions/lecture_detail.html', {
         'lecture': lecture,
         'students': students,
+        'calendar_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[calendar_feed.feed_token(calendar_feed.batch_scope(lecture.standard, lecture.batch, lecture.branch))])
+        ),
     })
 
 
-@login_required
-def lecture_attendance(request, lecture_id):
-    lecture = get_object_or_404(Lecture, id=lecture_id)
-    # Authorization
-    if hasattr(request.user, 'faculty_profile') and lecture.faculty != request.user.faculty_profile and not request.user.is_staff:
-        return redirect('faculty_dashboard')
-    if request.method == 'POST':
-        # Expect POST as dict of student_<id>=present/absent
-        marked_by_faculty = request.user.faculty_profile if hasattr(request.user, 'faculty_profile') else None
-        absentees = []
+def _save_attendance(lecture, data, marked_by_id):
+    """Write every student's status in one transaction; returns the absentees."""
+    absentees = []
+    statuses = {}
+    changes = {}
+    with transaction.atomic():
+        existing = {r.student_id: r for r in AttendanceRecord.objects.filter(lecture=lecture)}
+        new = []
         for student in lecture.get_target_students_queryset():
             key = f'student_{student.id}'
-            status = request.POST.get(key, 'present')
-            record, _ = AttendanceRecord.objects.update_or_create(
-                lecture=lecture,
-                student=student,
-                defaults={'status': status, 'marked_by': marked_by_faculty}
-            )
+            status = data.get(key, 'present')
+            record = existing.get(student.id)
+            if record is None:
+                new.append(AttendanceRecord(lecture=lecture, student=student, status=status, marked_by_id=marked_by_id))
+            else:
+                record.status, record.marked_by_id = status, marked_by_id
+            previous = None if record is None else record._audit_snapshot.get('status')
+            if previous != status:
+                changes[f'Attendance: {student.full_name()} (#{student.id})'] = [previous, status]
+            statuses[student.id] = status
             if status == 'absent':
                 absentees.append(student)
+        # A concurrent submit for the same lecture may have inserted some of these rows since we read
+        AttendanceRecord.objects.bulk_create(
+            new, update_conflicts=True, unique_fields=['lecture', 'student'], update_fields=['status', 'marked_by'],
+        )
+        AttendanceRecord.objects.bulk_update(existing.values(), ['status', 'marked_by'])
+        # Keep the compact store in step; the roster is frozen before attendance opens
+        bitmaps.save_lecture(lecture, statuses, marked_by_id)
+        # Bulk writes send no model signals, so tell the live board and the audit trail directly
+        live.publish_on_commit('attendance', {'lecture_id': lecture.pk, 'date': lecture.date.isoformat()})
+        audit.record(lecture, 'update', changes)
+        if changes:
+            activity.attendance_marked(lecture, len(statuses) - len(absentees), len(absentees), bool(existing))
+    return absentees
+
+
+def _students_with_records(lecture):
+    students = list(lecture.get_target_students_queryset())
+    records = {r.student_id: r for r in AttendanceRecord.objects.filter(lecture=lecture)}
+    if not records and lecture.date < archive.academic_year_start():
+        # Past academic years live in the archive; unsaved records keep the templates unchanged
+        records = {
+            student_id: AttendanceRecord(lecture=lecture, student_id=student_id, status=status)
+            for student_id, status in archive.archived_attendance(lecture).items()
+        }
+    for s in students:
+        setattr(s, 'attendance_record', records.get(s.id))
+    return students
+
+
+@lecture_access
+async def lecture_attendance(request, lecture):
+    # Opening attendance pins the roster so later batch moves don't rewrite history
+    await sync_to_async(lecture.freeze_roster)()
+    if request.method == 'POST':
+        # Expect POST as dict of student_<id>=present/absent
+        access_info = await request.aaccess()
+        absentees = await sync_to_async(_save_attendance)(lecture, request.POST, access_info.faculty_id)
         # Build WhatsApp-ready message
         date_str = lecture.date.strftime('%d-%m-%Y')
         title = lecture.title
@@ -648,16 +747,226 @@ def lecture_attendance(request, lecture_id):
         else:
             whatsapp_text = f"All students present for {title} ({standard}-{batch}) on {date_str}."
         messages.success(request, 'Attendance submitted successfully. You can copy the WhatsApp message below.')
-        return render(request, 'admissions/attendance_submitted.html', {
+        return await sync_to_async(render)(request, 'admissions/attendance_submitted.html', {
             'lecture': lecture,
             'whatsapp_text': whatsapp_text,
         })
     # GET -> show form
-    students = list(lecture.get_target_students_queryset())
-    records = {r.student_id: r for r in AttendanceRecord.objects.filter(lecture=lecture)}
-    for s in students:
-        setattr(s, 'attendance_record', records.get(s.id))
-    return render(request, 'admissions/lecture_attendance.html', {
+    students = await sync_to_async(_students_with_records)(lecture)
+    return await sync_to_async(render)(request, 'admissions/lecture_attendance.html', {
         'lecture': lecture,
         'students': students,
     })
+
+
+# -------------------- LIVE ATTENDANCE BOARD --------------------
+def _attendance_board(day):
+    """Marked/unmarked status and present/absent counts for every lecture on `day`, in one query."""
+    labels = dict(Admission.STANDARD_CHOICES)
+    lectures = (
+        Lecture.objects.filter(date=day)
+        .annotate(
+            present=Count('attendance_records', filter=Q(attendance_records__status='present')),
+            absent=Count('attendance_records', filter=Q(attendance_records__status='absent')),
+        )
+        .order_by('start_time', 'id')
+        .values('id', 'title', 'start_time', 'end_time', 'standard', 'batch', 'faculty__full_name', 'present', 'absent')
+    )
+    rows = [{
+        'id': lec['id'],
+        'title': lec['title'],
+        'time': f"{lec['start_time']:%H:%M} - {lec['end_time']:%H:%M}",
+        'class': f"{labels.get(lec['standard'], lec['standard'])} / {lec['batch']}",
+        'faculty': lec['faculty__full_name'],
+        'present': lec['present'],
+        'absent': lec['absent'],
+        'marked': bool(lec['present'] or lec['absent']),
+        'url': reverse('lecture_detail', args=[lec['id']]),
+    } for lec in lectures]
+    return {'date': day.isoformat(), 'lectures': rows, 'marked': sum(r['marked'] for r in rows), 'total': len(rows)}
+
+
+def _board_event(board, event_id):
+    retry = settings.LIVE_BOARD_REFRESH_SECONDS * 1000
+    return f'retry: {retry}\nid: {event_id}\nevent: board\ndata: {json.dumps(board)}\n\n'.encode()
+
+
+async def _board_events():
+    """Send the board now and again whenever attendance or lectures change; comments keep proxies from timing out."""
+    updates = _board_updates()
+    try:
+        async for event in updates:
+            yield event
+    finally:
+        # Unsubscribe as soon as the stream is closed, not whenever the loop finalises the generator
+        await updates.aclose()
+
+
+async def _board_updates():
+    refresh = settings.LIVE_BOARD_REFRESH_SECONDS
+    snapshot = sync_to_async(lambda: _attendance_board(timezone.localdate()))
+    async with live.subscribe('attendance') as changes:
+        sent, event_id = None, 0
+        while True:
+            board = await snapshot()
+            if board != sent:
+                event_id += 1
+                sent = board
+                yield _board_event(board, event_id)
+            else:
+                yield b': keep-alive\n\n'
+            try:
+                await asyncio.wait_for(changes.get(), timeout=refresh)
+            except asyncio.TimeoutError:
+                continue
+            # A burst of saves becomes one refresh
+            while not changes.empty():
+                changes.get_nowait()
+
+
+@staff_required
+def attendance_board(request):
+    """Admin view: today's lectures with live attendance progress."""
+    return render(request, 'admissions/attendance_board.html', {'board': _attendance_board(timezone.localdate())})
+
+
+@staff_required
+async def attendance_board_events(request):
+    """Server-sent events for the attendance board: one long-lived connection per open board."""
+    if isinstance(request, ASGIRequest):
+        events = _board_events()
+    else:
+        # A WSGI worker can't hold the connection open; send one update and let the browser reconnect
+        board = await sync_to_async(_attendance_board)(timezone.localdate())
+        events = [_board_event(board, 1)]
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx would otherwise hold events back
+    return response
+
+
+# -------------------- AUDIT TRAIL --------------------
+
+@staff_required
+def audit_log(request):
+    """Audit entries, newest first, for one record (?model=&object=) and/or one user (?user=)."""
+    audit.catch_up()
+    entries = AuditLog.objects.all()
+    model_filter = request.GET.get('model', '')
+    object_filter = request.GET.get('object', '')
+    user_filter = request.GET.get('user', '')
+    if model_filter:
+        entries = entries.filter(model=model_filter)
+        if object_filter.isdigit():
+            entries = entries.filter(object_id=object_filter)
+    if user_filter.isdigit():
+        entries = entries.filter(user_id=user_filter)
+    page_obj = Paginator(entries, 50).get_page(request.GET.get('page'))
+    page_obj.object_list = audit.annotate(page_obj.object_list)
+    return render(request, 'admissions/audit_log.html', {
+        'page_obj': page_obj,
+        'model_filter': model_filter,
+        'object_filter': object_filter,
+        'user_filter': user_filter,
+        'model_choices': [(m._meta.label_lower, m._meta.verbose_name.title()) for m in audit.AUDITED],
+        'users': User.objects.filter(is_active=True).order_by('username').only('id', 'username'),
+    })
+
+
+# -------------------- ACTIVITY FEED --------------------
+
+@staff_required
+def activity_feed(request):
+    """Everything on the dashboard's activity panel, newest first, filterable by kind, paged by cursor."""
+    kind_filter = [kind for kind in request.GET.getlist('kind') if kind in activity.KINDS]
+    cursor = request.GET.get('before')
+    events, next_cursor = activity.feed(kinds=kind_filter, cursor=cursor, limit=ACTIVITY_PAGE_SIZE)
+    return render(request, 'admissions/activity.html', {
+        'events': events,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+        'kind_filter': kind_filter,
+        'kind_choices': activity.KINDS.items(),
+    })
+
+
+# -------------------- BRANCHES --------------------
+
+@staff_required
+def switch_branch(request):
+    """Serve the staff member's later requests as another branch (one sharing the default database)."""
+    code = request.POST.get('branch', '')
+    if request.method == 'POST' and code in dict(branches.switchable()):
+        request.session[branches.SESSION_KEY] = code
+        messages.success(request, f'Now working in {branches.name(code)}.')
+    return redirect('dashboard')
+
+
+def _branch_figures():
+    """Headline numbers for the branch being served (run once per branch by branch_report)."""
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    enquiries = Enquiry.objects.aggregate(total=Count('id'), converted=Count('id', filter=Q(status='converted')))
+    attendance = AttendanceRecord.objects.filter(lecture__date__gte=month_start, lecture__date__lte=today).aggregate(
+        total=Count('id'), present=Count('id', filter=Q(status='present'))
+    )
+    return {
+        'enquiries': enquiries['total'],
+        'converted': enquiries['converted'],
+        'admissions': Admission.objects.count(),
+        'faculty': Faculty.objects.filter(is_active=True).count(),
+        'lectures': Lecture.objects.filter(date__gte=month_start, date__lte=today).count(),
+        'attendance_marked': attendance['total'],
+        'attendance_present': attendance['present'],
+    }
+
+
+def _with_rates(figures):
+    marked = figures['attendance_marked']
+    return dict(
+        figures,
+        conversion_rate=figures['converted'] / figures['enquiries'] * 100 if figures['enquiries'] else 0,
+        attendance_rate=figures['attendance_present'] / marked * 100 if marked else None,
+    )
+
+
+@staff_required
+def branch_report(request):
+    """The headline numbers of every branch side by side, each branch queried in parallel."""
+    results = branches.fan_out(_branch_figures)
+    rows = [dict(_with_rates(figures), code=code, name=branches.name(code)) for code, figures in results.items()]
+    totals = {key: sum(figures[key] for figures in results.values()) for key in results[settings.DEFAULT_BRANCH]}
+    return render(request, 'admissions/branch_report.html', {
+        'rows': rows,
+        'totals': _with_rates(totals),
+        'month': timezone.localdate().replace(day=1),
+    })
+
+
+# -------------------- MEDIA --------------------
+
+def _located(request, name):
+    # The conditional checks and the view all need the file; stat it once
+    if not hasattr(request, '_media_file'):
+        request._media_file = media.locate(name)
+    return request._media_file
+
+
+def _media_etag(request, name):
+    found = _located(request, name)
+    return media.etag(name, found[1]) if found else None
+
+
+def _media_modified(request, name):
+    found = _located(request, name)
+    return media.last_modified(found[1]) if found else None
+
+
+@login_required
+@condition(etag_func=_media_etag, last_modified_func=_media_modified)
+def media_file(request, name):
+    """Uploaded media (student photos) for signed-in users, with ranges, ETags and optional offload."""
+    found = _located(request, name)
+    if found is None:
+        raise Http404('No such file')
+    return media.response(request, name, *found)
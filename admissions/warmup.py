@@ -0,0 +1,51 @@
+"""Optional warm-up run by the WSGI/ASGI entry points (see the WARMUP setting)."""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Import the views, compile the common templates and read one page of each hot table."""
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    from .models import Admission, Enquiry, Lecture
+
+    start = time.perf_counter()
+    get_resolver().url_patterns
+    for name in settings.WARMUP_TEMPLATES:
+        get_template(name)
+    for model in (Enquiry, Admission, Lecture):
+        model.objects.exists()
+    logger.info('Warm-up finished in %.0f ms', (time.perf_counter() - start) * 1000)
+
+
+def _warm_up_safely():
+    try:
+        warm_up()
+    except Exception:
+        # Warm-up is only an optimisation; never keep the server from starting
+        logger.exception('Warm-up failed')
+
+
+def _warm_up_in_thread():
+    from django.db import connection
+
+    try:
+        _warm_up_safely()
+    finally:
+        # The connection opened here belongs to this thread; don't leave it behind
+        connection.close()
+
+
+def start(mode=None):
+    """Run warm_up() according to `mode` ('sync', 'background', or anything else to skip)."""
+    mode = settings.WARMUP if mode is None else mode
+    if mode == 'sync':
+        _warm_up_safely()
+    elif mode == 'background':
+        threading.Thread(target=_warm_up_in_thread, name='warmup', daemon=True).start()
@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'super20.settings')
+    # Tests run with a mirrored read replica, see super20/test_settings.py
+    default = 'super20.test_settings' if sys.argv[1:2] == ['test'] else 'super20.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
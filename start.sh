@@ -9,10 +9,14 @@ echo "Starting Django application setup..."
 echo "Running database migrations..."
 python manage.py migrate
 
+# Drop expired sessions left over from earlier runs
+echo "Sweeping expired sessions..."
+python manage.py sweep_sessions
+
 # Create superuser (will skip if already exists)
 echo "Creating superuser..."
 python manage.py create_superuser
 
-# Start the application
+# Start the application (ASGI, so async views don't hold a thread during slow uploads)
 echo "Starting Django application..."
-python manage.py runserver 0.0.0.0:$PORT
+exec uvicorn super20.asgi:application --host 0.0.0.0 --port $PORT
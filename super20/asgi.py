@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'super20.settings')
 
 application = get_asgi_application()
+
+from admissions import warmup  # noqa: E402  (needs the app registry loaded above)
+
+warmup.start()
+
+from django.conf import settings  # noqa: E402  (settings are configured by get_asgi_application)
+
+if settings.DEBUG:
+    # uvicorn has no equivalent of runserver's static file serving
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+
+from .database import branch_database, parse_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +29,8 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-h7-%n^%$#42$lqb2+k%$_
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -55,10 +60,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'admissions.instrumentation.InstrumentationMiddleware',
+    'admissions.routers.ReplicaRoutingMiddleware',
+    'admissions.branches.BranchMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'admissions.access.AccessMiddleware',
+    'admissions.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,7 +77,7 @@ ROOT_URLCONF = 'super20.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'admissions.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,18 +91,164 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Compile each template once per process. DEBUG keeps Django's default loaders,
+    # which notice edits to template files.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'super20.wsgi.application'
 
+# Heavy modules (openpyxl, Pillow, process pools) load on first use. WARMUP=background
+# (or sync) makes the serving entry point import the URLconf, compile the common
+# templates and touch the database while the first request is still on its way.
+WARMUP = os.environ.get('WARMUP', '')
+WARMUP_TEMPLATES = [
+    'admissions/home.html',
+    'admissions/enquiry_form.html',
+    'admissions/admission_form.html',
+    'admissions/admin_dashboard.html',
+    'admissions/faculty_dashboard.html',
+]
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLITE_PROFILE=production turns on WAL, relaxed fsync, bigger caches, IMMEDIATE
+# write transactions and persistent connections. It defaults on when DEBUG is off.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default' if DEBUG else 'production')
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,       # KiB (negative) -> ~32 MB page cache per connection
+    'mmap_size': 268435456,     # 256 MB memory-mapped reads
+    'busy_timeout': 5000,       # ms to wait on a lock before raising "database is locked"
+    'temp_store': 'MEMORY',
+}
+# Applied to every new SQLite connection by admissions.signals.apply_sqlite_pragmas
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PROFILE == 'production' else {}
+
+# DATABASE_URL selects the primary (SQLite file by default, or Postgres). Setting
+# DATABASE_REPLICA_URL adds a read replica that read-heavy views are routed to;
+# see super20/database.py for the URL forms and DATABASE_POOL options.
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': parse_database_url(os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'), BASE_DIR),
+}
+
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = parse_database_url(os.environ['DATABASE_REPLICA_URL'], BASE_DIR)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['admissions.routers.PrimaryReplicaRouter']
+
+# URL names whose GET requests may read from the replica
+REPLICA_READ_VIEWS = [
+    'dashboard', 'enquiry_list', 'admission_list', 'lecture_list',
+    'export_enquiries', 'export_admissions', 'stream_export', 'faculty_dashboard', 'payment_ledger', 'payroll',
+    'print_documents',
+]
+# After a POST the client reads from the primary for this long, so it sees its own writes
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '15'))
+
+if SQLITE_PROFILE == 'production' and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so transactions never fail upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    })
+
+# Branches (centres), e.g. BRANCHES="main:Main Centre,north:North Centre"; the first is the
+# default and the one existing rows belong to. See admissions/branches.py.
+BRANCHES = dict(
+    part.strip().split(':', 1) for part in os.environ.get('BRANCHES', 'main:Main Centre').split(',') if part.strip()
+)
+DEFAULT_BRANCH = next(iter(BRANCHES))
+# BRANCH_HOSTS="north.super20.in:north" serves every request for that host as that branch
+BRANCH_HOSTS = dict(
+    part.strip().rsplit(':', 1) for part in os.environ.get('BRANCH_HOSTS', '').split(',') if part.strip()
+)
+# BRANCH_DATABASES=true gives every other branch a database of its own (SQLite file or Postgres
+# schema, see super20/database.py) holding all of its tables, users and sessions included.
+# Branch databases are reached through BRANCH_HOSTS; staff cannot switch into them.
+BRANCH_DATABASES = {}
+if os.environ.get('BRANCH_DATABASES', '').lower() == 'true':
+    for _code in list(BRANCHES)[1:]:
+        DATABASES[f'branch_{_code}'] = branch_database(DATABASES['default'], _code)
+        BRANCH_DATABASES[_code] = f'branch_{_code}'
+DATABASE_ROUTERS = ['admissions.routers.BranchRouter'] + DATABASE_ROUTERS
+# Threads for cross-branch reports (default: one per branch)
+BRANCH_REPORT_WORKERS = int(os.environ['BRANCH_REPORT_WORKERS']) if os.environ.get('BRANCH_REPORT_WORKERS') else None
+
+
+# Request instrumentation
+# Max SQL queries per URL name ('*' applies to views without their own entry).
+# Over-budget requests log a warning, or raise when QUERY_BUDGET_STRICT is on.
+
+QUERY_BUDGETS = {
+    'dashboard': 15,
+    'enquiry_list': 8,
+    'admission_list': 8,
+    'lecture_list': 10,
+    'lecture_detail': 11,  # +1 for the staff change-history panel
+    'lecture_attendance': 25,
+    'faculty_dashboard': 12,
+    'faculty_profile': 15,
+    '*': 30,
+}
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', str(TESTING)).lower() == 'true'
+INSTRUMENTATION_RING_SIZE = 500
+
+# Sessions
+# SESSION_BACKEND=cached_db (default) reads sessions from the cache and only touches
+# django_session when a session changes; signed_cookies keeps them out of the database
+# entirely; db is Django's stock backend. Expired rows are removed by `sweep_sessions`.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'cached_db')]
+SESSION_CACHE_ALIAS = 'default'
+SESSION_COOKIE_AGE = int(os.environ.get('SESSION_COOKIE_AGE', str(60 * 60 * 12)))
+SESSION_COOKIE_HTTPONLY = True
+SESSION_SWEEP_BATCH_SIZE = 5000
+
+# Cache: per-process memory by default; set CACHE_URL=redis://... (needs `pip install redis`)
+# so sessions, rate-limit buckets and idempotency keys are shared by every worker.
+if os.environ.get('CACHE_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                          'LOCATION': os.environ['CACHE_URL']}}
+
+# Public form protection (see admissions/throttle.py). Buckets are (capacity, seconds to refill it).
+FORM_RATE_LIMITS = {
+    'enquiry-ip': (10, 600),
+    'enquiry-phone': (3, 3600),
+    'admission-ip': (5, 600),
+    'admission-phone': (3, 3600),
 }
+# Render's proxy appends the client address to X-Forwarded-For; trust that one hop in production
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '0' if DEBUG else '1'))
+FORM_HONEYPOT_FIELD = 'website'
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Audit trail (see admissions/audit.py): entries are buffered and written in batches by a
+# background thread; tests write them as soon as each transaction commits.
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', str(not TESTING)).lower() == 'true'
+AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', '1'))
+AUDIT_BATCH_SIZE = 500
+AUDIT_BUFFER_LIMIT = 10000
 
 
 # Password validation
@@ -135,9 +291,35 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Media files
+# Media files, stored by content hash (admissions/storage.py) and served by admissions/media.py
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+STORAGES = {
+    'default': {'BACKEND': 'admissions.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Unreferenced files younger than this are kept, so uploads whose row is still being saved survive `gc_media`
+MEDIA_GC_GRACE_SECONDS = int(os.environ.get('MEDIA_GC_GRACE_SECONDS', str(24 * 60 * 60)))
+# MEDIA_OFFLOAD=x-accel-redirect (nginx) or x-sendfile (Apache/lighttpd) lets the front server send
+# the bytes after Django has checked the login. For nginx, map MEDIA_ACCEL_PREFIX to MEDIA_ROOT:
+#   location /protected-media/ { internal; alias /app/media/; }
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '').lower()
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Upload directories /media/ serves to signed-in users; nothing else under MEDIA_ROOT is reachable
+MEDIA_SERVED_PREFIXES = ['photos/']
+# Generated files (payroll archives, archived rows) live outside MEDIA_ROOT so no media route can serve them
+PRIVATE_ROOT = Path(os.environ['PRIVATE_ROOT']) if os.environ.get('PRIVATE_ROOT') else BASE_DIR / 'private'
+
+# Data retention (see `manage.py archive_data`)
+ACADEMIC_YEAR_START_MONTH = 6  # June
+ENQUIRY_RETENTION_DAYS = int(os.environ.get('ENQUIRY_RETENTION_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = 5000
+
+# Open attendance boards re-read the database at least this often, to see writes made by other worker processes
+LIVE_BOARD_REFRESH_SECONDS = int(os.environ.get('LIVE_BOARD_REFRESH_SECONDS', '30'))
+
+# ID cards and rosters render one page per process, in one pool shared by all requests; None uses every core
+DOCUMENT_WORKERS = int(os.environ['DOCUMENT_WORKERS']) if os.environ.get('DOCUMENT_WORKERS') else None
 
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
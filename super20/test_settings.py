@@ -0,0 +1,14 @@
+"""Settings for `manage.py test`: the usual settings plus a real read replica.
+
+The replica is a second SQLite file that Django mirrors onto the default test
+database, so routing is exercised over two separate connections. No view reads
+from it unless a test opts in by overriding REPLICA_READ_VIEWS: inside TestCase
+the primary's rows are uncommitted and the replica connection can't see them.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, parse_database_url
+
+DATABASES.setdefault('replica', parse_database_url('sqlite:///db-replica.sqlite3', BASE_DIR))
+DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+REPLICA_READ_VIEWS = []
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'super20.settings')
 
 application = get_wsgi_application()
+
+from admissions import warmup  # noqa: E402  (needs the app registry loaded above)
+
+warmup.start()